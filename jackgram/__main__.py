@@ -46,7 +46,19 @@ async def start_services():
     import jackgram.bot.plugins.stream
     import jackgram.bot.plugins.wizard
     from jackgram.utils.telegram_stream import multi_session_manager
+    from jackgram.utils.migrations import run_migrations
+    from jackgram.bot.bot import get_db
     from jackgram.bot.utils import process_index_queue
+    from jackgram.utils.fuzzy_search import fuzzy_index
+
+    logging.info("Bootstrapping Database Indexes...")
+    try:
+        await run_migrations(get_db())
+    except Exception as e:
+        logging.error(f"Database migration failed: {e}")
+
+    logging.info("Building Search Index in the background...")
+    fuzzy_index.rebuild_in_background(get_db())
 
     logging.info("Initializing Bot Client...")
 
@@ -96,9 +108,11 @@ async def start_services():
 
 async def cleanup(web_task):
     from jackgram.utils.telegram_stream import multi_session_manager
+    from jackgram.utils.tmdb import get_tmdb
 
     await StreamBot.disconnect()
     await multi_session_manager.close_all()
+    await get_tmdb().aclose()
     web_task.cancel()
 
 
@@ -1,4 +1,3 @@
-import asyncio
 import logging
 from os import getenv
 import sys
@@ -10,7 +9,6 @@ from dotenv import load_dotenv
 from jackgram.utils.database import Database
 
 no_updates = None
-lock = asyncio.Lock()
 
 load_dotenv("config.env", override=True)
 
@@ -98,10 +96,35 @@ else:
     )
 
 TMDB_LANGUAGE = getenv("TMDB_LANGUAGE", "en-US")
+TMDB_CACHE_SIZE = int(getenv("TMDB_CACHE_SIZE", "2000"))  # in-memory entries
+TMDB_RATE_LIMIT = float(getenv("TMDB_RATE_LIMIT", "40"))  # requests per second
 BOT_LANGUAGE = getenv("BOT_LANGUAGE", "en")
 START_WELCOME_MESSAGE = getenv("START_WELCOME_MESSAGE", "")
 WORKERS = int(getenv("WORKERS", "10"))
 
+# Streaming
+CHUNK_CACHE_DIR = getenv("CHUNK_CACHE_DIR", "./cache/chunks")
+CHUNK_CACHE_SIZE_MB = int(getenv("CHUNK_CACHE_SIZE_MB", "0"))  # 0 disables the cache
+# Parts kept in flight per stream (0 = twice the connection count)
+STREAM_PREFETCH_PARTS = int(getenv("STREAM_PREFETCH_PARTS", "0"))
+# Download connections one account may hold open to one DC, across all streams
+DC_CONNECTION_BUDGET = int(getenv("DC_CONNECTION_BUDGET", "20"))
+# /dl streams served at once (0 = unlimited) and how long extra ones may queue
+STREAM_MAX_CONCURRENT = int(getenv("STREAM_MAX_CONCURRENT", "0"))
+STREAM_QUEUE_TIMEOUT = float(getenv("STREAM_QUEUE_TIMEOUT", "10"))
+# Resolved /dl metadata kept in memory between range requests
+STREAM_METADATA_CACHE_SIZE = int(getenv("STREAM_METADATA_CACHE_SIZE", "1000"))
+STREAM_METADATA_CACHE_TTL = int(getenv("STREAM_METADATA_CACHE_TTL", "1800"))
+# Telegram media info lookups (entry count, and optional file to persist them)
+MEDIA_INFO_CACHE_SIZE = int(getenv("MEDIA_INFO_CACHE_SIZE", "5000"))
+MEDIA_INFO_CACHE_FILE = getenv("MEDIA_INFO_CACHE_FILE", "")
+# Encrypted file keeping authorizations exported to foreign DCs across restarts
+AUTH_KEY_STORE_FILE = getenv("AUTH_KEY_STORE_FILE", "")
+
+# Search
+# Documents held by the in-memory fuzzy (trigram) index used by /search
+SEARCH_INDEX_MAX_ENTRIES = int(getenv("SEARCH_INDEX_MAX_ENTRIES", "100000"))
+
 # WebServer
 PORT = int(getenv("PORT", 5000))
 BASE_URL = getenv("BASE_URL")
@@ -125,6 +148,14 @@ INDEX_ALLOWED_EXTENSIONS = getenv(
     "INDEX_ALLOWED_EXTENSIONS", ""
 )  # comma-separated overrides
 
+# Indexing concurrency
+INDEX_WORKERS = int(getenv("INDEX_WORKERS", "4"))  # auto-index queue workers
+INDEX_TMDB_CONCURRENCY = int(getenv("INDEX_TMDB_CONCURRENCY", "4"))
+INDEX_DB_CONCURRENCY = int(getenv("INDEX_DB_CONCURRENCY", "4"))
+# Upper bounds in requests/second; lowered automatically after FloodWait
+INDEX_FETCH_RATE = float(getenv("INDEX_FETCH_RATE", "5"))
+INDEX_FORWARD_RATE = float(getenv("INDEX_FORWARD_RATE", "1"))
+
 StreamBot = TelegramClient(
     "stream_bot",
     api_id=API_ID,
@@ -166,6 +166,8 @@ TRANSLATIONS: Dict[str, Dict[str, str]] = {
             "  ❌ Errors: {errors}\n\n"
             "📨 Message `{current_id}` / `{last_id}`"
         ),
+        "index.pipeline_header": "\n\n⚙️ Pipeline:",
+        "index.pipeline_stage": "\n  • {stage}: {processed} done, {backlog} queued ({rate}/s)",
         "index.complete_summary": (
             "✅ **Indexing complete!**\n\n"
             "📊 **Stats:**\n"
@@ -446,6 +448,8 @@ TRANSLATIONS: Dict[str, Dict[str, str]] = {
             "  ❌ Errores: {errors}\n\n"
             "📨 Mensaje `{current_id}` / `{last_id}`"
         ),
+        "index.pipeline_header": "\n\n⚙️ Etapas:",
+        "index.pipeline_stage": "\n  • {stage}: {processed} listos, {backlog} en cola ({rate}/s)",
         "index.complete_summary": (
             "✅ **Indexacion completada!**\n\n"
             "📊 **Estadisticas:**\n"
@@ -29,7 +29,14 @@ from jackgram.bot.conversation_state import (
 from jackgram.bot.i18n import t
 from jackgram.bot.search_sessions import SearchSessionStore
 from jackgram.bot.utils import index_channel
-from jackgram.utils.telegram_stream import multi_session_manager
+from jackgram.utils.fuzzy_search import fuzzy_index, tmdb_key
+from jackgram.utils.migrations import run_migrations
+from jackgram.utils.session_health import RPC_GET_MESSAGES
+from jackgram.utils.telegram_stream import (
+    invalidate_stream_metadata,
+    multi_session_manager,
+    stream_metadata_cache,
+)
 from jackgram.utils.utils import (
     get_readable_size,
 )
@@ -221,6 +228,13 @@ def _dedupe_search_results(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
 
 
 async def _fetch_search_results(search_query: str) -> List[Dict[str, Any]]:
+    if fuzzy_index.usable:
+        # Typo-tolerant match in memory, then one batched load of the hits
+        keys = fuzzy_index.search(
+            search_query, limit=SEARCH_FETCH_PAGE_SIZE * SEARCH_MAX_FETCH_PAGES
+        )
+        return await db.get_search_documents(keys)
+
     combined: List[Dict[str, Any]] = []
     for page in range(1, SEARCH_MAX_FETCH_PAGES + 1):
         page_results, _ = await db.search_tmdb(
@@ -231,6 +245,8 @@ async def _fetch_search_results(search_query: str) -> List[Dict[str, Any]]:
         if not page_results:
             break
         combined.extend(page_results)
+        if len(page_results) < SEARCH_FETCH_PAGE_SIZE:
+            break
 
     return _dedupe_search_results(combined)
 
@@ -714,7 +730,7 @@ async def index(event):
             if client_type == "bot":
                 client = StreamBot
             elif client_type == "user":
-                client = await multi_session_manager.get_client()
+                client = await multi_session_manager.get_client(RPC_GET_MESSAGES)
             else:
                 await event.reply(t("index.invalid_client_type"))
                 return
@@ -830,7 +846,7 @@ async def index(event):
                 if client_type == "bot":
                     client = StreamBot
                 else:
-                    client = await multi_session_manager.get_client()
+                    client = await multi_session_manager.get_client(RPC_GET_MESSAGES)
 
                 await res.edit(
                     t(
@@ -878,6 +894,18 @@ async def index(event):
             pct = min(int(processed / total_range * 100), 100)
             bar_filled = pct // 5
             bar = "█" * bar_filled + "░" * (20 - bar_filled)
+            pipeline_text = ""
+            if stats.get("pipeline"):
+                pipeline_text = t("index.pipeline_header") + "".join(
+                    t(
+                        "index.pipeline_stage",
+                        stage=stage,
+                        processed=info["processed"],
+                        backlog=info["backlog"],
+                        rate=info["per_second"],
+                    )
+                    for stage, info in stats["pipeline"].items()
+                )
             try:
                 await wait_msg.edit(
                     t(
@@ -896,6 +924,7 @@ async def index(event):
                         current_id=current_id,
                         last_id=last_id,
                     )
+                    + pipeline_text
                 )
             except Exception:
                 pass  # Ignore edit failures (e.g. FloodWait)
@@ -1334,6 +1363,8 @@ async def delete(event):
         return
 
     result = await db.del_tmdb(tmdb_id=tmdb_id)
+    invalidate_stream_metadata(tmdb_id=tmdb_id)
+    fuzzy_index.remove(tmdb_key(tmdb_id))
 
     if result.deleted_count > 0:
         await event.reply(t("delete.entry_deleted"))
@@ -1393,6 +1424,8 @@ async def delete_channel_callback(event):
         await event.edit(t("delete_channel.deleting", chat_id=chat_id))
 
         stats = await db.del_by_chat_id(chat_id)
+        invalidate_stream_metadata(chat_id=chat_id)
+        fuzzy_index.rebuild_in_background(db)
 
         summary = t(
             "delete_channel.summary",
@@ -1405,13 +1438,11 @@ async def delete_channel_callback(event):
 
 @StreamBot.on(events.NewMessage(pattern=r"^/count(?: |$)", func=lambda e: e.is_private))
 async def count(event):
-    movies = await db.count_movies()
-    tv = await db.count_tv()
-    files = await db.count_media_files()
+    stats = await db.get_library_stats()
+    movies, tv, files = stats["movies"], stats["tv"], stats["media_files"]
     total = movies + tv + files
 
-    total_storage = await db.get_total_storage()
-    storage_str = get_readable_size(total_storage)
+    storage_str = get_readable_size(stats["total_size"])
 
     await event.reply(
         t(
@@ -1551,7 +1582,13 @@ async def load_database(event):
             continue
 
         collection = db.db[collection_name]
+        searchable = collection_name in (
+            db.tmdb_collection.name,
+            db.media_file_collection.name,
+        )
         for document in documents:
+            if searchable:
+                db.set_derived_fields(document)
             if "_id" in document:
                 try:
                     document["_id"] = ObjectId(document["_id"])
@@ -1566,6 +1603,10 @@ async def load_database(event):
                     upsert=True,
                 )
 
+    await db.refresh_library_stats()
+    # Resolved /dl entries may point at documents the restore replaced
+    stream_metadata_cache.clear()
+    fuzzy_index.rebuild_in_background(db)
     await event.reply(t("restore.success"))
 
 
@@ -1614,6 +1655,11 @@ async def delete_database_callback(event):
     if data.startswith("deldb_confirm:"):
         database_name = data.split(":", 1)[1]
         await db.client.drop_database(database_name)
+        # The drop took the indexes with it; add_tmdb_file relies on the
+        # unique tmdb_id index to stay correct under concurrent indexing
+        await run_migrations(db)
+        stream_metadata_cache.clear()
+        fuzzy_index.rebuild_in_background(db)
         await event.edit(t("delete_db.deleted", database_name=database_name))
 
 
@@ -1,8 +1,19 @@
 import asyncio
 import logging
+import time
 import PTN
 import traceback
-from typing import Dict, Optional
+from collections import deque
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+)
 from telethon import TelegramClient
 from telethon.tl.types import Message
 from telethon.errors import FloodWaitError
@@ -11,8 +22,17 @@ from jackgram.bot.bot import (
     INDEX_MIN_SIZE_MB,
     INDEX_ADULT_KEYWORDS,
     INDEX_ALLOWED_EXTENSIONS,
+    INDEX_DB_CONCURRENCY,
+    INDEX_FETCH_RATE,
+    INDEX_FORWARD_RATE,
+    INDEX_TMDB_CONCURRENCY,
+    INDEX_WORKERS,
 )
+from jackgram.utils.concurrency import KeyedTurnstile
+from jackgram.utils.rate_limit import AdaptiveRateLimiter
 from jackgram.utils.scraping_filters import ScrapingFilters, _parse_csv
+from jackgram.utils.session_health import RPC_GET_MESSAGES, RPC_SEND_MEDIA
+from jackgram.utils.telegram_stream import multi_session_manager
 from jackgram.utils.utils import (
     extract_file_info,
     format_filename,
@@ -39,16 +59,120 @@ scraping_filters = ScrapingFilters(
 # ── Async Queue System ──────────────────────────────────────────────────────
 index_queue = asyncio.Queue()
 
+# Stage limits shared by the queue workers and /index
+_tmdb_slots = asyncio.Semaphore(INDEX_TMDB_CONCURRENCY)
+_db_slots = asyncio.Semaphore(INDEX_DB_CONCURRENCY)
+# Files with the same parsed title are persisted in the order they arrived
+_title_order = KeyedTurnstile()
 
-async def process_index_queue():
-    """Background worker to process individual files added to the queue."""
-    logging.info("Async Indexing Queue worker started.")
+
+class IndexQueueMetrics:
+    """Counters and recent throughput of the auto-indexing queue."""
+
+    _WINDOW_SECONDS = 60
+
+    def __init__(self) -> None:
+        self.indexed = 0
+        self.skipped = 0
+        self.failed = 0
+        self.in_flight = 0
+        self._finished: Deque[float] = deque(maxlen=10000)
+
+    def record(self, outcome: str) -> None:
+        setattr(self, outcome, getattr(self, outcome) + 1)
+        self._finished.append(time.monotonic())
+
+    def stats(self) -> Dict[str, int]:
+        cutoff = time.monotonic() - self._WINDOW_SECONDS
+        return {
+            "workers": INDEX_WORKERS,
+            "queue_depth": index_queue.qsize(),
+            "in_flight": self.in_flight,
+            "indexed": self.indexed,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "per_minute": sum(1 for t in self._finished if t >= cutoff),
+        }
+
+
+index_metrics = IndexQueueMetrics()
+
+
+def _order_key(filename: str) -> str:
+    """Key grouping files that will most likely resolve to the same tmdb_id."""
+    title = PTN.parse(filename).get("title") or filename
+    return title.strip().lower()
+
+
+class EnrichedFile(NamedTuple):
+    """A file with its parsed name and TMDb details, ready to be stored."""
+
+    data: dict
+    file_info: dict
+    media_id: Optional[str]
+    media_details: Optional[dict]
+    episode_details: Optional[dict]
+
+
+async def enrich_file(message: Message, filename: str) -> EnrichedFile:
+    """Parse a file name and look it up on TMDb (bounded by the TMDb limit)."""
+    file_info = await extract_file_info(message, filename)
+
+    data: dict = PTN.parse(filename)
+    async with _tmdb_slots:
+        media_details_result = await get_media_details(data)
+
+    return EnrichedFile(
+        data=data,
+        file_info=file_info,
+        media_id=media_details_result.get("media_id"),
+        media_details=media_details_result.get("media_details"),
+        episode_details=media_details_result.get("episode_details"),
+    )
+
+
+async def persist_file(enriched: EnrichedFile) -> None:
+    """Store an enriched file (bounded by the database write limit)."""
+    data = enriched.data
+    async with _db_slots:
+        if enriched.media_id:
+            if "season" in data and "episode" in data:
+                await process_series(
+                    enriched.media_id,
+                    data,
+                    enriched.media_details,
+                    enriched.episode_details,
+                    enriched.file_info,
+                )
+            else:
+                await process_movie(
+                    enriched.media_id, enriched.media_details, enriched.file_info
+                )
+        else:
+            await process_files(enriched.file_info)
+
+
+async def index_file(
+    message: Message, filename: str, turn: Optional[Awaitable] = None
+) -> None:
+    """
+    Enrich one file that passed the scraping filters and store it.
+
+    When *turn* is given it is awaited right before the write, so callers
+    can keep writes for the same title in order.
+    """
+    enriched = await enrich_file(message, filename)
+    if turn is not None:
+        await turn
+    await persist_file(enriched)
+
+
+async def _index_queue_worker(work: asyncio.Queue) -> None:
     while True:
-        message = await index_queue.get()
+        message, filename, key, ticket = await work.get()
+        index_metrics.in_flight += 1
+        outcome = "failed"
         try:
-            title: str = get_file_title(message)
-            filename: str = format_filename(title)
-
             file_name = getattr(message.file, "name", "") or ""
             file_size = getattr(message.file, "size", 0) or 0
 
@@ -58,66 +182,50 @@ async def process_index_queue():
 
             if skip:
                 logging.info(f"Queue File Skipped: {reason} (file: {file_name})")
+                outcome = "skipped"
             else:
                 logging.info(f"Queue processing: {file_name}")
-                file_info = await extract_file_info(message, filename)
-
-                data: dict = PTN.parse(filename)
-                media_details_result = await get_media_details(data)
-
-                media_id: Optional[str] = media_details_result.get("media_id")
-                media_details: Optional[dict] = media_details_result.get(
-                    "media_details"
-                )
-                episode_details: Optional[dict] = media_details_result.get(
-                    "episode_details"
-                )
-
-                if media_id:
-                    if "season" in data and "episode" in data:
-                        await process_series(
-                            media_id,
-                            data,
-                            media_details,
-                            episode_details,
-                            file_info,
-                        )
-                    else:
-                        await process_movie(media_id, media_details, file_info)
-                else:
-                    await process_files(file_info)
-
+                await index_file(message, filename, turn=ticket)
                 logging.info(f"Queue successfully indexed: {file_name}")
+                outcome = "indexed"
 
         except Exception as e:
             logging.error(
                 f"Error in process_index_queue: {e}\n{traceback.format_exc()}"
             )
         finally:
+            _title_order.release(key, ticket)
+            index_metrics.in_flight -= 1
+            index_metrics.record(outcome)
+            work.task_done()
             index_queue.task_done()
 
 
-async def fetch_message(
-    client: TelegramClient, chat_id: int, message_id: int
-) -> Optional[Message]:
+async def process_index_queue():
+    """Dispatch queued channel posts to a pool of indexing workers."""
+    logging.info(f"Async Indexing Queue started with {INDEX_WORKERS} workers.")
+    work: asyncio.Queue = asyncio.Queue(maxsize=INDEX_WORKERS * 2)
+    workers = [
+        asyncio.create_task(_index_queue_worker(work)) for _ in range(INDEX_WORKERS)
+    ]
     try:
-        messages = await client.get_messages(chat_id, ids=[message_id])
-        if not messages:
-            return None
-
-        message = messages[0]
-        if not message:
-            return None
-
-        logging.debug(f"Fetched message: {message.id}")
-        return message
-    except FloodWaitError as e:
-        logging.warning(f"Rate limit hit. Waiting for {e.seconds} seconds.")
-        await asyncio.sleep(e.seconds)
-        return await fetch_message(client, chat_id, message_id)
-    except Exception as e:
-        logging.error(f"An unexpected error occurred: {e}")
-        return None
+        while True:
+            message = await index_queue.get()
+            try:
+                title: str = get_file_title(message)
+                filename: str = format_filename(title)
+                key = _order_key(filename)
+            except Exception as e:
+                logging.error(f"Error in process_index_queue: {e}")
+                index_metrics.record("failed")
+                index_queue.task_done()
+                continue
+            # Tickets are issued in arrival order, before any work starts
+            ticket = _title_order.ticket(key)
+            await work.put((message, filename, key, ticket))
+    finally:
+        for worker in workers:
+            worker.cancel()
 
 
 async def send_message(
@@ -128,130 +236,462 @@ async def send_message(
     )
 
 
-async def index_channel(
+# ── Channel backfill (/index) ───────────────────────────────────────────────
+
+# Shared by all /index runs so concurrent runs split one budget
+fetch_limiter = AdaptiveRateLimiter(
+    rate=INDEX_FETCH_RATE / 2, max_rate=INDEX_FETCH_RATE
+)
+forward_limiter = AdaptiveRateLimiter(
+    rate=INDEX_FORWARD_RATE, max_rate=INDEX_FORWARD_RATE
+)
+
+MAX_FETCH_BATCH = 100  # messages.getMessages accepts at most 100 ids
+
+# Called with (client, rpc type, seconds) on FloodWait; may return another
+# client to retry on at once instead of waiting out the penalty
+FloodWaitHandler = Callable[
+    [TelegramClient, str, int], Awaitable[Optional[TelegramClient]]
+]
+
+
+async def fetch_messages(
     client: TelegramClient,
     chat_id: int,
-    first_message_id: int,
-    last_message_id: int,
-    batch_size: int = 50,
-    progress_callback=None,
-    logs_channel: Optional[int] = None,
-) -> Dict[str, int]:
-    """Index a range of messages from a channel, applying scraping filters.
+    message_ids: List[int],
+    on_flood_wait: Optional[FloodWaitHandler] = None,
+) -> List[Optional[Message]]:
+    """Fetch up to 100 messages in one request, retrying after FloodWait."""
+    while True:
+        await fetch_limiter.acquire()
+        try:
+            messages = await client.get_messages(chat_id, ids=message_ids)
+        except FloodWaitError as e:
+            if on_flood_wait is not None:
+                other = await on_flood_wait(client, RPC_GET_MESSAGES, e.seconds)
+                if other is not None:
+                    client = other
+                    continue
+            fetch_limiter.on_flood_wait(e.seconds)
+            continue
+        fetch_limiter.on_success()
+        return list(messages or [None] * len(message_ids))
 
-    Returns a stats dict with counters for indexed, skipped, and errored
-    messages.
+
+async def forward_message(
+    client: TelegramClient,
+    message: Message,
+    dest_channel: int,
+    on_flood_wait: Optional[FloodWaitHandler] = None,
+) -> Message:
+    """``send_message`` paced by the shared forward limiter."""
+    while True:
+        await forward_limiter.acquire()
+        try:
+            sent = await send_message(client, message, dest_channel)
+        except FloodWaitError as e:
+            if on_flood_wait is not None:
+                other = await on_flood_wait(client, RPC_SEND_MEDIA, e.seconds)
+                if other is not None:
+                    client = other
+                    continue
+            forward_limiter.on_flood_wait(e.seconds)
+            continue
+        forward_limiter.on_success()
+        return sent
+
+
+class _SessionSwitched(Exception):
+    """A forward moved to another session; the message must be refetched."""
+
+    def __init__(self, client: TelegramClient) -> None:
+        super().__init__("session switched")
+        self.client = client
+
+
+def _skip_stat(reason: Optional[str]) -> str:
+    """Map a scraping filter reason to its /index stats counter."""
+    reason = reason or ""
+    if "too small" in reason:
+        return "skipped_size"
+    if "Adult keyword" in reason:
+        return "skipped_keyword"
+    # Multipart archives are grouped with extension/format skips
+    return "skipped_ext"
+
+
+class _Stage:
+    """Counters for one pipeline stage."""
+
+    def __init__(self, name: str, workers: int, inbox: Optional[asyncio.Queue]):
+        self.name = name
+        self.workers = workers
+        self.inbox = inbox
+        self.processed = 0
+        self.started_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = max(time.monotonic() - self.started_at, 1e-6)
+        return {
+            "workers": self.workers,
+            "processed": self.processed,
+            "backlog": self.inbox.qsize() if self.inbox is not None else 0,
+            "per_second": round(self.processed / elapsed, 2),
+        }
+
+
+class IndexPipeline:
     """
-    if logs_channel is None:
-        logs_channel = LOGS_CHANNEL
-    stats: Dict[str, int] = {
-        "indexed": 0,
-        "skipped_size": 0,
-        "skipped_keyword": 0,
-        "skipped_ext": 0,
-        "skipped_no_media": 0,
-        "errors": 0,
-    }
-
-    progress_counter = 0
-    current_message_id: int = first_message_id
-    while current_message_id <= last_message_id:
-        batch_message_ids: list[int] = list(
-            range(
-                current_message_id,
-                min(current_message_id + batch_size, last_message_id + 1),
-            )
-        )
-        for message_id in batch_message_ids:
+    Staged /index run: fetch → filter → forward → enrich → persist.
+
+    Stages are connected by bounded queues and each runs its own number of
+    workers, so slow TMDb lookups overlap Telegram forwarding and database
+    writes.  Files sharing a parsed title are still persisted in message
+    order.  Runs on a user session move to another session when theirs
+    gets a FloodWait, instead of pausing until it expires.
+
+    At most ``_MAX_IN_FLIGHT`` files are between the filter and the end of
+    their write, so a stalled database throttles forwarding and enrichment
+    instead of piling up finished payloads.
+    """
+
+    _QUEUE_SIZE = 100  # items buffered between two stages
+    _MAX_IN_FLIGHT = 2 * _QUEUE_SIZE  # filtered files not yet persisted
+    _FORWARD_WORKERS = 2  # forwards are paced by forward_limiter anyway
+
+    def __init__(
+        self,
+        client: TelegramClient,
+        chat_id: int,
+        first_message_id: int,
+        last_message_id: int,
+        batch_size: int,
+        logs_channel: int,
+        progress_callback=None,
+    ) -> None:
+        self.client = client
+        self.chat_id = chat_id
+        self.first_message_id = first_message_id
+        self.last_message_id = last_message_id
+        self.batch_size = max(1, min(batch_size, MAX_FETCH_BATCH))
+        self.logs_channel = logs_channel
+        self.progress_callback = progress_callback
+        self.stats: Dict[str, Any] = {
+            "indexed": 0,
+            "skipped_size": 0,
+            "skipped_keyword": 0,
+            "skipped_ext": 0,
+            "skipped_no_media": 0,
+            "errors": 0,
+        }
+        self.session_switches = 0
+        self._finished = 0
+        self._last_message_id_done = first_message_id
+        self._persist_tasks: set[asyncio.Task] = set()
+        self._order = KeyedTurnstile()
+        # Taken in ticket order, so a file waiting for an earlier one of the
+        # same title never holds the slot that earlier file needs
+        self._slots = asyncio.Semaphore(self._MAX_IN_FLIGHT)
+
+        def queue() -> asyncio.Queue:
+            return asyncio.Queue(maxsize=self._QUEUE_SIZE)
+
+        self._filter_q, self._forward_q, self._enrich_q = queue(), queue(), queue()
+        self._persist_q = queue()
+        self.stages = {
+            "fetch": _Stage("fetch", 1, None),
+            "filter": _Stage("filter", 1, self._filter_q),
+            "forward": _Stage("forward", self._FORWARD_WORKERS, self._forward_q),
+            "enrich": _Stage("enrich", INDEX_TMDB_CONCURRENCY, self._enrich_q),
+            "persist": _Stage("persist", INDEX_DB_CONCURRENCY, self._persist_q),
+        }
+
+    def stage_stats(self) -> Dict[str, Dict[str, Any]]:
+        stats = {name: stage.stats() for name, stage in self.stages.items()}
+        # Files enriched but waiting for an earlier file of the same title
+        stats["persist"]["backlog"] += len(self._persist_tasks)
+        return stats
+
+    async def _finish(self, message_id: int, outcome: str) -> None:
+        """Record the final outcome of one message and report progress."""
+        self.stats[outcome] += 1
+        self._finished += 1
+        self._last_message_id_done = max(self._last_message_id_done, message_id)
+        if self.progress_callback and self._finished % 25 == 0:
+            self.stats["pipeline"] = self.stage_stats()
             try:
-                orig_message: Optional[Message] = await fetch_message(
-                    client, chat_id, message_id
+                await self.progress_callback(self.stats, self._last_message_id_done)
+            except Exception as e:
+                logging.debug(f"Index progress callback failed: {e}")
+
+    async def _on_flood_wait(
+        self, client: TelegramClient, rpc: str, seconds: int
+    ) -> Optional[TelegramClient]:
+        """Quarantine a flood-waited user session and continue on another one."""
+        if not multi_session_manager.owns(client):
+            return None  # the bot account has no alternative
+        multi_session_manager.record_flood_wait(client, rpc, seconds)
+        if self.client is not client and multi_session_manager.owns(self.client):
+            return self.client  # another stage already moved the run
+        try:
+            other = await multi_session_manager.get_client(rpc)
+            # The new session must see both the source and the logs channel
+            for peer in (self.chat_id, self.logs_channel):
+                await other.get_input_entity(peer)
+        except FloodWaitError:
+            return None
+        except Exception as e:
+            logging.warning(f"/index: no other session to switch to: {e}")
+            return None
+        logging.info(f"/index: FloodWait of {seconds}s on {rpc}, switching session")
+        self.session_switches += 1
+        self.client = other
+        return other
+
+    async def _on_forward_flood_wait(
+        self, client: TelegramClient, rpc: str, seconds: int
+    ) -> Optional[TelegramClient]:
+        other = await self._on_flood_wait(client, rpc, seconds)
+        if other is not None and other is not client:
+            # Peer and media references (access_hash, file_reference) belong
+            # to the account that fetched the message: the caller refetches
+            raise _SessionSwitched(other)
+        return other
+
+    def _release(self, key, ticket) -> None:
+        """A filtered file left the pipeline: open its successor and a slot."""
+        self._order.release(key, ticket)
+        self._slots.release()
+
+    async def _fetch(self) -> None:
+        stage = self.stages["fetch"]
+        current_message_id = self.first_message_id
+        while current_message_id <= self.last_message_id:
+            batch_message_ids = list(
+                range(
+                    current_message_id,
+                    min(current_message_id + self.batch_size, self.last_message_id + 1),
                 )
+            )
+            current_message_id += self.batch_size
+            # The messages are forwarded by the account that fetched them
+            source = self.client
+
+            async def on_flood_wait(client, rpc, seconds):
+                nonlocal source
+                other = await self._on_flood_wait(client, rpc, seconds)
+                if other is not None:
+                    source = other
+                return other
 
+            try:
+                batch = await fetch_messages(
+                    source,
+                    self.chat_id,
+                    batch_message_ids,
+                    on_flood_wait=on_flood_wait,
+                )
+            except Exception as e:
+                logging.error(
+                    f"Error fetching messages {batch_message_ids[0]}-"
+                    f"{batch_message_ids[-1]}: {e}"
+                )
+                for message_id in batch_message_ids:
+                    await self._finish(message_id, "errors")
+                continue
+            for message_id, message in zip(batch_message_ids, batch):
+                stage.processed += 1
+                await self._filter_q.put((message_id, message, source))
+
+    async def _filter(self) -> None:
+        stage = self.stages["filter"]
+        while True:
+            item = await self._filter_q.get()
+            if item is None:
+                return
+            message_id, message, source = item
+            stage.processed += 1
+            try:
                 # Only process documents and videos
-                if not orig_message or not (
-                    orig_message.document or getattr(orig_message, "video", None)
+                if not message or not (
+                    message.document or getattr(message, "video", None)
                 ):
-                    stats["skipped_no_media"] += 1
-                    await asyncio.sleep(1)
-                    progress_counter += 1
-                    if progress_callback and progress_counter % 25 == 0:
-                        await progress_callback(stats, message_id)
+                    await self._finish(message_id, "skipped_no_media")
                     continue
 
-                title: str = get_file_title(orig_message)
-                filename: str = format_filename(title)
-
-                # ── Apply scraping filters ──────────────────────────
-                file_name = getattr(orig_message.file, "name", "") or ""
-                file_size = getattr(orig_message.file, "size", 0) or 0
-
+                filename: str = format_filename(get_file_title(message))
+                file_name = getattr(message.file, "name", "") or ""
+                file_size = getattr(message.file, "size", 0) or 0
                 skip, reason = scraping_filters.should_skip(
                     filename=file_name, file_size=file_size
                 )
                 if skip:
                     logging.info(
-                        f"Skipped message {message_id}: {reason} "
-                        f"(file: {file_name})"
+                        f"Skipped message {message_id}: {reason} (file: {file_name})"
                     )
-                    # Categorise the skip reason for stats
-                    if "too small" in (reason or ""):
-                        stats["skipped_size"] += 1
-                    elif "Adult keyword" in (reason or ""):
-                        stats["skipped_keyword"] += 1
-                    elif "extension" in (reason or "").lower():
-                        stats["skipped_ext"] += 1
-                    elif "Multipart" in (reason or ""):
-                        stats[
-                            "skipped_ext"
-                        ] += 1  # Group multipart skip as extension/format skip
-                    await asyncio.sleep(1)
-                    progress_counter += 1
-                    if progress_callback and progress_counter % 25 == 0:
-                        await progress_callback(stats, message_id)
+                    await self._finish(message_id, _skip_stat(reason))
                     continue
-                # ────────────────────────────────────────────────────
 
-                # Forward message to selected logs_channel only if it passed all filters!
-                message = await send_message(client, orig_message, logs_channel)
-
-                file_info = await extract_file_info(message, filename)
-
-                data: dict = PTN.parse(filename)
-                media_details_result = await get_media_details(data)
+                # Tickets are issued in message order, before any work starts
+                key = _order_key(filename)
+                ticket = self._order.ticket(key)
+            except Exception as e:
+                logging.error(f"Error indexing message {message_id}: {e}")
+                await self._finish(message_id, "errors")
+                continue
+            await self._slots.acquire()
+            await self._forward_q.put(
+                (message_id, message, source, filename, key, ticket)
+            )
 
-                media_id: Optional[str] = media_details_result.get("media_id")
-                media_details: Optional[dict] = media_details_result.get(
-                    "media_details"
+    async def _forward(self) -> None:
+        stage = self.stages["forward"]
+        while True:
+            item = await self._forward_q.get()
+            if item is None:
+                return
+            message_id, message, source, filename, key, ticket = item
+            try:
+                # Forward to the logs channel only after the filters passed
+                forwarded = await self._forward_one(message_id, message, source)
+            except Exception as e:
+                logging.error(f"Error forwarding message {message_id}: {e}")
+                self._release(key, ticket)
+                await self._finish(message_id, "errors")
+                continue
+            stage.processed += 1
+            await self._enrich_q.put((message_id, forwarded, filename, key, ticket))
+
+    async def _forward_one(
+        self, message_id: int, message: Message, client: TelegramClient
+    ) -> Message:
+        """Forward *message* with *client*, refetching it if the session moves."""
+        while True:
+            try:
+                return await forward_message(
+                    client,
+                    message,
+                    self.logs_channel,
+                    on_flood_wait=self._on_forward_flood_wait,
                 )
-                episode_details: Optional[dict] = media_details_result.get(
-                    "episode_details"
+            except _SessionSwitched as e:
+                client = e.client
+            (message,) = await fetch_messages(client, self.chat_id, [message_id])
+            if message is None:
+                raise RuntimeError(f"Message {message_id} is gone")
+
+    async def _enrich(self) -> None:
+        stage = self.stages["enrich"]
+        while True:
+            item = await self._enrich_q.get()
+            if item is None:
+                return
+            message_id, message, filename, key, ticket = item
+            try:
+                enriched = await enrich_file(message, filename)
+            except Exception as e:
+                logging.error(f"Error indexing message {message_id}: {e}")
+                self._release(key, ticket)
+                await self._finish(message_id, "errors")
+                continue
+            stage.processed += 1
+            await self._persist_q.put((message_id, enriched, key, ticket))
+
+    async def _persist_one(self, message_id, enriched, key, ticket) -> None:
+        try:
+            await ticket
+            await persist_file(enriched)
+            self.stages["persist"].processed += 1
+            outcome = "indexed"
+        except Exception as e:
+            logging.error(f"Error indexing message {message_id}: {e}")
+            outcome = "errors"
+        finally:
+            self._release(key, ticket)
+        await self._finish(message_id, outcome)
+
+    async def _persist(self) -> None:
+        # Waiting for a ticket must not occupy a write slot, or files of one
+        # title could block every slot while their predecessor is still
+        # upstream: each file gets its own task, and persist_file bounds the
+        # actual writes.  The number of such tasks is bounded by ``_slots``.
+        while True:
+            item = await self._persist_q.get()
+            if item is None:
+                break
+            task = asyncio.create_task(self._persist_one(*item))
+            self._persist_tasks.add(task)
+            task.add_done_callback(self._persist_tasks.discard)
+        if self._persist_tasks:
+            await asyncio.gather(*self._persist_tasks)
+
+    async def run(self) -> Dict[str, Any]:
+        async def fetch_then_close():
+            try:
+                await self._fetch()
+            finally:
+                await self._filter_q.put(None)
+
+        async def stage(worker, count, downstream, downstream_count):
+            await asyncio.gather(*(worker() for _ in range(count)))
+            for _ in range(downstream_count):
+                await downstream.put(None)
+
+        tasks = [
+            asyncio.create_task(fetch_then_close()),
+            asyncio.create_task(
+                stage(self._filter, 1, self._forward_q, self._FORWARD_WORKERS)
+            ),
+            asyncio.create_task(
+                stage(
+                    self._forward,
+                    self._FORWARD_WORKERS,
+                    self._enrich_q,
+                    INDEX_TMDB_CONCURRENCY,
                 )
+            ),
+            asyncio.create_task(
+                stage(self._enrich, INDEX_TMDB_CONCURRENCY, self._persist_q, 1)
+            ),
+            asyncio.create_task(self._persist()),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks + list(self._persist_tasks):
+                task.cancel()
+        self.stats["pipeline"] = self.stage_stats()
+        self.stats["session_switches"] = self.session_switches
+        return self.stats
 
-                if media_id:
-                    if "season" in data and "episode" in data:
-                        await process_series(
-                            media_id,
-                            data,
-                            media_details,
-                            episode_details,
-                            file_info,
-                        )
-                    else:
-                        await process_movie(media_id, media_details, file_info)
-                else:
-                    await process_files(file_info)
-
-                stats["indexed"] += 1
-                await asyncio.sleep(1)
-
-                progress_counter += 1
-                if progress_callback and progress_counter % 25 == 0:
-                    await progress_callback(stats, message_id)
 
-            except Exception as e:
-                logging.error(f"Error indexing message {message_id}: {e}")
-                stats["errors"] += 1
-        current_message_id += batch_size
+async def index_channel(
+    client: TelegramClient,
+    chat_id: int,
+    first_message_id: int,
+    last_message_id: int,
+    batch_size: int = MAX_FETCH_BATCH,
+    progress_callback=None,
+    logs_channel: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Index a range of messages from a channel, applying scraping filters.
 
-    return stats
+    Runs an ``IndexPipeline``: messages are fetched ``batch_size`` (at most
+    100) ids per request and flow through filter, forward, TMDb enrichment
+    and database stages concurrently.
+
+    Returns a stats dict with counters for indexed, skipped, and errored
+    messages, plus per-stage throughput and backlog under ``"pipeline"``.
+    """
+    if logs_channel is None:
+        logs_channel = LOGS_CHANNEL
+    pipeline = IndexPipeline(
+        client,
+        chat_id,
+        first_message_id,
+        last_message_id,
+        batch_size=batch_size,
+        logs_channel=logs_channel,
+        progress_callback=progress_callback,
+    )
+    return await pipeline.run()
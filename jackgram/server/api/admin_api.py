@@ -19,6 +19,9 @@ from jackgram.bot.bot import (
     AUTH_USERS,
     SECRET_KEY,
 )
+from jackgram.utils.fuzzy_search import fuzzy_index, raw_key, tmdb_key
+from jackgram.utils.pagination import InvalidCursor, next_cursor
+from jackgram.utils.telegram_stream import invalidate_stream_metadata
 
 admin_routes = APIRouter(prefix="/admin")
 db = get_db()
@@ -27,9 +30,26 @@ db = get_db()
 def _clean(doc: Dict[str, Any]) -> Dict[str, Any]:
     """Remove MongoDB ObjectId so the document is JSON-serialisable."""
     doc.pop("_id", None)
+    doc.pop("title_tokens", None)
+    doc.pop("search_tokens", None)
     return doc
 
 
+async def _listing(fetch, field: str, page: int, per_page: int, cursor, total: int):
+    """Run a paged listing query and wrap it with page and cursor metadata."""
+    try:
+        data = await fetch(page=page, per_page=per_page, cursor=cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "page": page,
+        "per_page": per_page,
+        "total": total,
+        "next_cursor": next_cursor(data, per_page, field),
+        "results": [_clean(d) for d in data],
+    }
+
+
 # ---------------------------------------------------------------------------
 # Auth / Login
 # ---------------------------------------------------------------------------
@@ -80,15 +100,12 @@ async def admin_logout():
 
 @admin_routes.get("/stats")
 async def get_stats():
-    movies = await db.count_movies()
-    tv = await db.count_tv()
-    files = await db.count_media_files()
-    storage = await db.get_total_storage()
+    stats = await db.get_library_stats()
     return {
-        "movies": movies,
-        "tv_shows": tv,
-        "raw_files": files,
-        "total_storage_bytes": storage,
+        "movies": stats["movies"],
+        "tv_shows": stats["tv"],
+        "raw_files": stats["media_files"],
+        "total_storage_bytes": stats["total_size"],
     }
 
 
@@ -111,17 +128,16 @@ async def list_movies(
     per_page: int = Query(20, ge=1, le=100),
     sort_by: str = Query("date", pattern="^(date|title|rating|size)$"),
     sort_order: str = Query("desc", pattern="^(asc|desc)$"),
+    cursor: Optional[str] = Query(None),
 ):
-    data = await db.get_movies(
-        page=page, per_page=per_page, sort_by=sort_by, sort_order=sort_order
+    return await _listing(
+        lambda **kw: db.get_movies(sort_by=sort_by, sort_order=sort_order, **kw),
+        db.sort_field(sort_by),
+        page,
+        per_page,
+        cursor,
+        (await db.get_library_stats())["movies"],
     )
-    total = await db.count_movies()
-    return {
-        "page": page,
-        "per_page": per_page,
-        "total": total,
-        "results": [_clean(d) for d in data],
-    }
 
 
 @admin_routes.get("/movies/{tmdb_id}")
@@ -145,7 +161,11 @@ async def update_movie(tmdb_id: int, payload: MovieUpdate):
         raise HTTPException(status_code=400, detail="No fields to update")
 
     existing.update(update_fields)
+    db.set_derived_fields(existing)
     await db.tmdb_collection.replace_one({"tmdb_id": tmdb_id}, existing)
+    fuzzy_index.add(
+        tmdb_key(tmdb_id), existing.get("title"), existing.get("original_title")
+    )
     return _clean(existing)
 
 
@@ -155,6 +175,8 @@ async def delete_movie(tmdb_id: int):
     if not existing or existing.get("type") != "movie":
         raise HTTPException(status_code=404, detail="Movie not found")
     await db.del_tmdb(tmdb_id)
+    invalidate_stream_metadata(tmdb_id=tmdb_id)
+    fuzzy_index.remove(tmdb_key(tmdb_id))
     return {"deleted": True, "tmdb_id": tmdb_id}
 
 
@@ -176,17 +198,16 @@ async def list_tv(
     per_page: int = Query(20, ge=1, le=100),
     sort_by: str = Query("date", pattern="^(date|title|rating)$"),
     sort_order: str = Query("desc", pattern="^(asc|desc)$"),
+    cursor: Optional[str] = Query(None),
 ):
-    data = await db.get_tv(
-        page=page, per_page=per_page, sort_by=sort_by, sort_order=sort_order
+    return await _listing(
+        lambda **kw: db.get_tv(sort_by=sort_by, sort_order=sort_order, **kw),
+        db.sort_field(sort_by),
+        page,
+        per_page,
+        cursor,
+        (await db.get_library_stats())["tv"],
     )
-    total = await db.count_tv()
-    return {
-        "page": page,
-        "per_page": per_page,
-        "total": total,
-        "results": [_clean(d) for d in data],
-    }
 
 
 @admin_routes.get("/tv/{tmdb_id}")
@@ -210,7 +231,11 @@ async def update_tv_show(tmdb_id: int, payload: TVUpdate):
         raise HTTPException(status_code=400, detail="No fields to update")
 
     existing.update(update_fields)
+    db.set_derived_fields(existing)
     await db.tmdb_collection.replace_one({"tmdb_id": tmdb_id}, existing)
+    fuzzy_index.add(
+        tmdb_key(tmdb_id), existing.get("title"), existing.get("original_title")
+    )
     return _clean(existing)
 
 
@@ -220,6 +245,8 @@ async def delete_tv_show(tmdb_id: int):
     if not existing or existing.get("type") != "tv":
         raise HTTPException(status_code=404, detail="TV show not found")
     await db.del_tmdb(tmdb_id)
+    invalidate_stream_metadata(tmdb_id=tmdb_id)
+    fuzzy_index.remove(tmdb_key(tmdb_id))
     return {"deleted": True, "tmdb_id": tmdb_id}
 
 
@@ -230,16 +257,18 @@ async def delete_tv_show(tmdb_id: int):
 
 @admin_routes.get("/files")
 async def list_files(
-    page: int = Query(1, ge=1), per_page: int = Query(20, ge=1, le=100)
+    page: int = Query(1, ge=1),
+    per_page: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
 ):
-    data = await db.get_media_files(page=page, per_page=per_page)
-    total = await db.count_media_files()
-    return {
-        "page": page,
-        "per_page": per_page,
-        "total": total,
-        "results": [_clean(d) for d in data],
-    }
+    return await _listing(
+        db.get_media_files,
+        "_id",
+        page,
+        per_page,
+        cursor,
+        (await db.get_library_stats())["media_files"],
+    )
 
 
 @admin_routes.delete("/files/{file_hash}")
@@ -248,6 +277,8 @@ async def delete_file(file_hash: str):
     if not existing:
         raise HTTPException(status_code=404, detail="File not found")
     await db.del_media_file(file_hash)
+    invalidate_stream_metadata(hash=file_hash)
+    fuzzy_index.remove(raw_key(file_hash))
     return {"deleted": True, "hash": file_hash}
 
 
@@ -405,18 +436,23 @@ async def session_verify_code(payload: SessionVerifyCodePayload):
 # System Health & Bot Load Dashboard
 # ---------------------------------------------------------------------------
 
-from jackgram.server.routes import active_streams
-from jackgram.utils.telegram_stream import multi_session_manager
+from jackgram.server.routes import active_streams, stream_admission
+from jackgram.utils.telegram_stream import (
+    chunk_cache,
+    connection_budget,
+    multi_session_manager,
+    stream_controller,
+    stream_metadata_cache,
+)
+from jackgram.utils.stream_broadcast import stream_broadcaster
+from jackgram.bot.utils import index_metrics
+from jackgram.utils.tmdb import get_tmdb
 
 
 @admin_routes.get("/system-stats")
 async def get_system_stats():
-    clients = []
-    # Count connected sessions and their DC id safely
-    for client in multi_session_manager._clients:
-        is_conn = client.is_connected()
-        dc_id = getattr(client.session, "dc_id", 0) if is_conn else 0
-        clients.append({"connected": is_conn, "dc_id": dc_id})
+    # Connection state, DC id and live health score of every session
+    clients = multi_session_manager.session_stats()
 
     return {
         "clients_total": len(multi_session_manager._clients),
@@ -424,6 +460,19 @@ async def get_system_stats():
         "clients_info": clients,
         "active_streams": list(active_streams.values()),
         "cache_size": len(multi_session_manager._media_info_cache),
+        "media_info_cache": multi_session_manager._media_info_cache.stats(),
+        "sender_pool": multi_session_manager._sender_pool.stats(),
+        "dc_affinity": multi_session_manager.dc_affinity_stats(),
+        "connection_budget": connection_budget.stats(),
+        "stream_admission": stream_admission.stats(),
+        "chunk_cache": chunk_cache.stats(),
+        "broadcast": stream_broadcaster.stats(),
+        "stream_controller": stream_controller.stats(),
+        "stream_metadata_cache": stream_metadata_cache.stats(),
+        "indexing": index_metrics.stats(),
+        "tmdb_cache": get_tmdb().cache.stats(),
+        "tmdb_http": get_tmdb().stats(),
+        "search_index": fuzzy_index.stats(),
     }
 
 
@@ -473,4 +522,5 @@ async def delete_api_user(token: str):
 @admin_routes.post("/system-stats/clear-cache")
 async def clear_system_cache():
     multi_session_manager._media_info_cache.clear()
+    stream_metadata_cache.clear()
     return {"status": "ok", "cleared": True}
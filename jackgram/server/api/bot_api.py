@@ -1,6 +1,7 @@
 import logging
 import jwt
-from fastapi import APIRouter, HTTPException, Query, Depends, Request
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Depends, Request, Response
 from jackgram.bot.bot import get_db, USE_TOKEN_SYSTEM, SECRET_KEY
 from jackgram.utils.utils import (
     extract_media_file_raw,
@@ -11,11 +12,29 @@ from jackgram.utils.utils import (
     generate_stream_url_file,
 )
 
+from jackgram.utils.pagination import InvalidCursor, next_cursor
+
 stream_routes = APIRouter(prefix="/stream")
 search_routes = APIRouter(prefix="")  # No prefix for search routes
 
 db = get_db()
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+LATEST_PER_PAGE = 12
+FILES_PER_PAGE = 11
+
+
+async def _fetch_page(response: Response, fetch, per_page: int, **kwargs):
+    """Run a listing query, exposing the next page's cursor in a header."""
+    try:
+        data = await fetch(per_page=per_page, **kwargs)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    cursor = next_cursor(data, per_page, "_id")
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+    return data
+
 
 async def verify_api_token(request: Request, token: str = None):
     if not USE_TOKEN_SYSTEM:
@@ -59,11 +78,23 @@ async def verify_api_token(request: Request, token: str = None):
 
 
 @stream_routes.get("/movies/latest")
-async def stream_latest_movies(page: int = Query(1), _=Depends(verify_api_token)):
+async def stream_latest_movies(
+    response: Response,
+    page: int = Query(1),
+    cursor: Optional[str] = Query(None),
+    _=Depends(verify_api_token),
+):
     if page < 1:
         raise HTTPException(status_code=400, detail="Page must be positive integers")
 
-    data = await db.get_tmdb_latest(media_type="movie", page=page)
+    data = await _fetch_page(
+        response,
+        db.get_tmdb_latest,
+        LATEST_PER_PAGE,
+        media_type="movie",
+        page=page,
+        cursor=cursor,
+    )
 
     if data is None:
         raise HTTPException(status_code=404, detail="Item not found")
@@ -76,11 +107,23 @@ async def stream_latest_movies(page: int = Query(1), _=Depends(verify_api_token)
 
 
 @stream_routes.get("/series/latest")
-async def stream_latest_series(page: int = Query(1), _=Depends(verify_api_token)):
+async def stream_latest_series(
+    response: Response,
+    page: int = Query(1),
+    cursor: Optional[str] = Query(None),
+    _=Depends(verify_api_token),
+):
     if page < 1:
         raise HTTPException(status_code=400, detail="Page must be positive integers")
 
-    data = await db.get_tmdb_latest(media_type="tv", page=page)
+    data = await _fetch_page(
+        response,
+        db.get_tmdb_latest,
+        LATEST_PER_PAGE,
+        media_type="tv",
+        page=page,
+        cursor=cursor,
+    )
 
     if data is None:
         raise HTTPException(status_code=404, detail="Item not found")
@@ -94,12 +137,18 @@ async def stream_latest_series(page: int = Query(1), _=Depends(verify_api_token)
 
 @stream_routes.get("/files")
 async def stream_files(
-    request: Request, page: int = Query(1), _=Depends(verify_api_token)
+    request: Request,
+    response: Response,
+    page: int = Query(1),
+    cursor: Optional[str] = Query(None),
+    _=Depends(verify_api_token),
 ):
     if page < 1:
         raise HTTPException(status_code=400, detail="Page must be positive integers")
 
-    data = await db.get_media_files(page=page)
+    data = await _fetch_page(
+        response, db.get_media_files, FILES_PER_PAGE, page=page, cursor=cursor
+    )
     if data is None:
         raise HTTPException(status_code=404, detail="Item not found")
 
@@ -1,9 +1,17 @@
 from fastapi import APIRouter, HTTPException
 from jackgram.bot.bot import get_db, BASE_URL, USE_TOKEN_SYSTEM
+from jackgram.utils.cache import TTLCache
+from jackgram.utils.pagination import next_cursor
 
 stremio_routes = APIRouter(prefix="/stremio")
 db = get_db()
 
+CATALOG_PAGE_SIZE = 25
+# Stremio pages catalogs with ``skip=``; remember where each served page
+# ended so the next request continues from a cursor instead of skipping.
+# (catalog id, media type, other extras, skip) -> cursor
+_catalog_cursors: TTLCache[str] = TTLCache(max_entries=2000, ttl=600)
+
 
 # ------------- Token validation helper for Stremio routes -------------
 
@@ -69,7 +77,9 @@ async def get_catalog(token: str, type: str, id: str, extra: str = None):
 
     jackgram_type = "movie" if type == "movie" else "tv"
 
-    page = 1
+    skip = 0
+    # Extras other than skip (search, genre, ...) select a different listing
+    others = []
     if extra:
         from urllib.parse import unquote
 
@@ -77,12 +87,25 @@ async def get_catalog(token: str, type: str, id: str, extra: str = None):
         for part in extra.split("&"):
             if part.startswith("skip="):
                 try:
-                    skip = int(part.split("=")[1])
-                    page = (skip // 25) + 1
+                    skip = max(0, int(part.split("=")[1]))
                 except ValueError:
                     pass
-
-    data = await db.get_tmdb_latest(media_type=jackgram_type, page=page, per_page=25)
+            elif part:
+                others.append(part)
+    catalog = (id, jackgram_type, "&".join(sorted(others)))
+
+    # Without a cursor (first page, expired entry, or a skip this process did
+    # not serve) the page falls back to offset pagination
+    cursor = _catalog_cursors.get((*catalog, skip)) if skip else None
+    data = await db.get_tmdb_latest(
+        media_type=jackgram_type,
+        page=(skip // CATALOG_PAGE_SIZE) + 1,
+        per_page=CATALOG_PAGE_SIZE,
+        cursor=cursor,
+    )
+    following = next_cursor(data, CATALOG_PAGE_SIZE, "_id")
+    if following:
+        _catalog_cursors.set((*catalog, skip + len(data)), following)
 
     if not data:
         return {"metas": []}
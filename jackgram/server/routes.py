@@ -6,25 +6,36 @@ import traceback
 
 from fastapi import APIRouter, HTTPException, Query, Request, Response
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from jackgram.bot.bot import StreamBot, get_db
 from jackgram.server.exceptions import FileNotFound, InvalidHash
 
 import uuid
 import time
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
-from jackgram.bot.bot import USE_TOKEN_SYSTEM
+from jackgram.bot.bot import (
+    STREAM_MAX_CONCURRENT,
+    STREAM_QUEUE_TIMEOUT,
+    USE_TOKEN_SYSTEM,
+)
 from fastapi import Depends
 from jackgram.server.api.bot_api import verify_api_token
+from jackgram.utils.concurrency import Admission, AdmissionQueue, AdmissionRejected
 from jackgram.utils.file_properties import get_file_info_dict
 from jackgram.utils.telegram_stream import (
     multi_session_manager,
+    StreamMetadata,
     TelegramMediaRef,
-    ParallelTransferrer,
+    invalidate_stream_metadata,
+    stream_metadata_cache,
 )
+from jackgram.utils.stream_broadcast import stream_broadcaster
 
 active_streams: Dict[str, Dict[str, Any]] = {}
 background_tasks = set()
+# /dl streams beyond STREAM_MAX_CONCURRENT wait here, then get a 503
+stream_admission = AdmissionQueue(STREAM_MAX_CONCURRENT, STREAM_QUEUE_TIMEOUT)
 
 from telethon.errors import (
     FloodWaitError,
@@ -66,7 +77,22 @@ async def stream_handler(
     _=Depends(verify_api_token),
 ):
     try:
-        return await media_streamer(request, hash, download)
+        admission = (
+            await stream_admission.acquire() if request.method == "GET" else None
+        )
+        try:
+            return await media_streamer(request, hash, download, admission)
+        except BaseException:
+            # Once the response is returned, the stream releases the slot
+            if admission is not None:
+                admission.release()
+            raise
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many streams in progress. Please retry shortly.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
     except InvalidHash as e:
         raise HTTPException(status_code=403, detail=e.message)
     except FileNotFound as e:
@@ -85,6 +111,7 @@ async def stream_handler(
             status_code=403, detail="Access denied to this chat/channel."
         )
     except FileReferenceExpiredError as e:
+        invalidate_stream_metadata(hash=hash)
         raise HTTPException(
             status_code=410, detail="File reference expired or inaccessible."
         )
@@ -95,14 +122,32 @@ async def stream_handler(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-async def media_streamer(request: Request, secure_hash: str, as_download: bool = False):
+async def media_streamer(
+    request: Request,
+    secure_hash: str,
+    as_download: bool = False,
+    admission: Optional[Admission] = None,
+):
     """
     Handles streaming media files based on a secure hash and HTTP Range requests.
+
+    *admission* is the stream's slot in ``stream_admission``; it is released
+    when the response body finishes.
     """
     range_header = request.headers.get("Range")
     logging.info(f"Range header: {range_header}")
 
-    media_dict = await get_file_info_dict(request, secure_hash)
+    # Players issue many range requests per file: reuse the resolved metadata
+    cache_key = (
+        secure_hash,
+        request.query_params.get("tmdb_id"),
+        request.query_params.get("file_id"),
+    )
+    metadata = stream_metadata_cache.get(cache_key)
+    if metadata is not None:
+        media_dict = metadata.media
+    else:
+        media_dict = await get_file_info_dict(request, secure_hash)
     if not media_dict:
         raise FileNotFound
 
@@ -134,14 +179,24 @@ async def media_streamer(request: Request, secure_hash: str, as_download: bool =
     from_bytes, until_bytes = parse_range_header(range_header, file_size)
     req_length = until_bytes - from_bytes + 1
 
-    # Initialize MultiSessionManager to get client client and reference
-    client = await multi_session_manager.get_client()
-    ref = TelegramMediaRef(chat_id=chat_id, message_id=message_id)
+    if metadata is None:
+        ref = TelegramMediaRef(chat_id=chat_id, message_id=message_id)
 
-    # Pre-validate file access
-    file_location, dc_id, actual_size_res = (
-        await multi_session_manager._resolve_file_location(ref, file_size)
-    )
+        # Pre-validate file access
+        file_location, dc_id, actual_size_res = (
+            await multi_session_manager._resolve_file_location(ref, file_size)
+        )
+        tmdb_id = media_dict.get("tmdb_id") or request.query_params.get("tmdb_id")
+        metadata = StreamMetadata(
+            media=media_dict,
+            file_location=file_location,
+            dc_id=dc_id,
+            file_size=file_size,
+            tmdb_id=int(tmdb_id) if tmdb_id else None,
+        )
+        stream_metadata_cache.set(cache_key, metadata)
+
+    file_location, dc_id = metadata.file_location, metadata.dc_id
 
     # Cancel event: set when client disconnects so the download engine aborts fast
     cancel_event = asyncio.Event()
@@ -202,6 +257,9 @@ async def media_streamer(request: Request, secure_hash: str, as_download: bool =
                     last_bytes = active_streams[stream_id]["bytes_sent"]
                 yield chunk
         except (Exception, asyncio.CancelledError) as e:
+            if isinstance(e, FileReferenceExpiredError):
+                # The cached location is stale: resolve it again next time
+                invalidate_stream_metadata(hash=secure_hash)
             logging.info(f"Stream {stream_id} ended: {type(e).__name__}")
         finally:
             # Signal cancellation and stop the disconnect watcher
@@ -221,7 +279,6 @@ async def media_streamer(request: Request, secure_hash: str, as_download: bool =
                     await generator_body.aclose()
                 except Exception:
                     pass
-                await transferrer._cleanup()
                 logging.debug(f"Stream {stream_id}: MTProto connections cleaned up")
 
             task = asyncio.create_task(_do_cleanup())
@@ -229,13 +286,15 @@ async def media_streamer(request: Request, secure_hash: str, as_download: bool =
             task.add_done_callback(background_tasks.discard)
 
             active_streams.pop(stream_id, None)
+            if admission is not None:
+                admission.release()
             logging.debug(f"Stream {stream_id} removed from active_streams")
 
-    # Stream the file using ParallelTransferrer
-    transferrer = ParallelTransferrer(multi_session_manager, dc_id=dc_id)
-    generator_body = transferrer.download(
+    # Stream the file, sharing the upstream download with concurrent viewers
+    generator_body = stream_broadcaster.stream(
         file=file_location,
         file_size=file_size,
+        dc_id=dc_id,
         offset=from_bytes,
         limit=req_length,
         cancel_event=cancel_event,
@@ -259,5 +318,9 @@ async def media_streamer(request: Request, secure_hash: str, as_download: bool =
     logging.info(f"Content-Length: {req_length}")
 
     return StreamingResponse(
-        content=body, status_code=206 if range_header else 200, headers=headers
+        content=body,
+        status_code=206 if range_header else 200,
+        headers=headers,
+        # Also frees the slot if the body is never iterated
+        background=BackgroundTask(admission.release) if admission else None,
     )
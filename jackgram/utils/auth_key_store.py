@@ -0,0 +1,168 @@
+"""
+Authorization keys exported by each session to foreign DCs.
+
+Downloading a file that lives on another DC than the session's home DC
+needs an ``auth.exportAuthorization`` / ``auth.importAuthorization`` round
+trip, which yields a separate auth key for that DC.  ``AuthKeyStore`` keeps
+those keys per (account, DC) for every sender creation path and, when given
+a file, across restarts.
+
+On disk every key is encrypted (AES-256-IGE) and authenticated (HMAC-SHA256)
+with keys derived from the owning session's own auth key, so the file is
+useless without the session strings.  Entries are decrypted lazily, the
+first time their session asks for them.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+from typing import Any, Dict, Optional, Tuple
+
+from telethon.crypto import AES, AuthKey
+
+from jackgram.bot.bot import AUTH_KEY_STORE_FILE
+
+logger = logging.getLogger(__name__)
+
+_FORMAT_VERSION = 1
+
+
+def account_id(client) -> str:
+    """Stable identifier of the account behind *client* (its home auth key)."""
+    return hashlib.sha256(client.session.auth_key.key).hexdigest()[:16]
+
+
+def _derive(client, purpose: bytes) -> bytes:
+    seed = b"jackgram-auth-key-store:" + purpose + client.session.auth_key.key
+    return hashlib.sha256(seed).digest()
+
+
+class AuthKeyStore:
+    """(account, DC) -> exported ``AuthKey``, optionally persisted to *path*."""
+
+    def __init__(self, path: str = "") -> None:
+        self.path = path
+        self._keys: Dict[Tuple[str, int], AuthKey] = {}
+        # Encrypted entries read from disk: account -> DC -> sealed entry
+        self._sealed: Dict[str, Dict[str, Dict[str, str]]] = {}
+        self.hits = 0
+        self.stored = 0
+        self.invalidated = 0
+        self.rejected = 0
+
+    def load(self) -> int:
+        """Read the sealed entries from disk. Returns how many were found."""
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to read auth key store {self.path}: {e}")
+            return 0
+        if not isinstance(data, dict) or data.get("version") != _FORMAT_VERSION:
+            return 0
+        self._sealed = data.get("keys") or {}
+        return sum(len(dcs) for dcs in self._sealed.values())
+
+    def get(self, client, dc_id: int) -> Optional[AuthKey]:
+        account = account_id(client)
+        auth_key = self._keys.get((account, dc_id))
+        if auth_key is None:
+            sealed = self._sealed.get(account, {}).get(str(dc_id))
+            if sealed is None:
+                return None
+            auth_key = self._unseal(client, dc_id, sealed)
+            if auth_key is None:
+                self.rejected += 1
+                self._drop_sealed(account, dc_id)
+                return None
+            self._keys[(account, dc_id)] = auth_key
+        self.hits += 1
+        return auth_key
+
+    def put(self, client, dc_id: int, auth_key: AuthKey) -> None:
+        account = account_id(client)
+        if self._keys.get((account, dc_id)) is auth_key:
+            return
+        self._keys[(account, dc_id)] = auth_key
+        self._sealed.setdefault(account, {})[str(dc_id)] = self._seal(
+            client, dc_id, auth_key
+        )
+        self.stored += 1
+        self._save()
+
+    def invalidate(self, client, dc_id: int) -> None:
+        """Forget a key Telegram no longer accepts (``AUTH_KEY_UNREGISTERED``)."""
+        account = account_id(client)
+        known = self._keys.pop((account, dc_id), None) is not None
+        if self._drop_sealed(account, dc_id) or known:
+            self.invalidated += 1
+            logger.info(f"Dropped auth key of account {account} for DC {dc_id}")
+            self._save()
+
+    def _drop_sealed(self, account: str, dc_id: int) -> bool:
+        dcs = self._sealed.get(account)
+        if not dcs or dcs.pop(str(dc_id), None) is None:
+            return False
+        if not dcs:
+            del self._sealed[account]
+        return True
+
+    def _seal(self, client, dc_id: int, auth_key: AuthKey) -> Dict[str, str]:
+        iv = os.urandom(32)
+        data = AES.encrypt_ige(auth_key.key, _derive(client, b"enc"), iv)
+        return {
+            "iv": base64.b64encode(iv).decode(),
+            "data": base64.b64encode(data).decode(),
+            "mac": self._mac(client, dc_id, iv, data),
+        }
+
+    def _unseal(
+        self, client, dc_id: int, sealed: Dict[str, str]
+    ) -> Optional[AuthKey]:
+        try:
+            iv = base64.b64decode(sealed["iv"])
+            data = base64.b64decode(sealed["data"])
+            mac = sealed["mac"]
+        except (KeyError, TypeError, ValueError):
+            return None
+        if not hmac.compare_digest(mac, self._mac(client, dc_id, iv, data)):
+            return None
+        return AuthKey(AES.decrypt_ige(data, _derive(client, b"enc"), iv))
+
+    @staticmethod
+    def _mac(client, dc_id: int, iv: bytes, data: bytes) -> str:
+        message = str(dc_id).encode() + b":" + iv + data
+        return hmac.new(_derive(client, b"mac"), message, hashlib.sha256).hexdigest()
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        payload = {"version": _FORMAT_VERSION, "keys": self._sealed}
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Failed to persist auth key store {self.path}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "persistent": bool(self.path),
+            "keys": sum(len(dcs) for dcs in self._sealed.values()),
+            "unsealed": len(self._keys),
+            "hits": self.hits,
+            "stored": self.stored,
+            "invalidated": self.invalidated,
+            "rejected": self.rejected,
+        }
+
+
+auth_key_store = AuthKeyStore(AUTH_KEY_STORE_FILE)
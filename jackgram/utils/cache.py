@@ -0,0 +1,154 @@
+"""
+Bounded in-memory LRU cache with per-entry TTL.
+
+Used wherever a hot path would otherwise repeat the same MongoDB query or
+Telegram API call, e.g. resolving the media behind a ``/dl`` hash for every
+range request a player makes.
+
+Expired entries are dropped lazily on lookup and, when ``run_sweeper`` is
+running, periodically in the background.  Caches with JSON-friendly keys can
+be persisted across restarts with ``dump`` / ``load``.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """
+    LRU cache bounded by entry count, where every entry also expires.
+
+    Expired entries are dropped lazily on lookup; the least recently used
+    entry is evicted when ``max_entries`` is exceeded.
+    """
+
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self.max_entries = max(0, int(max_entries))
+        self.ttl = ttl
+        # key -> (value, expiry on the monotonic clock), least recent first
+        self._data: "OrderedDict[Hashable, Tuple[V, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[V]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expiry = entry
+        if expiry <= time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: V, ttl: Optional[float] = None) -> None:
+        if not self.enabled:
+            return
+        expiry = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (value, expiry)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> Optional[V]:
+        entry = self._data.pop(key, None)
+        return entry[0] if entry else None
+
+    def discard_if(self, predicate: Callable[[Hashable, V], bool]) -> int:
+        """Drop every entry for which ``predicate(key, value)`` is true."""
+        stale = [k for k, (v, _) in self._data.items() if predicate(k, v)]
+        for key in stale:
+            del self._data[key]
+        return len(stale)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def sweep(self) -> int:
+        """Drop every expired entry. Returns the number removed."""
+        now = time.monotonic()
+        expired = [k for k, (_, expiry) in self._data.items() if expiry <= now]
+        for key in expired:
+            del self._data[key]
+        self.expirations += len(expired)
+        return len(expired)
+
+    async def run_sweeper(self, interval: float) -> None:
+        """Sweep expired entries every *interval* seconds until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            removed = self.sweep()
+            if removed:
+                logger.debug("[cache] Swept %d expired entries", removed)
+
+    def dump(self, path: str, encode: Callable[[V], Any]) -> int:
+        """Write live entries to *path* as JSON. Returns the number written."""
+        now_mono, now_wall = time.monotonic(), time.time()
+        entries = [
+            {
+                "key": key,
+                "value": encode(value),
+                "expires_at": now_wall + expiry - now_mono,
+            }
+            for key, (value, expiry) in self._data.items()
+            if expiry > now_mono
+        ]
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, path)
+        return len(entries)
+
+    def load(self, path: str, decode: Callable[[Any], V]) -> int:
+        """Restore entries written by ``dump``, skipping expired or bad ones."""
+        if not self.enabled or not os.path.exists(path):
+            return 0
+        with open(path, encoding="utf-8") as f:
+            entries = json.load(f)
+        now = time.time()
+        loaded = 0
+        for entry in entries:
+            remaining = entry.get("expires_at", 0) - now
+            if remaining <= 0:
+                continue
+            try:
+                self.set(entry["key"], decode(entry["value"]), ttl=remaining)
+            except (KeyError, TypeError, ValueError):
+                continue
+            loaded += 1
+        return loaded
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -0,0 +1,167 @@
+"""
+Persistent on-disk chunk cache for Telegram media downloads.
+
+Every part fetched with ``upload.getFile`` is stored as its own file, named
+after a hash of ``(document id, part-aligned offset, part_size)``.  Repeat
+plays and seeks of the same file are then served from local disk instead of
+opening MTProto senders again.
+
+The cache is bounded by total size and evicts the least recently used parts
+first.  Reads go through ``mmap`` so hot parts are served straight from the
+page cache.
+"""
+
+import asyncio
+import hashlib
+import logging
+import mmap
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ChunkCache:
+    """Size-bounded, LRU-evicting cache of downloaded file parts."""
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        self.directory = directory
+        self.max_bytes = max(0, int(max_bytes))
+        # key -> stored size in bytes, ordered from least to most recently used
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if self.enabled:
+            self._load_index()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def _key(doc_id: int, offset: int, part_size: int) -> str:
+        return hashlib.sha1(f"{doc_id}:{offset}:{part_size}".encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def _load_index(self) -> None:
+        """Rebuild the LRU index from the files already on disk."""
+        os.makedirs(self.directory, exist_ok=True)
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                if name.endswith(".tmp"):
+                    # Leftover from an interrupted write
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                    continue
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, name, st.st_size))
+
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total_bytes += size
+
+        self._evict()
+        logger.info(
+            "[chunk_cache] Loaded %d parts (%d bytes) from %s",
+            len(self._index),
+            self._total_bytes,
+            self.directory,
+        )
+
+    def _evict(self) -> None:
+        while self._total_bytes > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def contains(self, doc_id: int, offset: int, part_size: int) -> bool:
+        """Check whether a part is cached without touching the disk."""
+        if not self.enabled:
+            return False
+        return self._key(doc_id, offset, part_size) in self._index
+
+    def _read(self, path: str) -> bytes:
+        with open(path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return mm[:]
+
+    def _write(self, path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    async def get(self, doc_id: int, offset: int, part_size: int) -> Optional[bytes]:
+        """Return the cached part or ``None`` on a miss."""
+        if not self.enabled:
+            return None
+
+        key = self._key(doc_id, offset, part_size)
+        if key not in self._index:
+            self.misses += 1
+            return None
+
+        try:
+            data = await asyncio.to_thread(self._read, self._path(key))
+        except (OSError, ValueError) as e:
+            # File vanished or is empty/corrupt: drop it from the index
+            logger.debug("[chunk_cache] Dropping unreadable part %s: %s", key, e)
+            size = self._index.pop(key, 0)
+            self._total_bytes -= size
+            self.misses += 1
+            return None
+
+        self._index.move_to_end(key)
+        self.hits += 1
+        return data
+
+    async def put(self, doc_id: int, offset: int, part_size: int, data: bytes) -> None:
+        """Store a downloaded part, evicting older parts if over budget."""
+        if not self.enabled or not data or len(data) > self.max_bytes:
+            return
+
+        key = self._key(doc_id, offset, part_size)
+        if key in self._index:
+            self._index.move_to_end(key)
+            return
+
+        try:
+            await asyncio.to_thread(self._write, self._path(key), data)
+        except OSError as e:
+            logger.warning("[chunk_cache] Failed to store part %s: %s", key, e)
+            return
+
+        if key in self._index:
+            # A concurrent put for the same part finished first
+            return
+        self._index[key] = len(data)
+        self._total_bytes += len(data)
+        self._evict()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "parts": len(self._index),
+            "size_bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
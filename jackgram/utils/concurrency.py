@@ -0,0 +1,218 @@
+"""
+Small asyncio coordination primitives shared by the indexing pipeline and
+the streaming routes.
+
+- ``KeyedLock``: one ``asyncio.Lock`` per key, created on demand and dropped
+  once nobody holds or waits for it.
+- ``KeyedTurnstile``: lets work items that share a key through one at a time
+  in the order their tickets were issued, while items with different keys
+  run freely.
+- ``SingleFlight``: concurrent calls with the same key share one in-flight
+  coroutine and its result.
+- ``AdmissionQueue``: caps how much work runs at once; callers beyond the
+  cap wait in FIFO order for a bounded time and are then turned away.
+"""
+
+import asyncio
+import math
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Hashable,
+    Optional,
+    TypeVar,
+)
+
+T = TypeVar("T")
+
+
+class KeyedLock:
+    """Mutual exclusion per key (e.g. per tmdb_id document)."""
+
+    def __init__(self) -> None:
+        # key -> (lock, holders + waiters)
+        self._locks: Dict[Hashable, list] = {}
+
+    @asynccontextmanager
+    async def __call__(self, key: Hashable) -> AsyncIterator[None]:
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+
+class KeyedTurnstile:
+    """
+    Per-key FIFO ordering for concurrently processed work items.
+
+    ``ticket(key)`` is called in arrival order.  A worker awaits its ticket
+    right before the order-sensitive step and calls ``release`` when done (or
+    when it gives up), which opens the next ticket for that key.
+    """
+
+    def __init__(self) -> None:
+        self._queues: Dict[Hashable, Deque[asyncio.Future]] = {}
+
+    def ticket(self, key: Hashable) -> asyncio.Future:
+        queue = self._queues.setdefault(key, deque())
+        ticket = asyncio.get_running_loop().create_future()
+        if not queue:
+            ticket.set_result(None)
+        queue.append(ticket)
+        return ticket
+
+    def release(self, key: Hashable, ticket: asyncio.Future) -> None:
+        queue = self._queues.get(key)
+        if not queue or ticket not in queue:
+            return
+        was_head = queue[0] is ticket
+        queue.remove(ticket)
+        if not queue:
+            del self._queues[key]
+        elif was_head and not queue[0].done():
+            queue[0].set_result(None)
+
+    def __len__(self) -> int:
+        return len(self._queues)
+
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent calls.
+
+    The first caller for a key starts ``fn()`` as a task; callers arriving
+    while it runs await the same task instead of starting their own.  The
+    task is shielded, so one caller being cancelled does not cancel the
+    work for the others.  Once it finishes the key is forgotten: results
+    are not memoized here.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.started = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t, key=key: self._forget(key, t))
+            self.started += 1
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # retrieved even if every caller was cancelled
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
+class AdmissionRejected(Exception):
+    """No slot freed up in time; retry after ``retry_after`` seconds."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(f"Server busy, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class Admission:
+    """A granted slot; ``release`` may be called any number of times."""
+
+    def __init__(self, queue: "AdmissionQueue") -> None:
+        self._queue: Optional[AdmissionQueue] = queue
+
+    def release(self) -> None:
+        if self._queue is not None:
+            self._queue._release()
+            self._queue = None
+
+
+class AdmissionQueue:
+    """
+    At most ``limit`` admissions at once (``0`` = unlimited).
+
+    Callers over the limit queue in arrival order; a slot released while
+    someone waits is handed straight to the oldest waiter.  Waiting longer
+    than ``max_wait`` seconds raises ``AdmissionRejected``.
+    """
+
+    def __init__(self, limit: int, max_wait: float) -> None:
+        self.limit = max(0, limit)
+        self.max_wait = max(0.0, max_wait)
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+
+    async def acquire(self) -> Admission:
+        if not self.limit or (self.active < self.limit and not self._waiters):
+            self.active += 1
+            self.admitted += 1
+            return Admission(self)
+
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        timer = loop.call_later(self.max_wait, self._expire, waiter)
+        try:
+            granted = await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled() and waiter.result():
+                self._release()  # the slot was handed over as we were cancelled
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+        finally:
+            timer.cancel()
+        if not granted:
+            self.rejected += 1
+            raise AdmissionRejected(max(1, math.ceil(self.max_wait)))
+        self.admitted += 1
+        return Admission(self)
+
+    def _expire(self, waiter: asyncio.Future) -> None:
+        if not waiter.done():
+            self._waiters.remove(waiter)
+            waiter.set_result(False)
+
+    def _release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)  # the slot passes on; active unchanged
+                return
+        self.active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "waiting": len(self._waiters),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+        }
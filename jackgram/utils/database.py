@@ -1,9 +1,18 @@
 import logging
+from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo.errors import DuplicateKeyError
-from pymongo import ASCENDING, DESCENDING
+from pymongo import ASCENDING, DESCENDING, UpdateOne
 from typing import Any, Dict, List, Optional, Tuple
 
+from jackgram.utils.pagination import decode_cursor, keyset_filter, sort_spec
+from jackgram.utils.search import (
+    build_match,
+    build_search_fields,
+    score_expression,
+    tokenize,
+)
+
 
 class Database:
     def __init__(self, uri: str, database_name: str) -> None:
@@ -12,12 +21,28 @@ class Database:
         self.tmdb_collection = self.db.tmdb
         self.media_file_collection = self.db.media_file_collection
         self.api_users = self.db.api_users
+        # Flat hash -> message location index used to resolve /dl requests
+        self.file_locations = self.db.file_locations
+        # Persistent tier of the TMDb response cache
+        self.tmdb_cache = self.db.tmdb_cache
+        # Library totals kept current on every write (see get_library_stats)
+        self.library_stats = self.db.library_stats
 
     async def add_media_file(self, media_doc: Dict[str, Any]) -> None:
+        self.set_derived_fields(media_doc)
         await self.media_file_collection.insert_one(media_doc)
+        await self.sync_file_locations(media_doc)
+        await self._bump_stats(media_files=1, raw_size=media_doc.get("file_size") or 0)
 
     async def del_media_file(self, hash: str) -> Any:
-        return await self.media_file_collection.delete_one({"hash": hash})
+        await self.file_locations.delete_one({"hash": hash, "tmdb_id": None})
+        existing = await self.media_file_collection.find_one({"hash": hash})
+        result = await self.media_file_collection.delete_one({"hash": hash})
+        if existing and result.deleted_count:
+            await self._bump_stats(
+                media_files=-1, raw_size=-(existing.get("file_size") or 0)
+            )
+        return result
 
     async def get_media_file(self, hash: str) -> Optional[Dict[str, Any]]:
         return await self.media_file_collection.find_one({"hash": hash})
@@ -30,29 +55,38 @@ class Database:
         )
 
     async def get_media_files(
-        self, page: int, per_page: int = 11
+        self, page: int = 1, per_page: int = 11, cursor: Optional[str] = None
     ) -> List[Dict[str, Any]]:
-        skip = (page - 1) * per_page
-        mydoc = (
-            self.media_file_collection.find().sort("_id", -1).skip(skip).limit(per_page)
+        return await self._find_page(
+            self.media_file_collection, {}, "_id", DESCENDING, page, per_page, cursor
         )
-        mydoc_results = await mydoc.to_list(length=per_page)
-        return mydoc_results
 
     async def update_media_file(self, media_doc: Dict[str, Any]) -> None:
-        await self.media_file_collection.replace_one(
+        self.set_derived_fields(media_doc)
+        previous = await self.media_file_collection.find_one_and_replace(
             {"hash": media_doc["hash"]}, media_doc
         )
+        await self.sync_file_locations(media_doc)
+        if previous:
+            await self._bump_stats(
+                raw_size=(media_doc.get("file_size") or 0)
+                - (previous.get("file_size") or 0)
+            )
 
-    async def add_tmdb(self, data: Dict[str, Any]) -> None:
+    async def add_tmdb(self, data: Dict[str, Any]) -> bool:
         logging.info(f"Adding TMDB data: {data}")
         try:
             if data.get("tmdb_id") == "null":
-                return
+                return False
+            self.set_derived_fields(data)
             await self.tmdb_collection.insert_one(data)
             logging.info(f"Inserted new TMDB entry with ID {data.get('tmdb_id')}")
+            await self.sync_file_locations(data)
+            await self._bump_stats(**self._tmdb_stats_delta(data, 1))
+            return True
         except DuplicateKeyError:
             logging.error(f"TMDB entry with ID {data.get('tmdb_id')} already exists")
+            return False
 
     async def get_tmdb(self, tmdb_id: int) -> Optional[Dict[str, Any]]:
         logging.info(f"Fetching TMDB data for ID: {tmdb_id}")
@@ -66,6 +100,7 @@ class Database:
         logging.info(f"Updating TMDB data for ID: {media_doc['tmdb_id']}")
 
         tmdb_id = media_doc["tmdb_id"]
+        before = self.size_fields(existing_media)
 
         if media_type == "series":
             logging.info(f"Updating series for TMDB ID: {tmdb_id}")
@@ -74,10 +109,395 @@ class Database:
             logging.info(f"Updating movie for TMDB ID: {tmdb_id}")
             await self._update_movie(existing_media, media_doc)
 
+        self.set_derived_fields(existing_media)
         await self.tmdb_collection.replace_one({"tmdb_id": tmdb_id}, existing_media)
+        await self.sync_file_locations(existing_media)
+        await self._bump_stats(
+            tmdb_size=existing_media["total_size"] - before["total_size"],
+            tmdb_files=existing_media["file_count"] - before["file_count"],
+        )
+
+    # ── Incremental file writes ─────────────────────────────────────────────
+    #
+    # Indexing adds one file at a time.  Instead of loading the whole tmdb
+    # document, merging in Python and replacing it, add_tmdb_file issues
+    # conditional $set / $push updates with arrayFilters that touch only the
+    # affected season, episode and file entry.  Each update is atomic, so
+    # concurrent writers need no lock: when a condition loses a race the
+    # steps are simply tried again.
+
+    _MAX_WRITE_PASSES = 3
+
+    @staticmethod
+    def _file_scope(media_doc: Dict[str, Any]) -> Tuple[Dict[str, Any], str, list]:
+        """Single-file tmdb document -> (file_info, array path, array filters)."""
+        if media_doc.get("type") == "tv":
+            season = media_doc["seasons"][0]
+            episode = season["episodes"][0]
+            return (
+                episode["file_info"][0],
+                "seasons.$[s].episodes.$[e].file_info",
+                [
+                    {"s.season_number": season["season_number"]},
+                    {"e.episode_number": episode["episode_number"]},
+                ],
+            )
+        return media_doc["file_info"][0], "file_info", []
+
+    @staticmethod
+    def _files_filter(
+        media_doc: Dict[str, Any], condition: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Match the document whose target ``file_info`` array meets *condition*."""
+        query: Dict[str, Any] = {"tmdb_id": media_doc["tmdb_id"]}
+        if media_doc.get("type") != "tv":
+            query.update(condition)
+            return query
+        season = media_doc["seasons"][0]
+        episode = season["episodes"][0]
+        query["seasons"] = {
+            "$elemMatch": {
+                "season_number": season["season_number"],
+                "episodes": {
+                    "$elemMatch": {
+                        "episode_number": episode["episode_number"],
+                        **condition,
+                    }
+                },
+            }
+        }
+        return query
+
+    async def add_tmdb_file(self, media_doc: Dict[str, Any]) -> bool:
+        """
+        Store the single file of *media_doc* (a movie, or a series with one
+        season / episode / file), creating the document if needed.
+
+        Same merge rules as ``update_tmdb``: a file with a known hash is
+        updated in place and one matching an existing name and size is
+        skipped.  Returns False when it was skipped.
+
+        Concurrent first inserts of one tmdb_id rely on the unique
+        ``tmdb_id`` index (created by ``run_migrations``) making all but one
+        ``add_tmdb`` fail with ``DuplicateKeyError``; the losers then retry
+        as updates.  Without that index they would create duplicates.
+        """
+        if not isinstance(media_doc.get("tmdb_id"), int):
+            # No usable id to address the document by (TMDb details missing)
+            return await self.add_tmdb(media_doc)
+
+        info, files_path, array_filters = self._file_scope(media_doc)
+        duplicate = {
+            "file_info": {
+                "$elemMatch": {
+                    "file_name": info.get("file_name"),
+                    "file_size": info.get("file_size"),
+                }
+            }
+        }
+        growth = {
+            "$inc": {"total_size": info.get("file_size") or 0, "file_count": 1},
+            "$addToSet": {
+                "search_tokens": {"$each": tokenize(info.get("file_name", ""))}
+            },
+        }
+
+        for _ in range(self._MAX_WRITE_PASSES):
+            # 1. A file with this hash is already there: refresh its fields
+            result = await self.tmdb_collection.update_one(
+                self._files_filter(media_doc, {"file_info.hash": info["hash"]}),
+                {"$set": {f"{files_path}.$[f].{k}": v for k, v in info.items()}},
+                array_filters=[*array_filters, {"f.hash": info["hash"]}],
+            )
+            if result.matched_count:
+                await self.sync_file_locations(self._location_doc(media_doc, info))
+                return True
+
+            # 2. The episode (or movie) exists: append unless it is a duplicate
+            not_duplicate = {"file_info": {"$not": duplicate["file_info"]}}
+            result = await self.tmdb_collection.update_one(
+                self._files_filter(media_doc, not_duplicate),
+                {"$push": {files_path: info}, **growth},
+                array_filters=array_filters or None,
+            )
+            if not result.matched_count and media_doc.get("type") == "tv":
+                result = await self._add_series_entry(media_doc, growth)
+
+            if result.matched_count:
+                await self.sync_file_locations(self._location_doc(media_doc, info))
+                await self._bump_stats(
+                    tmdb_size=info.get("file_size") or 0, tmdb_files=1
+                )
+                return True
+
+            if await self.tmdb_collection.find_one(
+                self._files_filter(media_doc, duplicate), {"_id": 1}
+            ):
+                return False
+            if not await self.tmdb_collection.find_one(
+                {"tmdb_id": media_doc["tmdb_id"]}, {"_id": 1}
+            ):
+                if await self.add_tmdb(media_doc):
+                    return True
+            # otherwise another writer changed the document meanwhile: retry
+
+        logging.error(
+            f"Could not store {info.get('file_name')} in TMDB ID {media_doc['tmdb_id']}"
+        )
+        return False
+
+    async def _add_series_entry(self, media_doc: Dict[str, Any], growth: Dict) -> Any:
+        """Push a missing episode into its season, or a missing season."""
+        season = media_doc["seasons"][0]
+        episode = season["episodes"][0]
+        tmdb_id = media_doc["tmdb_id"]
+
+        result = await self.tmdb_collection.update_one(
+            {
+                "tmdb_id": tmdb_id,
+                "seasons": {
+                    "$elemMatch": {
+                        "season_number": season["season_number"],
+                        "episodes.episode_number": {"$ne": episode["episode_number"]},
+                    }
+                },
+            },
+            {"$push": {"seasons.$[s].episodes": episode}, **growth},
+            array_filters=[{"s.season_number": season["season_number"]}],
+        )
+        if result.matched_count:
+            return result
+
+        return await self.tmdb_collection.update_one(
+            {
+                "tmdb_id": tmdb_id,
+                "seasons.season_number": {"$ne": season["season_number"]},
+            },
+            {"$push": {"seasons": season}, **growth},
+        )
+
+    @staticmethod
+    def _location_doc(
+        media_doc: Dict[str, Any], info: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """A movie-shaped stand-in so sync_file_locations sees just *info*."""
+        return {"type": "movie", "tmdb_id": media_doc["tmdb_id"], "file_info": [info]}
 
     async def del_tmdb(self, tmdb_id: int) -> Any:
-        return await self.tmdb_collection.delete_one({"tmdb_id": tmdb_id})
+        await self.file_locations.delete_many({"tmdb_id": tmdb_id})
+        existing = await self.tmdb_collection.find_one({"tmdb_id": tmdb_id})
+        result = await self.tmdb_collection.delete_one({"tmdb_id": tmdb_id})
+        if existing and result.deleted_count:
+            await self._bump_stats(**self._tmdb_stats_delta(existing, -1))
+        return result
+
+    # ── File locations ──────────────────────────────────────────────────────
+    #
+    # Every file reachable through /dl gets one document keyed by its hash,
+    # holding the file_info fields the streamer needs plus the parent tmdb_id
+    # (None for raw files).  Writes go to the parent document first and the
+    # location second; deletes go the other way, so a location never outlives
+    # the file it points to.
+
+    @staticmethod
+    def iter_file_infos(doc: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Return every file_info entry of a tmdb or raw media document."""
+        if doc.get("type") == "tv":
+            return [
+                info
+                for season in doc.get("seasons", [])
+                for episode in season.get("episodes", [])
+                for info in episode.get("file_info", [])
+            ]
+        if doc.get("type") == "movie":
+            return list(doc.get("file_info", []))
+        if doc.get("hash"):
+            return [doc]
+        return []
+
+    async def sync_file_locations(self, doc: Dict[str, Any]) -> None:
+        """Upsert the location of every file referenced by *doc*."""
+        tmdb_id = doc.get("tmdb_id") if doc.get("type") in ("tv", "movie") else None
+        ops = []
+        for info in self.iter_file_infos(doc):
+            if not info.get("hash"):
+                continue
+            location = {k: v for k, v in info.items() if k != "_id"}
+            location["tmdb_id"] = tmdb_id
+            ops.append(
+                UpdateOne({"hash": info["hash"]}, {"$set": location}, upsert=True)
+            )
+        if ops:
+            await self.file_locations.bulk_write(ops, ordered=False)
+
+    async def get_file_location(self, hash: str) -> Optional[Dict[str, Any]]:
+        return await self.file_locations.find_one({"hash": hash}, {"_id": 0})
+
+    @classmethod
+    def set_search_fields(cls, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """(Re)compute the search token arrays of *doc* in place."""
+        doc.update(build_search_fields(doc, cls.iter_file_infos(doc)))
+        return doc
+
+    @classmethod
+    def size_fields(cls, doc: Dict[str, Any]) -> Dict[str, int]:
+        infos = cls.iter_file_infos(doc)
+        return {
+            "total_size": sum(info.get("file_size") or 0 for info in infos),
+            "file_count": len(infos),
+        }
+
+    @classmethod
+    def set_derived_fields(cls, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        (Re)compute every field derived from a document's files, in place.
+
+        Called on each write: search tokens for every document, plus
+        ``total_size`` / ``file_count`` for tmdb documents so size sorting
+        and library totals never have to walk the file arrays.
+        """
+        cls.set_search_fields(doc)
+        if doc.get("type") in ("tv", "movie"):
+            doc.update(cls.size_fields(doc))
+        return doc
+
+    # ── Library stats ───────────────────────────────────────────────────────
+    #
+    # One document holding the library totals, adjusted with $inc by every
+    # add / update / delete above.  Bulk operations (channel deletes,
+    # restores, migrations) recompute it from the materialized fields.
+
+    _STATS_ID = "library"
+
+    # Server-side equivalents of size_fields, for pipeline updates
+    _MOVIE_SIZE_FIELDS = {
+        "total_size": {"$sum": "$file_info.file_size"},
+        "file_count": {"$size": {"$ifNull": ["$file_info", []]}},
+    }
+    _TV_SIZE_FIELDS = {
+        "total_size": {
+            "$sum": {
+                "$map": {
+                    "input": {"$ifNull": ["$seasons", []]},
+                    "as": "s",
+                    "in": {
+                        "$sum": {
+                            "$map": {
+                                "input": {"$ifNull": ["$$s.episodes", []]},
+                                "as": "e",
+                                "in": {"$sum": "$$e.file_info.file_size"},
+                            }
+                        }
+                    },
+                }
+            }
+        },
+        "file_count": {
+            "$sum": {
+                "$map": {
+                    "input": {"$ifNull": ["$seasons", []]},
+                    "as": "s",
+                    "in": {
+                        "$sum": {
+                            "$map": {
+                                "input": {"$ifNull": ["$$s.episodes", []]},
+                                "as": "e",
+                                "in": {"$size": {"$ifNull": ["$$e.file_info", []]}},
+                            }
+                        }
+                    },
+                }
+            }
+        },
+    }
+
+    @staticmethod
+    def _tmdb_stats_delta(doc: Dict[str, Any], sign: int) -> Dict[str, int]:
+        delta = {
+            "tmdb_size": sign * (doc.get("total_size") or 0),
+            "tmdb_files": sign * (doc.get("file_count") or 0),
+        }
+        if doc.get("type") == "movie":
+            delta["movies"] = sign
+        elif doc.get("type") == "tv":
+            delta["tv"] = sign
+        return delta
+
+    async def _bump_stats(self, **deltas: int) -> None:
+        deltas = {k: v for k, v in deltas.items() if v}
+        if deltas:
+            await self.library_stats.update_one(
+                {"_id": self._STATS_ID}, {"$inc": deltas}, upsert=True
+            )
+
+    async def refresh_size_fields(self, query: Optional[Dict[str, Any]] = None) -> None:
+        """Recompute ``total_size`` / ``file_count`` server-side for *query*."""
+        query = query or {}
+        for media_type, fields in (
+            ("movie", self._MOVIE_SIZE_FIELDS),
+            ("tv", self._TV_SIZE_FIELDS),
+        ):
+            await self.tmdb_collection.update_many(
+                {**query, "type": media_type}, [{"$set": fields}]
+            )
+
+    async def refresh_library_stats(self) -> Dict[str, Any]:
+        """Rebuild the stats document from the materialized per-document fields."""
+        stats = {
+            "movies": 0,
+            "tv": 0,
+            "tmdb_size": 0,
+            "tmdb_files": 0,
+            "media_files": 0,
+            "raw_size": 0,
+        }
+        async for group in self.tmdb_collection.aggregate(
+            [
+                {"$match": {"type": {"$in": ["movie", "tv"]}}},
+                {
+                    "$group": {
+                        "_id": "$type",
+                        "n": {"$sum": 1},
+                        "size": {"$sum": "$total_size"},
+                        "files": {"$sum": "$file_count"},
+                    }
+                },
+            ]
+        ):
+            stats[group["_id"]] = group["n"]
+            stats["tmdb_size"] += group["size"]
+            stats["tmdb_files"] += group["files"]
+        async for group in self.media_file_collection.aggregate(
+            [
+                {
+                    "$group": {
+                        "_id": None,
+                        "n": {"$sum": 1},
+                        "size": {"$sum": "$file_size"},
+                    }
+                }
+            ]
+        ):
+            stats["media_files"] = group["n"]
+            stats["raw_size"] = group["size"]
+
+        await self.library_stats.replace_one(
+            {"_id": self._STATS_ID}, stats, upsert=True
+        )
+        return {"_id": self._STATS_ID, **stats}
+
+    async def get_library_stats(self) -> Dict[str, Any]:
+        """Library totals: one point read, rebuilt if the document is missing."""
+        stats = await self.library_stats.find_one({"_id": self._STATS_ID})
+        if stats is None:
+            stats = await self.refresh_library_stats()
+        return {
+            "movies": stats.get("movies", 0),
+            "tv": stats.get("tv", 0),
+            "media_files": stats.get("media_files", 0),
+            "file_count": stats.get("tmdb_files", 0) + stats.get("media_files", 0),
+            "total_size": stats.get("tmdb_size", 0) + stats.get("raw_size", 0),
+        }
 
     async def count_tmdb(self) -> int:
         return await self.tmdb_collection.count_documents(
@@ -95,129 +515,160 @@ class Database:
 
     async def get_total_storage(self) -> int:
         """Returns total indexed file size in bytes across both collections."""
-        pipeline = [{"$group": {"_id": None, "total": {"$sum": "$file_size"}}}]
-        tmdb_pipeline = [
-            {"$unwind": {"path": "$file_info", "preserveNullAndEmptyArrays": True}},
-            {"$group": {"_id": None, "total": {"$sum": "$file_info.file_size"}}},
-        ]
-        raw_result = await self.media_file_collection.aggregate(pipeline).to_list(1)
-        tmdb_result = await self.tmdb_collection.aggregate(tmdb_pipeline).to_list(1)
-        raw_total = raw_result[0]["total"] if raw_result else 0
-        tmdb_total = tmdb_result[0]["total"] if tmdb_result else 0
-        return raw_total + tmdb_total
+        return (await self.get_library_stats())["total_size"]
 
     _SORT_FIELD_MAP = {
         "date": "release_date",
         "title": "title",
         "rating": "rating",
-        "size": "_total_size",  # requires aggregation pipeline
+        "size": "total_size",
     }
 
-    async def get_movies(
+    @classmethod
+    def sort_field(cls, sort_by: str) -> str:
+        """The document field a listing ``sort_by`` value orders on."""
+        return cls._SORT_FIELD_MAP.get(sort_by, "_id")
+
+    async def _find_page(
         self,
+        collection,
+        query: Dict[str, Any],
+        field: str,
+        direction: int,
         page: int,
+        per_page: int,
+        cursor: Optional[str],
+    ) -> List[Dict[str, Any]]:
+        """
+        One page of a listing sorted by ``field`` then ``_id``.
+
+        With a *cursor* (see ``jackgram.utils.pagination``) the page starts
+        right after the document it points to; otherwise *page* is skipped to
+        the old way.  Raises ``InvalidCursor`` for a bad cursor.
+        """
+        skip = (page - 1) * per_page
+        if cursor:
+            value, last_id = decode_cursor(cursor, field)
+            query = {"$and": [query, keyset_filter(field, direction, value, last_id)]}
+            skip = 0
+        mydoc = (
+            collection.find(query)
+            .sort(sort_spec(field, direction))
+            .skip(skip)
+            .limit(per_page)
+        )
+        return await mydoc.to_list(length=per_page)
+
+    async def get_movies(
+        self,
+        page: int = 1,
         per_page: int = 20,
         sort_by: str = "date",
         sort_order: str = "desc",
+        cursor: Optional[str] = None,
     ) -> List[Dict[str, Any]]:
-        skip = (page - 1) * per_page
         direction = ASCENDING if sort_order == "asc" else DESCENDING
-
-        if sort_by == "size":
-            # Use aggregation to sort by total file size
-            pipeline = [
-                {"$match": {"type": "movie"}},
-                {"$addFields": {"_total_size": {"$sum": "$file_info.file_size"}}},
-                {"$sort": {"_total_size": 1 if sort_order == "asc" else -1}},
-                {"$skip": skip},
-                {"$limit": per_page},
-            ]
-            return await self.tmdb_collection.aggregate(pipeline).to_list(
-                length=per_page
-            )
-
-        mongo_field = self._SORT_FIELD_MAP.get(sort_by, "_id")
-        cursor = (
-            self.tmdb_collection.find({"type": "movie"})
-            .sort(mongo_field, direction)
-            .skip(skip)
-            .limit(per_page)
+        return await self._find_page(
+            self.tmdb_collection,
+            {"type": "movie"},
+            self.sort_field(sort_by),
+            direction,
+            page,
+            per_page,
+            cursor,
         )
-        return await cursor.to_list(length=per_page)
 
     async def get_tv(
         self,
-        page: int,
+        page: int = 1,
         per_page: int = 20,
         sort_by: str = "date",
         sort_order: str = "desc",
+        cursor: Optional[str] = None,
     ) -> List[Dict[str, Any]]:
-        skip = (page - 1) * per_page
         direction = ASCENDING if sort_order == "asc" else DESCENDING
-        mongo_field = self._SORT_FIELD_MAP.get(sort_by, "_id")
-        cursor = (
-            self.tmdb_collection.find({"type": "tv"})
-            .sort(mongo_field, direction)
-            .skip(skip)
-            .limit(per_page)
+        return await self._find_page(
+            self.tmdb_collection,
+            {"type": "tv"},
+            self.sort_field(sort_by),
+            direction,
+            page,
+            per_page,
+            cursor,
         )
-        return await cursor.to_list(length=per_page)
 
     async def get_tmdb_latest(
-        self, media_type: str = None, page: int = 1, per_page: int = 12
+        self,
+        media_type: str = None,
+        page: int = 1,
+        per_page: int = 12,
+        cursor: Optional[str] = None,
     ) -> List[Dict[str, Any]]:
-        skip = (page - 1) * per_page
-        query = {}
-        if media_type:
-            query = {"type": media_type}
-        mydoc = (
-            self.tmdb_collection.find(query).sort("_id", -1).skip(skip).limit(per_page)
+        query = {"type": media_type} if media_type else {}
+        return await self._find_page(
+            self.tmdb_collection, query, "_id", DESCENDING, page, per_page, cursor
         )
-        mydoc_results = await mydoc.to_list(length=per_page)
-        return mydoc_results
 
     async def search_tmdb(
         self, query: str, page: int = 1, per_page: int = 50
     ) -> Tuple[List[Dict[str, Any]], int]:
-        words = query.split()
-        tmdb_regex_query = {
-            "title": {"$regex": ".*" + ".*".join(words) + ".*", "$options": "i"}
-        }
-        media_regex_query = {
-            "file_name": {"$regex": ".*" + ".*".join(words) + ".*", "$options": "i"}
-        }
+        """
+        Ranked search over tmdb documents and raw files.
+
+        Every query word must prefix a title or file name token; results are
+        ordered by relevance (see ``jackgram.utils.search``), newest first on
+        ties, and paged across both collections together.
+        """
+        words = tokenize(query)
+        match = build_match(words)
         skip = (int(page) - 1) * per_page
 
-        # Search in tmdb_collection
-        tmdb_mydoc = (
-            self.tmdb_collection.find(tmdb_regex_query)
-            .sort("msg_id", DESCENDING)
-            .skip(skip)
-            .limit(per_page)
-        )
-        tmdb_results = await tmdb_mydoc.to_list(length=per_page)
-        tmdb_total_count = await self.tmdb_collection.count_documents(tmdb_regex_query)
-
-        # Search in media_file_collection
-        media_mydoc = (
-            self.media_file_collection.find(media_regex_query)
-            .sort("_id", DESCENDING)
-            .skip(skip)
-            .limit(per_page)
-        )
-        media_results = await media_mydoc.to_list(length=per_page)
-
-        logging.info(f"Media results: {media_results}")
-
-        media_total_count = await self.media_file_collection.count_documents(
-            media_regex_query
-        )
-
-        # Combine results and total counts
-        combined_results = tmdb_results + media_results
-        combined_total_count = tmdb_total_count + media_total_count
-
-        return combined_results, combined_total_count
+        pipeline = [
+            {"$match": match},
+            {
+                "$unionWith": {
+                    "coll": self.media_file_collection.name,
+                    "pipeline": [{"$match": match}],
+                }
+            },
+            {"$addFields": {"_score": score_expression(words)}},
+            {
+                "$facet": {
+                    "results": [
+                        {"$sort": {"_score": DESCENDING, "_id": DESCENDING}},
+                        {"$skip": skip},
+                        {"$limit": per_page},
+                        {"$project": {"title_tokens": 0, "search_tokens": 0}},
+                    ],
+                    "total": [{"$count": "count"}],
+                }
+            },
+        ]
+        facets = await self.tmdb_collection.aggregate(pipeline).to_list(length=1)
+        if not facets:
+            return [], 0
+        total = facets[0]["total"]
+        return facets[0]["results"], total[0]["count"] if total else 0
+
+    async def get_search_documents(
+        self, keys: List[Tuple[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Load the documents behind fuzzy search keys, keeping their order."""
+        tmdb_ids = [value for kind, value in keys if kind == "tmdb"]
+        hashes = [value for kind, value in keys if kind == "raw"]
+        projection = {"title_tokens": 0, "search_tokens": 0}
+        found: Dict[Tuple[str, Any], Dict[str, Any]] = {}
+        if tmdb_ids:
+            async for doc in self.tmdb_collection.find(
+                {"tmdb_id": {"$in": tmdb_ids}}, projection
+            ):
+                found[("tmdb", doc["tmdb_id"])] = doc
+        if hashes:
+            async for doc in self.media_file_collection.find(
+                {"hash": {"$in": hashes}}, projection
+            ):
+                found[("raw", doc["hash"])] = doc
+        return [found[key] for key in keys if key in found]
 
     async def _update_series(
         self, existing_media: Dict[str, Any], media_doc: Dict[str, Any]
@@ -305,6 +756,14 @@ class Database:
             else:
                 existing_media["file_info"].append(info)
 
+    async def get_tmdb_cache(self, key: str) -> Optional[Dict[str, Any]]:
+        return await self.tmdb_cache.find_one({"_id": key})
+
+    async def set_tmdb_cache(self, key: str, value: Any, expires_at: datetime) -> None:
+        await self.tmdb_cache.replace_one(
+            {"_id": key}, {"value": value, "expires_at": expires_at}, upsert=True
+        )
+
     async def list_collections(self) -> List[str]:
         return await self.db.list_collection_names()
 
@@ -324,31 +783,81 @@ class Database:
 
     async def del_by_chat_id(self, chat_id: int) -> Dict[str, int]:
         """Deletes all occurrences of a chat_id across all collections."""
+        await self.file_locations.delete_many({"chat_id": chat_id})
+        totals = {"type": 1, "total_size": 1, "file_count": 1}
+        before = {
+            doc["_id"]: doc
+            async for doc in self.tmdb_collection.find(
+                {
+                    "$or": [
+                        {"file_info.chat_id": chat_id},
+                        {"seasons.episodes.file_info.chat_id": chat_id},
+                    ]
+                },
+                totals,
+            )
+        }
+        touched = {"_id": {"$in": list(before)}}
+
         # 1. Delete from media_file_collection (Raw Files)
+        raw_size = 0
+        async for group in self.media_file_collection.aggregate(
+            [
+                {"$match": {"chat_id": chat_id}},
+                {"$group": {"_id": None, "size": {"$sum": "$file_size"}}},
+            ]
+        ):
+            raw_size = group["size"]
         res_raw = await self.media_file_collection.delete_many({"chat_id": chat_id})
 
         # 2. Pull from movies (file_info is top level array)
         res_movies = await self.tmdb_collection.update_many(
-            {"type": "movie"}, {"$pull": {"file_info": {"chat_id": chat_id}}}
+            {**touched, "type": "movie"},
+            {"$pull": {"file_info": {"chat_id": chat_id}}},
         )
 
         # 3. Pull from series (nested array: seasons.episodes.file_info)
         res_tv = await self.tmdb_collection.update_many(
-            {"type": "tv"},
+            {**touched, "type": "tv"},
             {"$pull": {"seasons.$[].episodes.$[].file_info": {"chat_id": chat_id}}},
         )
 
         # 4. Optional: Cleanup documents with no file_info left
-        # Cleanup movies
-        await self.tmdb_collection.delete_many(
-            {"type": "movie", "file_info": {"$size": 0}}
-        )
-
-        # Cleanup TV shows where ALL episodes have no files (simplified cleanup)
-        # We delete the whole show if all file_info lists in all episodes are empty
-        await self.tmdb_collection.delete_many(
-            {"type": "tv", "seasons.episodes.file_info": {"$size": 0}}
-        )
+        empty = {
+            **touched,
+            "$or": [
+                {"type": "movie", "file_info": {"$size": 0}},
+                {"type": "tv", "seasons.episodes.file_info": {"$size": 0}},
+            ],
+        }
+        emptied = await self.tmdb_collection.distinct("tmdb_id", empty)
+        if emptied:
+            await self.file_locations.delete_many({"tmdb_id": {"$in": emptied}})
+
+        # Cleanup movies, and TV shows with an episode left without files
+        await self.tmdb_collection.delete_many(empty)
+
+        # Library totals move by what the touched documents lost, so
+        # concurrent $inc updates from indexing are not overwritten
+        deltas = {"media_files": -res_raw.deleted_count, "raw_size": -raw_size}
+        if before:
+            await self.refresh_size_fields(touched)
+            cursor = self.tmdb_collection.find(touched, totals)
+            after = {doc["_id"]: doc async for doc in cursor}
+            for _id, old in before.items():
+                new = after.get(_id)
+                if new is None:
+                    change = self._tmdb_stats_delta(old, -1)
+                else:
+                    change = {
+                        "tmdb_size": (new.get("total_size") or 0)
+                        - (old.get("total_size") or 0),
+                        "tmdb_files": (new.get("file_count") or 0)
+                        - (old.get("file_count") or 0),
+                    }
+                for field, value in change.items():
+                    deltas[field] = deltas.get(field, 0) + value
+        await self._bump_stats(**deltas)
 
         return {
             "raw_deleted": res_raw.deleted_count,
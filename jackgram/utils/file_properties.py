@@ -19,6 +19,17 @@ async def get_file_info_dict(
         f"get_file_info_dict: tmdb_id={tmdb_id}, file_id={file_id}, secure_hash={secure_hash}"
     )
 
+    # Fast path: one indexed point lookup on the flat location table
+    location = await db.get_file_location(secure_hash)
+    if location:
+        if tmdb_id and location.get("tmdb_id") == int(tmdb_id):
+            return location
+        if file_id and file_id == secure_hash and location.get("tmdb_id") is None:
+            return location
+        if not tmdb_id and not file_id:
+            return location
+
+    # Slow path for files not (yet) in the location table
     if tmdb_id:
         data = await db.get_tmdb(int(tmdb_id))
         logging.info(f"get_file_info_dict: data={data}")
@@ -0,0 +1,195 @@
+"""
+In-process trigram index for typo-tolerant title search.
+
+The bot's ``/search`` flow asks this index first: it maps titles (and the
+original title) of tmdb documents and the file names of raw files to their
+document keys, so a query such as ``"breakng bad"`` is answered from memory
+and only the matching documents are loaded from MongoDB.
+
+The index is built in the background at startup, kept current by the
+indexing code (``process_*``) and the delete paths, and rebuilt after bulk
+deletes.  It holds at most ``max_entries`` documents; once full, new entries
+are refused and ``complete`` turns false so callers fall back to the MongoDB
+search instead of silently missing documents.
+"""
+
+import asyncio
+import logging
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+
+from jackgram.bot.bot import SEARCH_INDEX_MAX_ENTRIES
+from jackgram.utils.search import tokenize
+
+logger = logging.getLogger(__name__)
+
+
+def trigrams(text: str) -> Set[str]:
+    """Trigrams of every word of *text*, padded like pg_trgm (``"  w"``, ``"d "``)."""
+    grams: Set[str] = set()
+    for word in tokenize(text):
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """Trigram -> document key postings with similarity-ranked lookups."""
+
+    MIN_COVERAGE = 0.5  # share of query trigrams a match must contain
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max(0, int(max_entries))
+        self._postings: Dict[str, Set[Hashable]] = {}
+        # key -> (label, trigram count)
+        self._entries: Dict[Hashable, Tuple[str, int]] = {}
+        self.ready = False
+        self.complete = True
+        self.refused = 0
+        self.queries = 0
+        self.build_seconds = 0.0
+        self._build_lock = asyncio.Lock()
+        # Running background rebuilds; the event loop only holds weak refs
+        self._build_tasks: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def usable(self) -> bool:
+        return self.ready and self.complete
+
+    def add(self, key: Hashable, *texts: Optional[str]) -> bool:
+        """Index *texts* under *key*, replacing what was indexed for it before."""
+        label = " ".join(t for t in texts if t)
+        if key in self._entries:
+            if self._entries[key][0] == label:
+                return True
+            self.remove(key)
+        elif len(self._entries) >= self.max_entries:
+            self.refused += 1
+            self.complete = False
+            return False
+
+        grams = trigrams(label)
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(key)
+        self._entries[key] = (label, len(grams))
+        return True
+
+    def remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for gram in trigrams(entry[0]):
+            keys = self._postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[gram]
+
+    def search(self, query: str, limit: int = 50) -> List[Hashable]:
+        """Keys of the best matches for *query*, most similar first."""
+        self.queries += 1
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+
+        shared: Counter = Counter()
+        for gram in query_grams:
+            shared.update(self._postings.get(gram, ()))
+
+        needed = len(query_grams) * self.MIN_COVERAGE
+        ranked = []
+        for key, count in shared.items():
+            if count < needed:
+                continue
+            doc_grams = self._entries[key][1]
+            # coverage of the query first, then overall (Jaccard) similarity
+            jaccard = count / (len(query_grams) + doc_grams - count)
+            ranked.append((count / len(query_grams), jaccard, key))
+        ranked.sort(key=lambda r: (r[0], r[1]), reverse=True)
+        return [key for _, _, key in ranked[:limit]]
+
+    def clear(self) -> None:
+        self._postings.clear()
+        self._entries.clear()
+        self.complete = True
+        self.refused = 0
+
+    async def build(self, db) -> None:
+        """(Re)build the index from every tmdb document and raw file."""
+        async with self._build_lock:
+            started = time.monotonic()
+            self.ready = False
+            self.clear()
+            async for doc in db.tmdb_collection.find(
+                {}, {"tmdb_id": 1, "title": 1, "original_title": 1}
+            ):
+                self.add(
+                    tmdb_key(doc["tmdb_id"]), doc.get("title"), doc.get("original_title")
+                )
+                await asyncio.sleep(0)
+            async for doc in db.media_file_collection.find(
+                {}, {"hash": 1, "file_name": 1}
+            ):
+                self.add(raw_key(doc["hash"]), doc.get("file_name"))
+                await asyncio.sleep(0)
+            self.build_seconds = round(time.monotonic() - started, 3)
+            self.ready = True
+            logger.info(
+                "[search] Trigram index built: %d entries in %.2fs",
+                len(self._entries),
+                self.build_seconds,
+            )
+
+    def rebuild_in_background(self, db) -> asyncio.Task:
+        """Schedule ``build``, keeping the task alive and logging failures."""
+        task = asyncio.create_task(self.build(db))
+        self._build_tasks.add(task)
+        task.add_done_callback(self._build_done)
+        return task
+
+    def _build_done(self, task: asyncio.Task) -> None:
+        self._build_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(
+                "[search] Trigram index rebuild failed: %s",
+                task.exception(),
+                exc_info=task.exception(),
+            )
+
+    def memory_bytes(self) -> int:
+        """Approximate size of the index structures (walks every posting)."""
+        size = sys.getsizeof(self._postings) + sys.getsizeof(self._entries)
+        for gram, keys in self._postings.items():
+            size += sys.getsizeof(gram) + sys.getsizeof(keys)
+        for key, (label, _) in self._entries.items():
+            size += sys.getsizeof(key) + sys.getsizeof(label)
+        return size
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "complete": self.complete,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "trigrams": len(self._postings),
+            "refused": self.refused,
+            "queries": self.queries,
+            "build_seconds": self.build_seconds,
+            "memory_bytes": self.memory_bytes(),
+        }
+
+
+def tmdb_key(tmdb_id: Any) -> Tuple[str, Any]:
+    return ("tmdb", tmdb_id)
+
+
+def raw_key(file_hash: str) -> Tuple[str, str]:
+    return ("raw", file_hash)
+
+
+fuzzy_index = TrigramIndex(SEARCH_INDEX_MAX_ENTRIES)
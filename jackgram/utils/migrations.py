@@ -0,0 +1,280 @@
+"""
+MongoDB index bootstrap and versioned schema migrations.
+
+``run_migrations`` is called once at startup.  It first applies every
+migration newer than the version stored in the ``schema_migrations``
+collection (in order, recording each one as it completes) and then makes
+sure every index in ``INDEXES`` exists.  Both steps are idempotent, so a
+restart, or a crash halfway through, simply picks up where it left off.
+
+Migrations are for data changes that indexes depend on (e.g. merging
+duplicate ``tmdb_id`` documents before the unique index can be built).  New
+indexes only need an entry in ``INDEXES``.
+"""
+
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Tuple
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import OperationFailure
+
+from jackgram.utils.database import Database
+
+logger = logging.getLogger(__name__)
+
+
+class IndexSpec(NamedTuple):
+    collection: str  # attribute name on Database
+    keys: List[Tuple[str, int]]
+    options: Dict[str, Any]
+
+
+INDEXES: List[IndexSpec] = [
+    # tmdb: point lookups
+    IndexSpec(
+        "tmdb_collection",
+        [("tmdb_id", ASCENDING)],
+        {
+            "name": "tmdb_id_unique",
+            "unique": True,
+            "partialFilterExpression": {"tmdb_id": {"$type": "number"}},
+        },
+    ),
+    IndexSpec(
+        "tmdb_collection", [("file_info.hash", ASCENDING)], {"name": "file_hash"}
+    ),
+    IndexSpec(
+        "tmdb_collection",
+        [("seasons.episodes.file_info.hash", ASCENDING)],
+        {"name": "episode_file_hash"},
+    ),
+    # tmdb: sorted listings (get_movies / get_tv / get_tmdb_latest); _id is
+    # the keyset pagination tiebreaker, see jackgram.utils.pagination
+    IndexSpec(
+        "tmdb_collection",
+        [("type", ASCENDING), ("release_date", DESCENDING), ("_id", DESCENDING)],
+        {"name": "type_release_date_id"},
+    ),
+    IndexSpec(
+        "tmdb_collection",
+        [("type", ASCENDING), ("rating", DESCENDING), ("_id", DESCENDING)],
+        {"name": "type_rating_id"},
+    ),
+    IndexSpec(
+        "tmdb_collection",
+        [("type", ASCENDING), ("title", ASCENDING), ("_id", ASCENDING)],
+        {"name": "type_title_id"},
+    ),
+    IndexSpec(
+        "tmdb_collection",
+        [("type", ASCENDING), ("total_size", DESCENDING), ("_id", DESCENDING)],
+        {"name": "type_total_size_id"},
+    ),
+    IndexSpec(
+        "tmdb_collection",
+        [("type", ASCENDING), ("_id", DESCENDING)],
+        {"name": "type_latest"},
+    ),
+    # raw files
+    IndexSpec("media_file_collection", [("hash", ASCENDING)], {"name": "hash"}),
+    IndexSpec(
+        "media_file_collection",
+        [("file_name", ASCENDING), ("file_size", ASCENDING)],
+        {"name": "file_name_size"},
+    ),
+    IndexSpec("media_file_collection", [("chat_id", ASCENDING)], {"name": "chat_id"}),
+    # search: anchored prefix scans over the token arrays (jackgram.utils.search)
+    IndexSpec(
+        "tmdb_collection", [("search_tokens", ASCENDING)], {"name": "search_tokens"}
+    ),
+    IndexSpec(
+        "media_file_collection",
+        [("search_tokens", ASCENDING)],
+        {"name": "search_tokens"},
+    ),
+    # file locations: one point lookup per /dl request
+    IndexSpec(
+        "file_locations", [("hash", ASCENDING)], {"name": "hash_unique", "unique": True}
+    ),
+    IndexSpec("file_locations", [("chat_id", ASCENDING)], {"name": "chat_id"}),
+    IndexSpec("file_locations", [("tmdb_id", ASCENDING)], {"name": "tmdb_id"}),
+    # tmdb response cache: MongoDB drops entries once expires_at has passed
+    IndexSpec(
+        "tmdb_cache",
+        [("expires_at", ASCENDING)],
+        {"name": "expires_at_ttl", "expireAfterSeconds": 0},
+    ),
+    # api users
+    IndexSpec(
+        "api_users", [("token", ASCENDING)], {"name": "token_unique", "unique": True}
+    ),
+]
+
+
+# ── Migrations ──────────────────────────────────────────────────────────────
+
+
+async def _merge_duplicate_tmdb_ids(db: Database) -> None:
+    """Merge documents sharing a tmdb_id so the unique index can be built."""
+    pipeline = [
+        {"$match": {"tmdb_id": {"$type": "number"}}},
+        {"$group": {"_id": "$tmdb_id", "ids": {"$push": "$_id"}, "n": {"$sum": 1}}},
+        {"$match": {"n": {"$gt": 1}}},
+    ]
+    duplicates = await db.tmdb_collection.aggregate(pipeline).to_list(length=None)
+    for dup in duplicates:
+        ids = sorted(dup["ids"])
+        keep = await db.tmdb_collection.find_one({"_id": ids[0]})
+        for other_id in ids[1:]:
+            other = await db.tmdb_collection.find_one({"_id": other_id})
+            if not other:
+                continue
+            if keep.get("type") == "tv":
+                keep.setdefault("seasons", [])
+                other.setdefault("seasons", [])
+                await db._update_series(keep, other)
+            else:
+                keep.setdefault("file_info", [])
+                other.setdefault("file_info", [])
+                await db._update_movie(keep, other)
+            await db.tmdb_collection.delete_one({"_id": other_id})
+        await db.tmdb_collection.replace_one({"_id": keep["_id"]}, keep)
+        logger.info(
+            "Merged %d duplicate documents for tmdb_id %s", len(ids) - 1, dup["_id"]
+        )
+
+
+async def _backfill_file_locations(db: Database) -> None:
+    """Populate ``file_locations`` from existing tmdb and raw file documents."""
+    count = 0
+    for collection in (db.tmdb_collection, db.media_file_collection):
+        async for doc in collection.find({}):
+            await db.sync_file_locations(doc)
+            count += 1
+    logger.info("Backfilled file locations from %d documents", count)
+
+
+async def _backfill_search_tokens(db: Database) -> None:
+    """Compute ``title_tokens`` / ``search_tokens`` for existing documents."""
+    count = 0
+    for collection in (db.tmdb_collection, db.media_file_collection):
+        ops = []
+        async for doc in collection.find({}):
+            fields = Database.set_search_fields({**doc})
+            ops.append(
+                UpdateOne(
+                    {"_id": doc["_id"]},
+                    {
+                        "$set": {
+                            "title_tokens": fields["title_tokens"],
+                            "search_tokens": fields["search_tokens"],
+                        }
+                    },
+                )
+            )
+            if len(ops) >= 500:
+                await collection.bulk_write(ops, ordered=False)
+                count += len(ops)
+                ops = []
+        if ops:
+            await collection.bulk_write(ops, ordered=False)
+            count += len(ops)
+    logger.info("Backfilled search tokens for %d documents", count)
+
+
+async def _drop_listing_indexes_without_id(db: Database) -> None:
+    """Drop listing indexes replaced by their ``_id``-suffixed keyset versions."""
+    existing = await db.tmdb_collection.index_information()
+    for name in ("type_release_date", "type_rating", "type_title"):
+        if name in existing:
+            await db.tmdb_collection.drop_index(name)
+            logger.info("Dropped superseded index %s", name)
+
+
+async def _materialize_sizes(db: Database) -> None:
+    """Store ``total_size`` / ``file_count`` on tmdb documents, then the totals."""
+    await db.refresh_size_fields()
+    stats = await db.refresh_library_stats()
+    logger.info(
+        "Materialized file sizes; library holds %d movies, %d shows, %d raw files",
+        stats["movies"],
+        stats["tv"],
+        stats["media_files"],
+    )
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable[[Database], Awaitable[None]]
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "merge duplicate tmdb_id documents", _merge_duplicate_tmdb_ids),
+    Migration(2, "backfill file_locations", _backfill_file_locations),
+    Migration(3, "backfill search tokens", _backfill_search_tokens),
+    Migration(
+        4, "drop listing indexes without _id", _drop_listing_indexes_without_id
+    ),
+    Migration(5, "materialize file sizes and library stats", _materialize_sizes),
+]
+
+
+# ── Runner ──────────────────────────────────────────────────────────────────
+
+_STATE_ID = "jackgram"
+
+
+async def get_schema_version(db: Database) -> int:
+    state = await db.db.schema_migrations.find_one({"_id": _STATE_ID})
+    return state.get("version", 0) if state else 0
+
+
+async def ensure_indexes(db: Database) -> None:
+    """Create every index in ``INDEXES``; existing ones are left untouched."""
+    for spec in INDEXES:
+        collection = getattr(db, spec.collection)
+        try:
+            await collection.create_index(spec.keys, **spec.options)
+        except OperationFailure as e:
+            # e.g. an index with the same name but different options
+            logger.error(
+                "Failed to create index %s on %s: %s",
+                spec.options.get("name"),
+                collection.name,
+                e,
+            )
+
+
+async def run_migrations(db: Database) -> int:
+    """Apply pending migrations and ensure indexes. Returns the schema version."""
+    version = await get_schema_version(db)
+    for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+        if migration.version <= version:
+            continue
+        logger.info(
+            "Applying database migration %d: %s", migration.version, migration.name
+        )
+        started = time.monotonic()
+        await migration.apply(db)
+        version = migration.version
+        await db.db.schema_migrations.update_one(
+            {"_id": _STATE_ID},
+            {
+                "$set": {"version": version},
+                "$push": {
+                    "applied": {
+                        "version": version,
+                        "name": migration.name,
+                        "applied_at": time.time(),
+                        "duration_seconds": round(time.monotonic() - started, 3),
+                    }
+                },
+            },
+            upsert=True,
+        )
+
+    await ensure_indexes(db)
+    logger.info("Database schema at version %d, indexes ensured", version)
+    return version
@@ -0,0 +1,83 @@
+"""
+Keyset (cursor) pagination helpers.
+
+Listings sort on one field plus ``_id`` as a tiebreaker.  Instead of skipping
+``(page - 1) * per_page`` documents, the next page starts right after the
+last document served: its sort value and ``_id`` travel to the client as an
+opaque cursor, and the query becomes a range condition the index can seek to
+directly, so page 1000 costs the same as page 1.
+
+Missing / null sort values are handled the way MongoDB orders them: they
+come first in ascending order and last in descending order.
+"""
+
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING
+
+
+class InvalidCursor(ValueError):
+    """The cursor is malformed or was issued for a different sort."""
+
+
+def encode_cursor(field: str, doc: Dict[str, Any]) -> str:
+    payload = {"f": field, "v": doc.get(field), "id": str(doc["_id"])}
+    if field == "_id":
+        payload["v"] = None
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, field: str) -> Tuple[Any, ObjectId]:
+    """Return ``(sort value, _id)`` of the last document of the previous page."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        last_id = ObjectId(payload["id"])
+    except (ValueError, TypeError, KeyError, InvalidId) as e:
+        raise InvalidCursor(f"Malformed cursor: {cursor!r}") from e
+    if payload.get("f") != field:
+        raise InvalidCursor(f"Cursor was issued for sorting by {payload.get('f')!r}")
+    return payload.get("v"), last_id
+
+
+def sort_spec(field: str, direction: int) -> List[Tuple[str, int]]:
+    if field == "_id":
+        return [("_id", direction)]
+    return [(field, direction), ("_id", direction)]
+
+
+def keyset_filter(
+    field: str, direction: int, value: Any, last_id: ObjectId
+) -> Dict[str, Any]:
+    """Filter matching every document sorted after ``(value, last_id)``."""
+    id_op = "$gt" if direction == ASCENDING else "$lt"
+    if field == "_id":
+        return {"_id": {id_op: last_id}}
+
+    tie = {field: value, "_id": {id_op: last_id}}
+    if value is None:
+        if direction == ASCENDING:
+            # the rest of the nulls, then every non-null value
+            return {"$or": [tie, {field: {"$ne": None}}]}
+        return tie
+
+    after: List[Dict[str, Any]] = [
+        {field: {"$gt" if direction == ASCENDING else "$lt": value}}
+    ]
+    if direction != ASCENDING:
+        after.append({field: None})  # nulls sort last when descending
+    return {"$or": [*after, tie]}
+
+
+def next_cursor(
+    docs: List[Dict[str, Any]], per_page: int, field: str
+) -> Optional[str]:
+    """Cursor for the page after *docs*, or ``None`` when it was the last one."""
+    if len(docs) < per_page or not docs:
+        return None
+    return encode_cursor(field, docs[-1])
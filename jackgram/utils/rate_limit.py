@@ -0,0 +1,110 @@
+"""
+Client-side rate limiting for Telegram and other upstream APIs.
+
+``AdaptiveRateLimiter`` spaces calls evenly at a rate that adapts to
+FloodWait feedback: a FloodWait pauses every caller for the requested time
+and halves the rate, and each success nudges the rate back up towards the
+configured maximum (AIMD).
+
+``TokenBucket`` enforces a fixed request budget with bursts, for APIs with a
+published limit such as TMDb.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveRateLimiter:
+    """Evenly spaced calls whose rate backs off on FloodWait."""
+
+    def __init__(
+        self,
+        rate: float,
+        max_rate: float,
+        min_rate: float = 0.2,
+        increase: float = 0.05,
+    ) -> None:
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.rate = max(self.min_rate, min(rate, max_rate))
+        self.increase = increase  # requests/second added per success
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+        self.flood_waits = 0
+        self.requests = 0
+
+    async def acquire(self) -> None:
+        """Wait until the caller may issue its next request."""
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot, self._paused_until)
+            self._next_slot = slot + 1.0 / self.rate
+            self.requests += 1
+        delay = slot - now
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def on_success(self) -> None:
+        self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_flood_wait(self, seconds: float) -> None:
+        self.flood_waits += 1
+        self.rate = max(self.min_rate, self.rate / 2)
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        logger.warning(
+            "FloodWait of %ss: pausing and lowering rate to %.2f req/s",
+            seconds,
+            self.rate,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate": round(self.rate, 3),
+            "max_rate": self.max_rate,
+            "requests": self.requests,
+            "flood_waits": self.flood_waits,
+            "paused_seconds": max(0.0, self._paused_until - time.monotonic()),
+        }
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second, up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self.waits = 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """Take *tokens*, sleeping until the bucket holds enough of them."""
+        async with self._lock:
+            self._refill()
+            if self._tokens < tokens:
+                self.waits += 1
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= tokens
+
+    def stats(self) -> Dict[str, Any]:
+        self._refill()
+        return {
+            "rate": self.rate,
+            "capacity": self.capacity,
+            "tokens": round(self._tokens, 2),
+            "waits": self.waits,
+        }
@@ -0,0 +1,97 @@
+"""
+Token-based catalogue search.
+
+Every tmdb and raw media document carries two precomputed arrays:
+
+- ``title_tokens``: normalized words of the title and original title.
+- ``search_tokens``: those plus the words of every file name in the document.
+
+Both are maintained by ``Database`` on every write and indexed (multikey), so
+a query becomes one anchored prefix range scan per query word instead of an
+unanchored case-insensitive regex over every document.  Matches are ranked
+by how many query words hit a whole token, title hits weighing more than
+file name hits.
+"""
+
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List
+
+_WORD = re.compile(r"[^\W_]+")
+
+TITLE_WEIGHT = 3  # per query word matching a title token exactly
+TOKEN_WEIGHT = 1  # per query word matching any token exactly
+
+
+def tokenize(text: str) -> List[str]:
+    """Split *text* into lowercase, accent-free words (``_`` and ``.`` split too)."""
+    if not text:
+        return []
+    decomposed = unicodedata.normalize("NFKD", str(text))
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _WORD.findall(stripped.casefold())
+
+
+def _unique(tokens: Iterable[str]) -> List[str]:
+    return list(dict.fromkeys(tokens))
+
+
+def build_search_fields(
+    doc: Dict[str, Any], file_infos: Iterable[Dict[str, Any]]
+) -> Dict[str, List[str]]:
+    """Return the ``title_tokens`` / ``search_tokens`` fields for *doc*."""
+    title_tokens = _unique(
+        token
+        for field in ("title", "original_title")
+        for token in tokenize(doc.get(field) or "")
+    )
+    file_tokens = (
+        token for info in file_infos for token in tokenize(info.get("file_name", ""))
+    )
+    return {
+        "title_tokens": title_tokens,
+        "search_tokens": _unique([*title_tokens, *file_tokens]),
+    }
+
+
+def build_match(words: List[str]) -> Dict[str, Any]:
+    """Filter requiring every query word to prefix some token of the document."""
+    if not words:
+        return {}
+    return {
+        "$and": [{"search_tokens": {"$regex": f"^{re.escape(w)}"}} for w in words]
+    }
+
+
+def score_expression(words: List[str]) -> Dict[str, Any]:
+    """Aggregation expression ranking a matched document against *words*."""
+    return {
+        "$add": [
+            {
+                "$multiply": [
+                    TITLE_WEIGHT,
+                    {
+                        "$size": {
+                            "$setIntersection": [
+                                {"$ifNull": ["$title_tokens", []]},
+                                words,
+                            ]
+                        }
+                    },
+                ]
+            },
+            {
+                "$multiply": [
+                    TOKEN_WEIGHT,
+                    {
+                        "$size": {
+                            "$setIntersection": [
+                                {"$ifNull": ["$search_tokens", []]},
+                                words,
+                            ]
+                        }
+                    },
+                ]
+            },
+        ]
+    }
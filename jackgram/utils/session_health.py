@@ -0,0 +1,112 @@
+"""
+Live health scores for the Telegram user sessions.
+
+``MultiSessionManager`` keeps one ``SessionHealth`` per account and feeds it
+every request it times (latency), every session-level failure (connection
+drops, timeouts, FloodWaits) and the number of requests and download
+senders currently using the account.  ``pick_weighted`` then spreads new work
+across connected accounts in proportion to their score, so a slow, failing
+or busy account gets less traffic without being excluded outright.
+
+FloodWaits are also remembered per RPC type: an account that was told to
+wait on ``upload.getFile`` is quarantined for downloads until the deadline
+passes, while it keeps serving ``messages.getMessages`` and vice versa.
+"""
+
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, ClassVar, Dict, List, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+
+# RPC types FloodWait penalties are tracked for
+RPC_GET_FILE = "GetFile"
+RPC_GET_MESSAGES = "GetMessages"
+RPC_SEND_MEDIA = "SendMedia"
+
+
+@dataclass
+class SessionHealth:
+    """Exponentially weighted latency / error rate of one account."""
+
+    ALPHA: ClassVar[float] = 0.2  # weight of the newest sample
+    ERROR_PENALTY: ClassVar[float] = 4.0  # a 100% error rate = 5x less traffic
+
+    index: int
+    latency: float = 0.2  # seconds, EWMA
+    error_rate: float = 0.0  # 0..1, EWMA of failed vs. successful operations
+    in_flight: int = 0
+    requests: int = 0
+    errors: int = 0
+    reconnects: int = 0
+    last_error: str = ""
+    flood_waits: int = 0
+    # RPC type -> monotonic deadline of its FloodWait quarantine
+    flood_until: Dict[str, float] = field(default_factory=dict)
+    # Supervisor state: next reconnect attempt and its backoff
+    retry_at: float = 0.0
+    backoff: float = 0.0
+    updated: float = field(default_factory=time.monotonic)
+
+    def record_success(self, latency: Optional[float] = None) -> None:
+        self.requests += 1
+        if latency is not None:
+            self.latency += self.ALPHA * (latency - self.latency)
+        self.error_rate -= self.ALPHA * self.error_rate
+        self.updated = time.monotonic()
+
+    def record_error(self, error: BaseException) -> None:
+        self.requests += 1
+        self.errors += 1
+        self.error_rate += self.ALPHA * (1.0 - self.error_rate)
+        self.last_error = f"{type(error).__name__}: {error}"
+        self.updated = time.monotonic()
+
+    def record_flood_wait(self, rpc: str, seconds: float) -> None:
+        """Quarantine the account for *rpc* for the next *seconds*."""
+        self.flood_waits += 1
+        deadline = time.monotonic() + seconds
+        if deadline > self.flood_until.get(rpc, 0.0):
+            self.flood_until[rpc] = deadline
+
+    def flood_remaining(self, rpc: Optional[str]) -> float:
+        """Seconds left of the FloodWait quarantine for *rpc* (0 when none)."""
+        if rpc is None:
+            return 0.0
+        return max(0.0, self.flood_until.get(rpc, 0.0) - time.monotonic())
+
+    def penalties(self) -> Dict[str, float]:
+        """Remaining quarantine per RPC type; expired entries are dropped."""
+        now = time.monotonic()
+        for rpc in [r for r, until in self.flood_until.items() if until <= now]:
+            del self.flood_until[rpc]
+        return {rpc: round(until - now, 1) for rpc, until in self.flood_until.items()}
+
+    def score(self) -> float:
+        return 1.0 / (
+            (self.latency + 0.05)
+            * (1.0 + self.ERROR_PENALTY * self.error_rate)
+            * (1.0 + self.in_flight)
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "latency_ms": round(self.latency * 1000, 1),
+            "error_rate": round(self.error_rate, 3),
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "errors": self.errors,
+            "reconnects": self.reconnects,
+            "flood_waits": self.flood_waits,
+            "flood_penalties": self.penalties(),
+            "last_error": self.last_error,
+            "score": round(self.score(), 3),
+        }
+
+
+def pick_weighted(items: Sequence[T], healths: List[SessionHealth]) -> T:
+    """Pick one of *items* with probability proportional to its health score."""
+    if len(items) == 1:
+        return items[0]
+    return random.choices(items, weights=[h.score() for h in healths])[0]
@@ -0,0 +1,352 @@
+"""
+Single-flight download fan-out for concurrent viewers of the same file.
+
+When several clients stream the same document at roughly the same position,
+only one ``ParallelTransferrer`` talks to Telegram.  Every part it produces is
+fanned out to all subscribers waiting for that part, each through its own
+bounded buffer.
+
+A subscriber that falls too far behind is detached from the shared download
+instead of stalling everyone else; it (and any subscriber whose range
+outlives the shared download) transparently continues with a private
+transferrer from the part it stopped at.  When the upstream itself fails
+(FloodWait, expired file reference, ...) the error is re-raised to every
+subscriber instead, so one throttled download never turns into N retries.
+"""
+
+import asyncio
+import logging
+import math
+from typing import Any, AsyncGenerator, Dict, Optional
+
+from jackgram.utils.telegram_stream import (
+    MultiSessionManager,
+    ParallelTransferrer,
+    TypeLocation,
+    _cache_doc_id,
+    multi_session_manager,
+    stream_controller,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class _Subscriber:
+    """One consumer attached to a shared download."""
+
+    def __init__(self, start_part: int, end_part: int, max_buffer: int) -> None:
+        # Next part index the upstream has to deliver to this subscriber
+        self.next_part = start_part
+        # Exclusive upper bound of the parts this subscriber takes from upstream
+        self.end_part = end_part
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_buffer)
+        self.closed = False
+        # Set when dropped for not keeping up with the upstream
+        self.detached = False
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.queue.put_nowait(None)
+        except asyncio.QueueFull:
+            # The consumer still has parts to drain and will notice ``closed``
+            pass
+
+
+class _SharedDownload:
+    """A single upstream download whose parts are broadcast to subscribers."""
+
+    def __init__(
+        self,
+        broadcaster: "StreamBroadcaster",
+        key: tuple[int, int],
+        file: TypeLocation,
+        file_size: int,
+        dc_id: int,
+        part_size: int,
+        start_part: int,
+        end_part: int,
+    ) -> None:
+        self.broadcaster = broadcaster
+        self.key = key
+        self.file = file
+        self.file_size = file_size
+        self.dc_id = dc_id
+        self.part_size = part_size
+        self.start_part = start_part
+        self.end_part = end_part
+        # Index of the next part the upstream will produce
+        self.head = start_part
+        self.subscribers: set[_Subscriber] = set()
+        self.closed = False
+        # Exception the upstream download failed with, re-raised to subscribers
+        self.error: Optional[BaseException] = None
+        self._cancel_event = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    def can_join(self, start_part: int) -> bool:
+        return (
+            not self.closed
+            and self.head <= start_part < self.end_part
+            and start_part - self.head <= self.broadcaster._JOIN_WINDOW_PARTS
+        )
+
+    def add(self, start_part: int, end_part: int) -> _Subscriber:
+        sub = _Subscriber(
+            start_part,
+            min(end_part, self.end_part),
+            self.broadcaster._MAX_BUFFER_PARTS,
+        )
+        self.subscribers.add(sub)
+        return sub
+
+    def remove(self, sub: _Subscriber) -> None:
+        """Detach a subscriber, stopping the upstream once nobody is left."""
+        self.subscribers.discard(sub)
+        sub.close()
+        # Unblock an upstream ``put`` that may be waiting on this queue
+        while not sub.queue.empty():
+            sub.queue.get_nowait()
+        if not self.subscribers:
+            self._cancel_event.set()
+
+    async def _deliver(self, sub: _Subscriber, part: int, data: bytes) -> None:
+        try:
+            await asyncio.wait_for(
+                sub.queue.put(data), timeout=self.broadcaster._SLOW_SUBSCRIBER_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            logger.debug(
+                "[broadcast] Detaching slow subscriber at part %d of %s", part, self.key
+            )
+            self.broadcaster.detached += 1
+            sub.detached = True
+            self.remove(sub)
+            return
+
+        sub.next_part += 1
+        self.broadcaster.parts_fanned_out += 1
+        if sub.next_part >= sub.end_part:
+            self.subscribers.discard(sub)
+            sub.close()
+
+    async def _run(self) -> None:
+        transferrer = ParallelTransferrer(self.broadcaster.manager, self.dc_id)
+        offset = self.start_part * self.part_size
+        limit = min(self.end_part * self.part_size, self.file_size) - offset
+        download = transferrer.download(
+            self.file,
+            self.file_size,
+            offset=offset,
+            limit=limit,
+            part_size_kb=self.part_size / 1024,
+            cancel_event=self._cancel_event,
+        )
+        try:
+            # Aligned offset, so every yielded chunk is exactly one part
+            async for data in download:
+                part = self.head
+                self.head += 1
+                waiting = [s for s in self.subscribers if s.next_part == part]
+                if waiting:
+                    await asyncio.gather(
+                        *(self._deliver(s, part, data) for s in waiting)
+                    )
+                if not self.subscribers:
+                    break
+        except Exception as e:
+            logger.warning("[broadcast] Shared download %s failed: %s", self.key, e)
+            self.error = e
+        finally:
+            self.closed = True
+            self.broadcaster._forget(self)
+            for sub in list(self.subscribers):
+                sub.close()
+            self.subscribers.clear()
+            try:
+                await download.aclose()
+            except Exception:
+                pass
+            await transferrer._cleanup()
+            logger.debug("[broadcast] Shared download %s finished", self.key)
+
+
+class StreamBroadcaster:
+    """
+    Shares one upstream download between concurrent range requests.
+
+    Requests for the same document whose start falls within
+    ``_JOIN_WINDOW_PARTS`` parts ahead of a running download's head join it
+    instead of opening their own MTProto connections.
+    """
+
+    _JOIN_WINDOW_PARTS = 8  # how far ahead of the upstream head a request may join
+    _MAX_BUFFER_PARTS = 16  # per-subscriber buffer before backpressure applies
+    _SLOW_SUBSCRIBER_TIMEOUT = 10.0  # seconds a full buffer may stall the upstream
+
+    def __init__(self, manager: MultiSessionManager) -> None:
+        self.manager = manager
+        # (doc_id, part_size) -> running shared downloads for that document
+        self._downloads: dict[tuple[int, int], list[_SharedDownload]] = {}
+        self.joins = 0
+        self.detached = 0
+        self.parts_fanned_out = 0
+
+    def _forget(self, shared: _SharedDownload) -> None:
+        bucket = self._downloads.get(shared.key)
+        if not bucket:
+            return
+        if shared in bucket:
+            bucket.remove(shared)
+        if not bucket:
+            del self._downloads[shared.key]
+
+    def _subscribe(
+        self,
+        file: TypeLocation,
+        file_size: int,
+        dc_id: int,
+        doc_id: int,
+        part_size: int,
+        start_part: int,
+        end_part: int,
+    ) -> tuple[_SharedDownload, _Subscriber]:
+        key = (doc_id, part_size)
+        for shared in self._downloads.get(key, []):
+            if shared.can_join(start_part):
+                self.joins += 1
+                logger.debug(
+                    "[broadcast] Joining shared download %s at part %d (head=%d)",
+                    key,
+                    start_part,
+                    shared.head,
+                )
+                return shared, shared.add(start_part, end_part)
+
+        shared = _SharedDownload(
+            self, key, file, file_size, dc_id, part_size, start_part, end_part
+        )
+        sub = shared.add(start_part, end_part)
+        self._downloads.setdefault(key, []).append(shared)
+        shared.start()
+        return shared, sub
+
+    async def stream(
+        self,
+        file: TypeLocation,
+        file_size: int,
+        dc_id: int,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        cancel_event: Optional[asyncio.Event] = None,
+    ) -> AsyncGenerator[bytes, None]:
+        """
+        Stream a byte range, sharing the upstream with concurrent viewers.
+
+        Args:
+            file: The file location to download
+            file_size: Total file size in bytes
+            dc_id: DC the file lives on
+            offset: Byte offset to start from
+            limit: Number of bytes to stream (None for the rest of the file)
+            cancel_event: Optional event that, when set, aborts the stream
+
+        Yields:
+            Chunks of file data
+        """
+        if limit is None:
+            limit = file_size - offset
+
+        doc_id = _cache_doc_id(file)
+        if doc_id is None or limit <= 0:
+            # Not a shareable document location: plain private download
+            transferrer = ParallelTransferrer(self.manager, dc_id)
+            try:
+                async for chunk in transferrer.download(
+                    file, file_size, offset=offset, limit=limit, cancel_event=cancel_event
+                ):
+                    yield chunk
+            finally:
+                await transferrer._cleanup()
+            return
+
+        part_size = stream_controller.part_size(dc_id, file_size, doc_id=doc_id)
+        start_part = offset // part_size
+        end_part = math.ceil((offset + limit) / part_size)
+        skip_bytes = offset - start_part * part_size
+
+        shared, sub = self._subscribe(
+            file, file_size, dc_id, doc_id, part_size, start_part, end_part
+        )
+        bytes_yielded = 0
+        transferrer: Optional[ParallelTransferrer] = None
+        try:
+            # Phase 1: consume parts fanned out by the shared download
+            while bytes_yielded < limit:
+                if cancel_event and cancel_event.is_set():
+                    return
+                if sub.closed and sub.queue.empty():
+                    break
+                data = await sub.queue.get()
+                if data is None:
+                    break
+
+                if skip_bytes > 0:
+                    if len(data) <= skip_bytes:
+                        skip_bytes -= len(data)
+                        continue
+                    data = data[skip_bytes:]
+                    skip_bytes = 0
+
+                remaining = limit - bytes_yielded
+                if len(data) > remaining:
+                    data = data[:remaining]
+
+                yield data
+                bytes_yielded += len(data)
+
+            # An upstream failure is shared: retrying it once per subscriber
+            # would multiply the load on the account that just failed
+            if bytes_yielded < limit and shared.error is not None and not sub.detached:
+                raise shared.error
+
+            # Phase 2: finish privately if the shared download ended early
+            if bytes_yielded < limit:
+                resume_offset = offset + bytes_yielded
+                logger.debug(
+                    "[broadcast] Continuing privately from offset %d", resume_offset
+                )
+                transferrer = ParallelTransferrer(self.manager, dc_id)
+                async for chunk in transferrer.download(
+                    file,
+                    file_size,
+                    offset=resume_offset,
+                    limit=limit - bytes_yielded,
+                    part_size_kb=part_size / 1024,
+                    cancel_event=cancel_event,
+                ):
+                    yield chunk
+                    bytes_yielded += len(chunk)
+        finally:
+            shared.remove(sub)
+            if transferrer is not None:
+                await transferrer._cleanup()
+
+    def stats(self) -> Dict[str, Any]:
+        downloads = [d for bucket in self._downloads.values() for d in bucket]
+        return {
+            "shared_downloads": len(downloads),
+            "subscribers": sum(len(d.subscribers) for d in downloads),
+            "joins": self.joins,
+            "detached": self.detached,
+            "parts_fanned_out": self.parts_fanned_out,
+        }
+
+
+# Global broadcaster shared by all /dl requests
+stream_broadcaster = StreamBroadcaster(multi_session_manager)
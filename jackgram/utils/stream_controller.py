@@ -0,0 +1,453 @@
+"""
+Adaptive connection-count and part-size controller for Telegram streams.
+
+The controller keeps per-DC signals gathered from finished requests and
+transfers:
+
+- request round-trip time of ``upload.getFile`` calls (EWMA)
+- sustained throughput per connection (EWMA)
+- ``FloodWaitError`` penalties
+
+and turns them into a ``StreamPlan`` for every new download.  Connection
+counts follow an AIMD scheme per DC: the ceiling is halved on FloodWait and
+grows back by one after every clean transfer.  Part size grows up to
+Telegram's 1 MiB maximum when round trips are slow so fewer requests are
+needed per byte.  The switch has hysteresis, and once a document has been
+fetched with some part size it keeps it: the part size is part of both the
+chunk-cache key and the broadcast join key, so flapping would make cached
+parts miss and split viewers across separate upstreams.
+
+Every decision is recorded together with the reasons that shaped it, so the
+admin API can show why a stream got N connections.
+
+``ConnectionBudget`` caps the connections all streams together hold per
+(account, DC) and splits that capacity evenly between the streams running
+on a DC: each stream reserves its share when it opens, running streams
+shrink when more streams arrive, and a stream that finds the DC full waits
+for a connection instead of overshooting the budget.
+"""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+from telethon import utils
+
+KB = 1024
+MIN_PART_SIZE = 128 * KB
+MAX_PART_SIZE = 1024 * KB  # upload.getFile limit
+
+
+@dataclass
+class StreamPlan:
+    """Connection count and part size chosen for one download."""
+
+    dc_id: Optional[int]
+    connections: int
+    part_size: int
+    reasons: List[str] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+
+
+@dataclass
+class _DCState:
+    ceiling: int
+    rtt: Optional[float] = None
+    throughput_per_connection: Optional[float] = None
+    flood_until: float = 0.0
+    flood_waits: int = 0
+    transfers: int = 0
+    # Whether slow round trips currently select the largest parts
+    large_parts: bool = False
+
+
+def linear_connection_count(
+    size: int, max_count: int = 20, full_size: int = 100 * 1024 * 1024
+) -> int:
+    """
+    Calculate a baseline number of connections based on transfer size.
+
+    Small transfers use fewer connections, large ones use more.
+    """
+    if size > full_size:
+        return max_count
+    return max(1, math.ceil((size / full_size) * max_count))
+
+
+class AdaptiveStreamController:
+    """Chooses per-stream parallelism and part size from live per-DC signals."""
+
+    _EWMA_ALPHA = 0.3
+    _FLOOD_PENALTY_SECONDS = 300.0  # how long a FloodWait keeps the ceiling low
+    _HIGH_RTT_SECONDS = 0.35  # round trips above this favour bigger parts
+    _LOW_RTT_SECONDS = 0.2  # ... until they drop back below this
+    _SEEK_MAX_CONNECTIONS = 4  # seeks favour fast startup over throughput
+    _MAX_DECISIONS = 50  # recent decisions kept for the admin API
+    _MAX_PINNED_DOCS = 4096  # documents whose part size is remembered
+
+    def __init__(self, max_connections: int) -> None:
+        self.max_connections = max(1, max_connections)
+        self._dcs: Dict[Optional[int], _DCState] = {}
+        self._decisions: Deque[StreamPlan] = deque(maxlen=self._MAX_DECISIONS)
+        # doc_id -> part size it was first fetched with, least recent first
+        self._doc_part_sizes: "OrderedDict[int, int]" = OrderedDict()
+
+    def _state(self, dc_id: Optional[int]) -> _DCState:
+        state = self._dcs.get(dc_id)
+        if state is None:
+            state = self._dcs[dc_id] = _DCState(ceiling=self.max_connections)
+        return state
+
+    def _ewma(self, current: Optional[float], sample: float) -> float:
+        if current is None:
+            return sample
+        return self._EWMA_ALPHA * sample + (1 - self._EWMA_ALPHA) * current
+
+    def part_size(
+        self,
+        dc_id: Optional[int],
+        file_size: int,
+        reasons: Optional[List[str]] = None,
+        doc_id: Optional[int] = None,
+    ) -> int:
+        """
+        Pick a part size in bytes: a power of two between 128 KiB and 1 MiB.
+
+        With a *doc_id* the first choice is pinned for that document, so its
+        cached parts and shared downloads stay reachable while the RTT moves.
+        """
+        if doc_id is not None and doc_id in self._doc_part_sizes:
+            self._doc_part_sizes.move_to_end(doc_id)
+            part_size = self._doc_part_sizes[doc_id]
+            if reasons is not None:
+                reasons.append(f"document pinned to {part_size // KB} KiB parts")
+            return part_size
+
+        part_size = int(utils.get_appropriated_part_size(file_size) * KB)
+        state = self._dcs.get(dc_id)
+        if state is not None and state.large_parts and file_size >= 100 * 1024 * 1024:
+            part_size = MAX_PART_SIZE
+            if reasons is not None:
+                reasons.append(f"high rtt {state.rtt:.2f}s: {part_size // KB} KiB parts")
+        part_size = max(MIN_PART_SIZE, min(part_size, MAX_PART_SIZE))
+
+        if doc_id is not None:
+            self._doc_part_sizes[doc_id] = part_size
+            if len(self._doc_part_sizes) > self._MAX_PINNED_DOCS:
+                self._doc_part_sizes.popitem(last=False)
+        return part_size
+
+    def plan(
+        self,
+        dc_id: Optional[int],
+        file_size: int,
+        limit: int,
+        offset: int = 0,
+        part_size: Optional[int] = None,
+        connection_count: Optional[int] = None,
+        doc_id: Optional[int] = None,
+    ) -> StreamPlan:
+        """
+        Decide connection count and part size for a download.
+
+        Explicit *part_size* / *connection_count* values are honoured (still
+        clamped to the DC ceiling) so callers can pin either dimension.
+        """
+        reasons: List[str] = []
+        state = self._state(dc_id)
+        now = time.monotonic()
+
+        if part_size is None:
+            part_size = self.part_size(dc_id, file_size, reasons, doc_id)
+        else:
+            reasons.append(f"part size pinned to {part_size // KB} KiB")
+
+        ceiling = min(state.ceiling, self.max_connections)
+        if state.flood_until > now:
+            ceiling = max(1, min(ceiling, self.max_connections // 4))
+            reasons.append(
+                f"flood wait penalty ({state.flood_until - now:.0f}s left): ceiling {ceiling}"
+            )
+        elif ceiling < self.max_connections:
+            reasons.append(f"recovering after flood wait: ceiling {ceiling}")
+
+        if connection_count is None:
+            if offset > 0:
+                ceiling = min(ceiling, self._SEEK_MAX_CONNECTIONS)
+                reasons.append(f"seek: capped at {ceiling}")
+            connection_count = linear_connection_count(limit, max_count=ceiling)
+            reasons.append(f"{limit} bytes requested: {connection_count} connections")
+        else:
+            reasons.append(f"connection count pinned to {connection_count}")
+
+        # Never open more connections than there are parts to fetch
+        parts = max(1, math.ceil(limit / part_size))
+        connections = max(1, min(connection_count, ceiling, parts))
+        if connections < connection_count and parts < connection_count:
+            reasons.append(f"only {parts} parts")
+
+        plan = StreamPlan(
+            dc_id=dc_id, connections=connections, part_size=part_size, reasons=reasons
+        )
+        self._decisions.append(plan)
+        return plan
+
+    def record_request(self, dc_id: Optional[int], seconds: float) -> None:
+        """Record the round-trip time of one ``upload.getFile`` call."""
+        state = self._state(dc_id)
+        state.rtt = self._ewma(state.rtt, seconds)
+        if state.rtt > self._HIGH_RTT_SECONDS:
+            state.large_parts = True
+        elif state.rtt < self._LOW_RTT_SECONDS:
+            state.large_parts = False
+
+    def record_flood_wait(self, dc_id: Optional[int], seconds: int) -> None:
+        """Halve the DC's connection ceiling and start a penalty window."""
+        state = self._state(dc_id)
+        state.flood_waits += 1
+        state.ceiling = max(1, state.ceiling // 2)
+        state.flood_until = max(
+            state.flood_until,
+            time.monotonic() + max(seconds, self._FLOOD_PENALTY_SECONDS),
+        )
+
+    def record_transfer(
+        self, dc_id: Optional[int], nbytes: int, elapsed: float, connections: int
+    ) -> None:
+        """Feed the throughput of a finished transfer back into the DC state."""
+        if nbytes <= 0 or elapsed <= 0 or connections <= 0:
+            return
+        state = self._state(dc_id)
+        state.transfers += 1
+        state.throughput_per_connection = self._ewma(
+            state.throughput_per_connection, nbytes / elapsed / connections
+        )
+        # Additive increase once the penalty window is over
+        if state.flood_until <= time.monotonic() and state.ceiling < self.max_connections:
+            state.ceiling += 1
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "max_connections": self.max_connections,
+            "dcs": {
+                str(dc_id): {
+                    "ceiling": state.ceiling,
+                    "rtt_seconds": state.rtt,
+                    "throughput_per_connection": state.throughput_per_connection,
+                    "flood_waits": state.flood_waits,
+                    "flood_penalty_seconds": max(0.0, state.flood_until - now),
+                    "transfers": state.transfers,
+                    "large_parts": state.large_parts,
+                }
+                for dc_id, state in self._dcs.items()
+            },
+            "pinned_documents": len(self._doc_part_sizes),
+            "recent_decisions": [asdict(plan) for plan in self._decisions],
+        }
+
+
+class BudgetExhausted(Exception):
+    """No download connection to the DC freed up in time."""
+
+
+class StreamShare:
+    """
+    Connections reserved for one stream on one DC.
+
+    ``limit`` follows the DC's fair share: when more streams open, a running
+    stream is expected to drop connections above it (``give_back``) at its
+    next part boundary.  ``on_shrink`` is called whenever that happens.
+    """
+
+    def __init__(
+        self, budget: "ConnectionBudget", dc_id: Optional[int], granted: int
+    ) -> None:
+        self._budget = budget
+        self.dc_id = dc_id
+        self.granted = granted
+        self.on_shrink: Optional[Callable[[], None]] = None
+        self.closed = False
+
+    @property
+    def limit(self) -> int:
+        return min(self.granted, self._budget.fair_share(self.dc_id))
+
+    def give_back(self) -> None:
+        """Return one reserved connection (a sender above ``limit`` was dropped)."""
+        if self.closed or self.granted <= 1:
+            return
+        self.granted -= 1
+        self._budget._free(self.dc_id, 1)
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self._budget._close(self)
+
+
+class ConnectionBudget:
+    """
+    Process-wide download connection budget per (account, DC), shared fairly.
+
+    A DC's capacity is ``per_account`` for every connected account.  Opening
+    a stream reserves its connections right away, never more than are free
+    and never more than the fair share ``capacity // streams``; running
+    streams above a shrinking fair share are asked to give connections back.
+    A stream that finds nothing free waits (FIFO) for up to ``_MAX_WAIT``
+    seconds for a connection to be handed over.
+    """
+
+    _MAX_WAIT = 30.0  # seconds a stream waits for a free connection
+
+    def __init__(self, per_account: int) -> None:
+        self.per_account = max(1, per_account)
+        # Connections actually open per (account, DC), see lease / release
+        self._leased: Dict[Tuple[Hashable, Optional[int]], int] = {}
+        self._reserved: Dict[Optional[int], int] = {}
+        self._accounts: Dict[Optional[int], int] = {}
+        self._shares: Dict[Optional[int], List[StreamShare]] = {}
+        # Streams waiting for a connection, counted in the fair share
+        self._waiters: Dict[Optional[int], Deque[asyncio.Future]] = {}
+        self.shrunk = 0  # streams that got fewer connections than planned
+        self.waited = 0
+        self.timed_out = 0
+
+    def capacity(self, dc_id: Optional[int]) -> int:
+        return self.per_account * self._accounts.get(dc_id, 1)
+
+    def free(self, dc_id: Optional[int]) -> int:
+        return self.capacity(dc_id) - self._reserved.get(dc_id, 0)
+
+    def streams(self, dc_id: Optional[int]) -> int:
+        return len(self._shares.get(dc_id, ())) + len(self._waiters.get(dc_id, ()))
+
+    def fair_share(self, dc_id: Optional[int]) -> int:
+        return max(1, self.capacity(dc_id) // max(1, self.streams(dc_id)))
+
+    async def open_stream(
+        self, dc_id: Optional[int], wanted: int, accounts: int
+    ) -> StreamShare:
+        """
+        Reserve connections for a stream on *dc_id* and return its share.
+
+        Raises ``BudgetExhausted`` when no connection frees up in time.
+        """
+        wanted = max(1, wanted)
+        self._accounts[dc_id] = max(1, accounts)
+        granted = 0
+        if self.free(dc_id) < 1 or self._waiters.get(dc_id):
+            granted = await self._wait(dc_id)
+
+        share = StreamShare(self, dc_id, granted)
+        self._shares.setdefault(dc_id, []).append(share)
+        extra = min(wanted, self.fair_share(dc_id)) - granted
+        extra = max(0, min(extra, self.free(dc_id)))
+        self._reserved[dc_id] = self._reserved.get(dc_id, 0) + extra
+        share.granted += extra
+        if share.granted < wanted:
+            self.shrunk += 1
+        self._rebalance(dc_id)
+        return share
+
+    async def _wait(self, dc_id: Optional[int]) -> int:
+        """Queue for a connection handed over by a closing or shrinking stream."""
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._waiters.setdefault(dc_id, deque()).append(waiter)
+        self.waited += 1
+        timer = loop.call_later(self._MAX_WAIT, self._expire, waiter)
+        # One more stream on the DC: running streams shrink to make room
+        self._rebalance(dc_id)
+        try:
+            handed_over = await waiter
+        except asyncio.CancelledError:
+            self._drop_waiter(dc_id, waiter)
+            if waiter.done() and not waiter.cancelled() and waiter.result():
+                self._free(dc_id, 1)  # handed over just as we were cancelled
+            raise
+        finally:
+            timer.cancel()
+            # Until here a handed-over waiter still counts as a stream
+            self._drop_waiter(dc_id, waiter)
+        if not handed_over:
+            self.timed_out += 1
+            raise BudgetExhausted(f"No download connection to DC {dc_id} freed up")
+        return 1
+
+    def _expire(self, waiter: asyncio.Future) -> None:
+        if not waiter.done():
+            waiter.set_result(False)
+
+    def _drop_waiter(self, dc_id: Optional[int], waiter: asyncio.Future) -> None:
+        waiters = self._waiters.get(dc_id)
+        if waiters is not None and waiter in waiters:
+            waiters.remove(waiter)
+        if not waiters:
+            self._waiters.pop(dc_id, None)
+
+    def _rebalance(self, dc_id: Optional[int]) -> None:
+        """Ask streams holding more than the fair share to shrink."""
+        fair = self.fair_share(dc_id)
+        for share in self._shares.get(dc_id, ()):
+            if share.granted > fair and share.on_shrink is not None:
+                share.on_shrink()
+
+    def _free(self, dc_id: Optional[int], count: int) -> None:
+        """Hand released connections to waiting streams, or unreserve them."""
+        for _ in range(count):
+            waiters = self._waiters.get(dc_id, ())
+            waiter = next((w for w in waiters if not w.done()), None)
+            if waiter is not None:
+                waiter.set_result(True)  # the reservation passes on
+            else:
+                self._reserved[dc_id] = self._reserved.get(dc_id, 0) - 1
+        if self._reserved.get(dc_id, 1) <= 0:
+            del self._reserved[dc_id]
+
+    def _close(self, share: StreamShare) -> None:
+        shares = self._shares.get(share.dc_id, [])
+        if share in shares:
+            shares.remove(share)
+        if not shares:
+            self._shares.pop(share.dc_id, None)
+        self._free(share.dc_id, share.granted)
+
+    def lease(self, account: Hashable, dc_id: Optional[int]) -> None:
+        key = (account, dc_id)
+        self._leased[key] = self._leased.get(key, 0) + 1
+
+    def release(self, account: Hashable, dc_id: Optional[int]) -> None:
+        key = (account, dc_id)
+        remaining = self._leased.get(key, 0) - 1
+        if remaining > 0:
+            self._leased[key] = remaining
+        else:
+            self._leased.pop(key, None)
+
+    def full(self, account: Hashable, dc_id: Optional[int]) -> bool:
+        return self._leased.get((account, dc_id), 0) >= self.per_account
+
+    def leased(self, dc_id: Optional[int]) -> int:
+        return sum(n for (_, dc), n in self._leased.items() if dc == dc_id)
+
+    def stats(self) -> Dict[str, Any]:
+        dcs = set(self._shares) | set(self._waiters) | {dc for _, dc in self._leased}
+        return {
+            "per_account": self.per_account,
+            "shrunk_streams": self.shrunk,
+            "waited_streams": self.waited,
+            "timed_out_streams": self.timed_out,
+            "dcs": {
+                str(dc_id): {
+                    "streams": len(self._shares.get(dc_id, ())),
+                    "waiting": len(self._waiters.get(dc_id, ())),
+                    "reserved": self._reserved.get(dc_id, 0),
+                    "connections": self.leased(dc_id),
+                }
+                for dc_id in dcs
+            },
+        }
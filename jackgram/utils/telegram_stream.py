@@ -15,13 +15,16 @@ import logging
 import math
 import re
 import struct
-from dataclasses import dataclass
+import time
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass
 from io import BytesIO
-from typing import AsyncGenerator, Optional, Union
+from typing import Any, AsyncGenerator, Dict, Optional, Union
 from urllib.parse import urlparse
 
 from telethon import TelegramClient, utils
 from telethon.crypto import AuthKey
+from telethon.errors import AuthKeyUnregisteredError, FloodWaitError, ServerError
 from telethon.network import MTProtoSender
 from telethon.sessions import StringSession
 from telethon.tl.alltlobjects import LAYER
@@ -43,10 +46,62 @@ from telethon.tl.types import (
     Photo,
 )
 
-from jackgram.bot.bot import API_ID, API_HASH, BOT_TOKEN, WORKERS
+from jackgram.bot.bot import (
+    API_ID,
+    API_HASH,
+    BOT_TOKEN,
+    CHUNK_CACHE_DIR,
+    CHUNK_CACHE_SIZE_MB,
+    DC_CONNECTION_BUDGET,
+    MEDIA_INFO_CACHE_FILE,
+    MEDIA_INFO_CACHE_SIZE,
+    STREAM_METADATA_CACHE_SIZE,
+    STREAM_METADATA_CACHE_TTL,
+    STREAM_PREFETCH_PARTS,
+    WORKERS,
+)
+from jackgram.utils.auth_key_store import AuthKeyStore, auth_key_store
+from jackgram.utils.cache import TTLCache
+from jackgram.utils.chunk_cache import ChunkCache
+from jackgram.utils.session_health import (
+    RPC_GET_FILE,
+    RPC_GET_MESSAGES,
+    SessionHealth,
+    pick_weighted,
+)
+from jackgram.utils.stream_controller import (
+    AdaptiveStreamController,
+    ConnectionBudget,
+    StreamShare,
+)
 
 logger = logging.getLogger(__name__)
 
+# Shared on-disk cache of downloaded parts (disabled when size is 0)
+chunk_cache = ChunkCache(CHUNK_CACHE_DIR, CHUNK_CACHE_SIZE_MB * 1024 * 1024)
+
+# Per-DC connection count / part size decisions for all streams
+stream_controller = AdaptiveStreamController(max_connections=min(WORKERS, 20))
+
+# Download connections per (account, DC) across all streams
+connection_budget = ConnectionBudget(DC_CONNECTION_BUDGET)
+
+# Failures that say something about the account / its connection rather than
+# about the requested message or file; they lower the session's health score
+SESSION_ERRORS = (OSError, asyncio.TimeoutError, ServerError, FloodWaitError)
+
+
+class AllSessionsFloodWaited(FloodWaitError):
+    """Every connected session is in a FloodWait quarantine for the RPC type."""
+
+    def __init__(self, rpc: str, seconds: float) -> None:
+        super().__init__(request=None, capture=math.ceil(seconds))
+        self.rpc = rpc
+        self.args = (
+            f"All sessions are flood-waited for {rpc}: {self.seconds}s left",
+        )
+
+
 # Type aliases for file locations
 TypeLocation = Union[
     Document,
@@ -220,6 +275,44 @@ class MediaInfo:
     dc_id: Optional[int] = None
 
 
+@dataclass
+class StreamMetadata:
+    """Everything ``/dl`` needs to start streaming a file, resolved once."""
+
+    media: Dict[str, Any]
+    file_location: "TypeLocation"
+    dc_id: int
+    file_size: int
+    tmdb_id: Optional[int] = None
+
+
+# (hash, tmdb_id, file_id) of a /dl request -> StreamMetadata, so follow-up
+# range requests for the same file need neither MongoDB nor Telegram
+stream_metadata_cache: TTLCache[StreamMetadata] = TTLCache(
+    STREAM_METADATA_CACHE_SIZE, STREAM_METADATA_CACHE_TTL
+)
+
+
+def invalidate_stream_metadata(
+    hash: Optional[str] = None,
+    tmdb_id: Optional[int] = None,
+    chat_id: Optional[int] = None,
+) -> int:
+    """Drop cached stream metadata for a file, a tmdb entry or a whole chat."""
+    dropped = 0
+    if hash is not None:
+        dropped += stream_metadata_cache.discard_if(lambda key, _: key[0] == hash)
+    if tmdb_id is not None:
+        dropped += stream_metadata_cache.discard_if(
+            lambda _, meta: meta.tmdb_id == tmdb_id
+        )
+    if chat_id is not None:
+        dropped += stream_metadata_cache.discard_if(
+            lambda _, meta: meta.media.get("chat_id") == chat_id
+        )
+    return dropped
+
+
 def parse_telegram_url(url: str) -> TelegramMediaRef:
     """
     Parse a Telegram URL or file_id into a TelegramMediaRef.
@@ -275,24 +368,58 @@ def parse_telegram_url(url: str) -> TelegramMediaRef:
     raise ValueError(f"Unrecognized Telegram URL or file_id format: {url}")
 
 
+def _cache_doc_id(file: TypeLocation) -> Optional[int]:
+    """Return the document id used as chunk cache key, if the location is cacheable."""
+    if isinstance(file, InputDocumentFileLocation):
+        return file.id
+    return None
+
+
 @dataclass
 class DownloadSender:
     """Handles downloading chunks from a single connection."""
 
     client: TelegramClient
     sender: MTProtoSender
-    request: GetFileRequest
-    remaining: int
-    stride: int
-
-    async def next(self) -> Optional[bytes]:
-        """Download the next chunk."""
-        if not self.remaining:
-            return None
-        result = await self.client._call(self.sender, self.request)
-        self.remaining -= 1
-        self.request.offset += self.stride
-        return result.bytes
+    file: TypeLocation
+    part_size: int
+    dc_id: int
+    auth_key: Optional[AuthKey] = None
+    doc_id: Optional[int] = None
+    # Cleared when a request fails, so the connection is not returned to the pool
+    healthy: bool = True
+    # Bytes actually fetched from Telegram (cache hits excluded)
+    network_bytes: int = 0
+    # The exception that made the sender unhealthy, reported to session health
+    error: Optional[BaseException] = None
+
+    async def fetch(self, offset: int) -> bytes:
+        """Download the part at *offset*, serving it from the chunk cache if possible."""
+        if self.doc_id is not None:
+            data = await chunk_cache.get(self.doc_id, offset, self.part_size)
+            if data is not None:
+                return data
+        started = time.monotonic()
+        try:
+            result = await self.client._call(
+                self.sender,
+                GetFileRequest(self.file, offset=offset, limit=self.part_size),
+            )
+        except FloodWaitError as e:
+            stream_controller.record_flood_wait(self.dc_id, e.seconds)
+            self.healthy = False
+            self.error = e
+            raise
+        except Exception as e:
+            self.healthy = False
+            self.error = e
+            raise
+        stream_controller.record_request(self.dc_id, time.monotonic() - started)
+        data = result.bytes
+        self.network_bytes += len(data)
+        if self.doc_id is not None:
+            await chunk_cache.put(self.doc_id, offset, self.part_size, data)
+        return data
 
     async def disconnect(self) -> None:
         """Disconnect this sender gracefully, awaiting internal task finalization."""
@@ -330,22 +457,38 @@ class ParallelTransferrer:
 
         self.dc_id = dc_id
         self.senders: Optional[list[DownloadSender]] = None
-        # Cache auth keys per DC to avoid repeated ExportAuthorizationRequest calls
-        self._dc_auth_keys: dict[int, "AuthKey"] = {}
+        # Sustained network throughput (bytes/s) of the last download
+        self.throughput = 0.0
 
     async def _cleanup(self) -> None:
-        """Clean up all sender connections gracefully."""
+        """Return healthy senders to the shared pool and disconnect the rest."""
         if self.senders:
-            # Use return_exceptions=True to prevent one failed disconnect from blocking others
-            tasks = [
-                asyncio.create_task(sender.disconnect()) for sender in self.senders
-            ]
-            await asyncio.gather(*tasks, return_exceptions=True)
+            await self._release_senders(self.senders)
+            self.senders = None
+
+    async def _release_senders(self, senders: list[DownloadSender]) -> None:
+        if senders:
+            pool = self.manager._sender_pool
+            broken = [s for s in senders if not s.healthy]
+            for s in senders:
+                self.manager._session_released(s.client, s.error, s.dc_id)
+                if isinstance(s.error, AuthKeyUnregisteredError):
+                    await pool.forget_auth(s.client, s.dc_id)
+            # Use return_exceptions=True to prevent one failed release from blocking others
+            await asyncio.gather(
+                *(
+                    pool.release(s.client, s.dc_id, s.sender, s.auth_key)
+                    for s in senders
+                    if s.healthy
+                ),
+                *(s.disconnect() for s in broken),
+                return_exceptions=True,
+            )
 
             # Explicitly wait for Telethon's internal tasks to finish before removing references
             # to prevent "Task was destroyed but it is pending" errors during GC.
             tasks_to_wait = []
-            for s in self.senders:
+            for s in broken:
                 for obj in (
                     s.sender,
                     getattr(s.sender, "_connection", None),
@@ -364,127 +507,57 @@ class ParallelTransferrer:
                 except Exception:
                     pass
 
-            self.senders = None
-
-    @staticmethod
-    def _get_connection_count(
-        file_size: int, max_count: int = 20, full_size: int = 100 * 1024 * 1024
-    ) -> int:
-        """
-        Calculate optimal number of connections based on file size.
-
-        Small files use fewer connections, large files use more.
-        """
-        if file_size > full_size:
-            return max_count
-        return max(1, math.ceil((file_size / full_size) * max_count))
-
-    async def _create_sender(self) -> tuple[TelegramClient, MTProtoSender]:
-        """Create a new MTProtoSender connection to the DC from the session manager pool."""
-        client = await self.manager.get_client()
+    async def _create_sender(
+        self,
+    ) -> tuple[TelegramClient, MTProtoSender, int, Optional[AuthKey]]:
+        """Borrow an MTProtoSender connected to the file's DC from the shared pool."""
+        client = await self.manager.get_client(RPC_GET_FILE, self.dc_id)
 
         # If dc_id not specified, default to client's primary DC
         dc_id = self.dc_id or client.session.dc_id
-        dc = await client._get_dc(dc_id)
-
-        # Use cached auth key first, then fall back to session key if same DC
-        auth_key = self._dc_auth_keys.get(dc_id)
-        if auth_key is None and dc_id == client.session.dc_id:
-            auth_key = client.session.auth_key
-
-        sender = MTProtoSender(auth_key, loggers=client._log)
-        await sender.connect(
-            client._connection(
-                dc.ip_address,
-                dc.port,
-                dc.id,
-                loggers=client._log,
-                proxy=client._proxy,
-            )
-        )
-        if not auth_key:
-            logger.debug(
-                f"[Parallel] Exporting auth to DC {dc_id} for session {id(client.session.auth_key)}"
-            )
-            auth = await client(ExportAuthorizationRequest(dc_id))
-            # Save and restore _init_request.query to avoid permanently mutating client state
-            original_query = client._init_request.query
-            try:
-                client._init_request.query = ImportAuthorizationRequest(
-                    id=auth.id, bytes=auth.bytes
-                )
-                req = InvokeWithLayerRequest(LAYER, client._init_request)
-                await sender.send(req)
-            finally:
-                client._init_request.query = original_query
-            # Cache the auth key so subsequent senders reuse it
-            self._dc_auth_keys[dc_id] = sender.auth_key
-
-        return client, sender
+        sender, auth_key = await self.manager._sender_pool.acquire(client, dc_id)
+        self.manager._session_acquired(client, dc_id)
+        return client, sender, dc_id, auth_key
 
     async def _create_download_sender(
-        self,
-        file: TypeLocation,
-        index: int,
-        part_size: int,
-        stride: int,
-        part_count: int,
-        base_offset: int = 0,
+        self, file: TypeLocation, part_size: int
     ) -> DownloadSender:
-        """Create a DownloadSender for a specific chunk offset."""
-        client, sender = await self._create_sender()
+        """Create a DownloadSender bound to one MTProto connection."""
+        client, sender, dc_id, auth_key = await self._create_sender()
         return DownloadSender(
             client=client,
             sender=sender,
-            request=GetFileRequest(
-                file, offset=base_offset + index * part_size, limit=part_size
-            ),
-            stride=stride,
-            remaining=part_count,
+            file=file,
+            part_size=part_size,
+            dc_id=dc_id,
+            auth_key=auth_key,
+            doc_id=_cache_doc_id(file),
         )
 
     async def _init_download(
-        self,
-        connections: int,
-        file: TypeLocation,
-        part_count: int,
-        part_size: int,
-        base_offset: int = 0,
+        self, connections: int, file: TypeLocation, part_size: int
     ) -> None:
-        """Initialize all download senders."""
-        minimum, remainder = divmod(part_count, connections)
-
-        def get_part_count() -> int:
-            nonlocal remainder
-            if remainder > 0:
-                remainder -= 1
-                return minimum + 1
-            return minimum
-
-        # Create first sender synchronously to handle auth export
-        self.senders = [
-            await self._create_download_sender(
-                file,
-                0,
-                part_size,
-                connections * part_size,
-                get_part_count(),
-                base_offset,
-            ),
-            *await asyncio.gather(
-                *[
-                    self._create_download_sender(
-                        file,
-                        i,
-                        part_size,
-                        connections * part_size,
-                        get_part_count(),
-                        base_offset,
-                    )
-                    for i in range(1, connections)
-                ]
-            ),
-        ]
+        """
+        Initialize all download senders.
+
+        If any sender cannot be created, the ones that were are still kept in
+        ``self.senders`` so ``_cleanup`` gives them back before the error
+        propagates.
+        """
+        # Borrow the first sender synchronously so a needed auth export
+        # happens once and is cached by the pool for the others
+        self.senders = [await self._create_download_sender(file, part_size)]
+        results = await asyncio.gather(
+            *[
+                self._create_download_sender(file, part_size)
+                for _ in range(1, connections)
+            ],
+            return_exceptions=True,
+        )
+        self.senders += [r for r in results if isinstance(r, DownloadSender)]
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
 
     async def download(
         self,
@@ -499,6 +572,10 @@ class ParallelTransferrer:
         """
         Download file in parallel chunks.
 
+        Parts are requested through a sliding window of
+        ``STREAM_PREFETCH_PARTS`` in-flight requests spread over all senders
+        and yielded in order as soon as they are available.
+
         Args:
             file: The file location to download
             file_size: Total file size in bytes
@@ -515,18 +592,26 @@ class ParallelTransferrer:
         if limit is None:
             limit = file_size - offset
 
-        # Clamp connection count to configured max
-        max_connections = min(WORKERS, 20)
-        # For seek requests (offset > 0), use fewer connections for faster startup
-        if offset > 0 and connection_count is None:
-            max_connections = min(max_connections, 4)
-        connection_count = connection_count or self._get_connection_count(
-            limit, max_count=max_connections
+        # Connection count and part size come from the adaptive controller,
+        # which clamps them to the DC's current ceiling
+        doc_id = _cache_doc_id(file)
+        plan = stream_controller.plan(
+            self.dc_id,
+            file_size,
+            limit,
+            offset=offset,
+            part_size=int(part_size_kb * 1024) if part_size_kb else None,
+            connection_count=connection_count,
+            doc_id=doc_id,
         )
-        connection_count = min(connection_count, max_connections)
-
-        part_size = int(
-            (part_size_kb or utils.get_appropriated_part_size(file_size)) * 1024
+        connection_count = plan.connections
+        part_size = plan.part_size
+        logger.debug(
+            "Stream plan for DC %s: %d connections, %d bytes/part (%s)",
+            self.dc_id,
+            connection_count,
+            part_size,
+            "; ".join(plan.reasons),
         )
         # Round offset down to part boundary
         aligned_offset = (offset // part_size) * part_size
@@ -534,91 +619,274 @@ class ParallelTransferrer:
 
         part_count = math.ceil((limit + skip_bytes) / part_size)
 
-        logger.debug(
-            f"Starting parallel download: {connection_count} connections, "
-            f"{part_size} bytes/part, {part_count} parts, offset={offset}, aligned_offset={aligned_offset}"
-        )
-
-        await self._init_download(
-            connection_count, file, part_count, part_size, base_offset=aligned_offset
-        )
-
         part = 0
         bytes_yielded = 0
-        while part < part_count and bytes_yielded < limit:
-            # Check cancellation before starting a new batch
+
+        # Serve the leading run of cached parts straight from disk and only
+        # open MTProto senders for whatever is left after the first miss.
+        while (
+            doc_id is not None
+            and part < part_count
+            and bytes_yielded < limit
+            and chunk_cache.contains(doc_id, aligned_offset + part * part_size, part_size)
+        ):
             if cancel_event and cancel_event.is_set():
-                logger.debug("Download cancelled by cancel_event before batch")
+                logger.debug("Download cancelled by cancel_event while reading cache")
+                return
+
+            data = await chunk_cache.get(
+                doc_id, aligned_offset + part * part_size, part_size
+            )
+            if data is None:
                 break
+            part += 1
 
-            tasks = [asyncio.ensure_future(sender.next()) for sender in self.senders]
-            try:
-                for task in tasks:
-                    # Check cancellation between awaits
-                    if cancel_event and cancel_event.is_set():
-                        logger.debug("Download cancelled by cancel_event mid-batch")
-                        break
-
-                    data = await task
-                    if not data:
-                        break
-
-                    # Handle offset alignment - skip initial bytes if needed
-                    if skip_bytes > 0:
-                        if len(data) <= skip_bytes:
-                            skip_bytes -= len(data)
-                            part += 1
-                            continue
-                        data = data[skip_bytes:]
-                        skip_bytes = 0
-
-                    # Handle limit - truncate if we'd exceed
-                    remaining = limit - bytes_yielded
-                    if len(data) > remaining:
-                        data = data[:remaining]
-
-                    yield data
-                    bytes_yielded += len(data)
+            if skip_bytes > 0:
+                if len(data) <= skip_bytes:
+                    skip_bytes -= len(data)
+                    continue
+                data = data[skip_bytes:]
+                skip_bytes = 0
+
+            remaining = limit - bytes_yielded
+            if len(data) > remaining:
+                data = data[:remaining]
+
+            yield data
+            bytes_yielded += len(data)
+
+        if part >= part_count or bytes_yielded >= limit:
+            logger.debug(f"Served {part} parts from chunk cache")
+            return
+
+        connection_count = min(connection_count, part_count - part)
+        # Concurrent streams on this DC split the process-wide budget
+        share = await self.manager.open_download(self.dc_id, connection_count)
+        if share.granted < connection_count:
+            plan.reasons.append(
+                f"fair share of DC connection budget: {share.granted}"
+            )
+            connection_count = share.granted
+        window = max(STREAM_PREFETCH_PARTS or 2 * connection_count, connection_count)
+
+        logger.debug(
+            f"Starting parallel download: {connection_count} connections, "
+            f"{part_size} bytes/part, {part_count - part} parts, window={window}, "
+            f"offset={offset}, aligned_offset={aligned_offset}, cached_parts={part}"
+        )
+
+        try:
+            await self._init_download(connection_count, file, part_size)
+        except BaseException:
+            await self._cleanup()
+            share.close()
+            raise
+
+        # Sliding-window pipeline: every sender keeps one request in flight
+        # as long as the part is within ``window`` of the next part to yield.
+        # Results are reassembled in order, so a slow connection only delays
+        # its own part instead of the whole batch.
+        # A sender whose account gets a FloodWait retires and hands its part
+        # to the others; the download only fails once every sender is out.
+        # Senders above the stream's share of the DC budget (it shrinks as
+        # other streams open) retire at a part boundary and free their slot.
+        cond = asyncio.Condition()
+        results: dict[int, bytes] = {}
+        errors: list[BaseException] = []
+        retry_parts: list[int] = []
+        next_dispatch = part
+        next_yield = part
+        in_flight = 0
+        active = len(self.senders)
+        start_time = time.monotonic()
+        fetched_bytes = 0
+        retired_bytes = 0
+        notifies: set[asyncio.Task] = set()
+
+        async def _notify() -> None:
+            async with cond:
+                cond.notify_all()
+
+        def _on_shrink() -> None:
+            task = asyncio.create_task(_notify())
+            notifies.add(task)
+            task.add_done_callback(notifies.discard)
+
+        share.on_shrink = _on_shrink
+
+        def _done_dispatching() -> bool:
+            return not retry_parts and next_dispatch >= part_count
+
+        async def _retire(download_sender: DownloadSender) -> None:
+            """Give a sender and its slot of the DC budget back mid-download."""
+            nonlocal retired_bytes
+            self.senders.remove(download_sender)
+            retired_bytes += download_sender.network_bytes
+            # Out of self.senders now, so _cleanup will not release it
+            await asyncio.shield(self._release_senders([download_sender]))
+            share.give_back()
+
+        async def _worker(download_sender: DownloadSender) -> None:
+            nonlocal next_dispatch, fetched_bytes, in_flight, active
+            while True:
+                async with cond:
+                    await cond.wait_for(
+                        lambda: errors
+                        or retry_parts
+                        or (_done_dispatching() and in_flight == 0)
+                        or active > share.limit
+                        or next_dispatch < min(part_count, next_yield + window)
+                    )
+                    if errors or (_done_dispatching() and in_flight == 0):
+                        active -= 1
+                        return
+                    retire = active > share.limit
+                    if retire:
+                        active -= 1
+                    elif retry_parts:
+                        index = min(retry_parts)
+                        retry_parts.remove(index)
+                    else:
+                        index = next_dispatch
+                        next_dispatch += 1
+                    if not retire:
+                        in_flight += 1
+                if retire:
+                    await _retire(download_sender)
+                    return
+                try:
+                    data = await download_sender.fetch(aligned_offset + index * part_size)
+                except FloodWaitError as e:
+                    self.manager.record_flood_wait(
+                        download_sender.client, RPC_GET_FILE, e.seconds
+                    )
+                    async with cond:
+                        in_flight -= 1
+                        active -= 1
+                        handed_off = active > 0
+                        if handed_off:
+                            retry_parts.append(index)
+                        else:
+                            errors.append(e)
+                        cond.notify_all()
+                    if handed_off:
+                        await _retire(download_sender)
+                    return
+                except Exception as e:
+                    async with cond:
+                        in_flight -= 1
+                        active -= 1
+                        errors.append(e)
+                        cond.notify_all()
+                    return
+                async with cond:
+                    in_flight -= 1
+                    results[index] = data
+                    fetched_bytes += len(data)
+                    cond.notify_all()
+
+        workers = [asyncio.create_task(_worker(s)) for s in self.senders]
+        try:
+            while part < part_count and bytes_yielded < limit:
+                if cancel_event and cancel_event.is_set():
+                    logger.debug("Download cancelled by cancel_event")
+                    break
+
+                async with cond:
+                    await cond.wait_for(lambda: part in results or errors)
+                    if part not in results:
+                        raise errors[0]
+                    data = results.pop(part)
                     part += 1
+                    next_yield = part
+                    cond.notify_all()
 
-                    if bytes_yielded >= limit:
-                        break
-            finally:
-                # Cancel any tasks we didn't await (e.g. on break/disconnect)
-                pending = [t for t in tasks if not t.done()]
-                if pending:
-                    logger.debug(f"Cancelling {len(pending)} pending download tasks")
-                    for t in pending:
-                        t.cancel()
-                    await asyncio.gather(*pending, return_exceptions=True)
+                if not data:
+                    break
 
-        logger.debug("Parallel download finished")
+                # Handle offset alignment - skip initial bytes if needed
+                if skip_bytes > 0:
+                    if len(data) <= skip_bytes:
+                        skip_bytes -= len(data)
+                        continue
+                    data = data[skip_bytes:]
+                    skip_bytes = 0
+
+                # Handle limit - truncate if we'd exceed
+                remaining = limit - bytes_yielded
+                if len(data) > remaining:
+                    data = data[:remaining]
 
+                yield data
+                bytes_yielded += len(data)
+        finally:
+            # Cancel any in-flight requests (e.g. on break/disconnect)
+            pending = [t for t in workers if not t.done()]
+            if pending:
+                logger.debug(f"Cancelling {len(pending)} download workers")
+                for t in pending:
+                    t.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+            elapsed = time.monotonic() - start_time
+            self.throughput = fetched_bytes / elapsed if elapsed > 0 else 0.0
+            if not errors:
+                stream_controller.record_transfer(
+                    self.dc_id,
+                    retired_bytes + sum(s.network_bytes for s in self.senders),
+                    elapsed,
+                    connection_count,
+                )
+            # Connections go back before their budget does
+            await self._cleanup()
+            share.close()
+            logger.debug(
+                "Parallel download finished: %d bytes in %.2fs (%.2f MiB/s, "
+                "%d connections, window=%d)",
+                fetched_bytes,
+                elapsed,
+                self.throughput / (1024 * 1024),
+                connection_count,
+                window,
+            )
 
-class _SingleSenderPool:
+
+class _SenderPool:
     """
     Pool of persistent ``MTProtoSender`` connections per DC and Session.
 
-    Instead of creating a new connection for every HLS segment request
-    (which involves handshake + auth export overhead), this pool maintains
-    a queue of idle senders per (session_key, DC). When a caller needs a sender, it
-    borrows one from the pool (or creates a new one if the pool is empty).
-    After use, the sender is returned to the pool for reuse.
+    Instead of creating a new connection for every request (which involves
+    handshake + auth export overhead), this pool maintains a queue of idle
+    senders per (session_key, DC). Both the parallel ``/dl`` path and the
+    single-connection path borrow senders from it (or create new ones if the
+    pool is empty) and return them after use.
+
+    At most ``_MAX_POOL_SIZE`` idle senders are kept per (session, DC); extra
+    ones are disconnected on release. Senders that have been idle longer than
+    ``_MAX_IDLE_SECONDS`` are discarded on checkout and pruned on release.
 
-    Senders that have been idle longer than ``_MAX_IDLE_SECONDS`` are
-    discarded on checkout.
+    Authorizations exported to foreign DCs live in an ``AuthKeyStore`` that
+    outlives the pool (and, with ``AUTH_KEY_STORE_FILE``, the process).
     """
 
     _MAX_IDLE_SECONDS = 120.0  # discard senders idle longer than this
+    _MAX_POOL_SIZE = 20  # idle senders kept per (session, DC)
 
-    def __init__(self) -> None:
+    def __init__(self, auth_keys: Optional[AuthKeyStore] = None) -> None:
         # (session_auth_key_id, dc_id) -> list of (sender, auth_key, last_used_monotonic)
         self._pool: dict[
             tuple[int, int], list[tuple[MTProtoSender, AuthKey, float]]
         ] = {}
         self._lock = asyncio.Lock()
-        # Cached auth keys per (session_auth_key_id, DC)
-        self._auth_keys: dict[tuple[int, int], AuthKey] = {}
+        # Exported auth keys per (account, foreign DC)
+        self._auth_keys = auth_keys if auth_keys is not None else AuthKeyStore()
+        self.reused = 0
+        self.created = 0
+        # New senders by path: the session's home DC, another DC with a
+        # cached authorization, or another DC needing an authorization export
+        self.home_dc = 0
+        self.cross_dc_cached = 0
+        self.auth_exports = 0
 
     def _get_session_key(self, client: TelegramClient) -> int:
         """Returns a unique identifier for the current client session."""
@@ -635,14 +903,12 @@ class _SingleSenderPool:
         Returns an existing idle sender if one is available, otherwise
         creates a new one (handling auth export if needed).
         """
-        import time as _time
-
         session_key = self._get_session_key(client)
         pool_key = (session_key, dc_id)
 
         async with self._lock:
             bucket = self._pool.get(pool_key, [])
-            now = _time.monotonic()
+            now = time.monotonic()
             # Try to find a live sender
             while bucket:
                 sender, auth_key, last_used = bucket.pop()
@@ -668,6 +934,7 @@ class _SingleSenderPool:
                         dc_id,
                         idle,
                     )
+                    self.reused += 1
                     return sender, auth_key
                 else:
                     logger.debug(
@@ -682,14 +949,18 @@ class _SingleSenderPool:
 
         # No reusable sender -- create a new one
         logger.debug("[sender_pool] Creating new sender for DC %d", dc_id)
+        self.created += 1
 
         # NOTE: Called outside of lock to avoid blocking other clients
-        # _create_sender manages its own local auth_keys caching safely.
-
-        # We need to recreate the create_sender logic inline because it needs await
-        auth_key = self._auth_keys.get(pool_key)
-        if auth_key is None and dc_id == client.session.dc_id:
+        if dc_id == client.session.dc_id:
+            self.home_dc += 1
             auth_key = client.session.auth_key
+        else:
+            auth_key = self._auth_keys.get(client, dc_id)
+            if auth_key is not None:
+                self.cross_dc_cached += 1
+            else:
+                self.auth_exports += 1
 
         dc = await client._get_dc(dc_id)
         sender = MTProtoSender(auth_key, loggers=client._log)
@@ -716,7 +987,7 @@ class _SingleSenderPool:
             finally:
                 client._init_request.query = original_query
             auth_key = sender.auth_key
-            self._auth_keys[pool_key] = auth_key
+            self._auth_keys.put(client, dc_id, auth_key)
         return sender, auth_key
 
     async def release(
@@ -727,14 +998,12 @@ class _SingleSenderPool:
         auth_key: AuthKey,
     ) -> None:
         """Return a sender to the pool for reuse."""
-        import time as _time
-
         session_key = self._get_session_key(client)
         pool_key = (session_key, dc_id)
 
         # Cache auth key
-        if auth_key is not None:
-            self._auth_keys[pool_key] = auth_key
+        if auth_key is not None and dc_id != client.session.dc_id:
+            self._auth_keys.put(client, dc_id, auth_key)
 
         if not sender.is_connected():
             logger.debug(
@@ -749,8 +1018,20 @@ class _SingleSenderPool:
             return
 
         async with self._lock:
+            await self._prune_locked()
             bucket = self._pool.setdefault(pool_key, [])
-            bucket.append((sender, auth_key, _time.monotonic()))
+            if len(bucket) >= self._MAX_POOL_SIZE:
+                logger.debug(
+                    "[sender_pool] Pool for Session %s DC %d is full, disconnecting sender",
+                    session_key,
+                    dc_id,
+                )
+                try:
+                    await sender.disconnect()
+                except Exception:
+                    pass
+                return
+            bucket.append((sender, auth_key, time.monotonic()))
             logger.debug(
                 "[sender_pool] Returned sender to pool for Session %s DC %d (pool size=%d)",
                 session_key,
@@ -758,6 +1039,32 @@ class _SingleSenderPool:
                 len(bucket),
             )
 
+    async def _prune_locked(self) -> None:
+        """Disconnect idle senders past their TTL. Caller must hold ``_lock``."""
+        now = time.monotonic()
+        for pool_key, bucket in list(self._pool.items()):
+            stale = [e for e in bucket if now - e[2] > self._MAX_IDLE_SECONDS]
+            if not stale:
+                continue
+            bucket[:] = [e for e in bucket if now - e[2] <= self._MAX_IDLE_SECONDS]
+            for sender, _, _ in stale:
+                try:
+                    await sender.disconnect()
+                except Exception:
+                    pass
+            if not bucket:
+                del self._pool[pool_key]
+
+    async def forget_auth(self, client: TelegramClient, dc_id: int) -> None:
+        """Drop a foreign-DC authorization Telegram rejected, and its senders."""
+        if dc_id == client.session.dc_id:
+            return  # the session's own key; nothing exported to forget
+        self._auth_keys.invalidate(client, dc_id)
+        async with self._lock:
+            bucket = self._pool.pop((self._get_session_key(client), dc_id), [])
+        for sender, _, _ in bucket:
+            await self.discard(sender)
+
     async def discard(self, sender: MTProtoSender) -> None:
         """Disconnect and discard a sender without returning it to the pool."""
         try:
@@ -776,7 +1083,17 @@ class _SingleSenderPool:
                         pass
                 bucket.clear()
             self._pool.clear()
-            self._auth_keys.clear()
+
+    def stats(self) -> dict:
+        return {
+            "idle_senders": sum(len(b) for b in self._pool.values()),
+            "reused": self.reused,
+            "created": self.created,
+            "home_dc": self.home_dc,
+            "cross_dc_cached": self.cross_dc_cached,
+            "auth_exports": self.auth_exports,
+            "auth_key_store": self._auth_keys.stats(),
+        }
 
 
 class MultiSessionManager:
@@ -786,23 +1103,45 @@ class MultiSessionManager:
     Features:
     - Lazy and eager initialization
     - Session persistence via StringSession
-    - Round-robin load balancing across multiple accounts
-    - Automatic reconnection on disconnect
-    - Thread-safe with asyncio lock
-    - Persistent sender pool for HLS segment downloads
+    - Lock-free client selection weighted by live session health
+      (latency, error rate, in-flight requests and senders)
+    - FloodWait quarantine per account and RPC type, routed around
+    - DC affinity: downloads go to an account whose home DC holds the file
+      when one exists, so no cross-DC authorization export is needed
+    - Background supervisor reconnecting dropped sessions with backoff
+    - Persistent sender pool shared by all download paths
     """
 
     _MEDIA_INFO_CACHE_TTL = 3600  # 1 hour
+    _CACHE_SWEEP_INTERVAL = 60  # seconds between background TTL sweeps
+    _SUPERVISOR_INTERVAL = 15  # seconds between connection checks
+    _CONNECT_TIMEOUT = 15  # seconds allowed for one reconnect attempt
+    _RECONNECT_BACKOFF = 1  # first retry delay after a failed reconnect
+    _MAX_RECONNECT_BACKOFF = 300
+    _CLIENT_WAIT_TIMEOUT = 10  # how long get_client waits for a reconnect
 
     def __init__(self):
         self._clients: list[TelegramClient] = []
+        # Guards initialize_all / close_all only; selection never takes it
         self._lock = asyncio.Lock()
         self._initialized = False
-        self._round_robin_index = 0
-        # In-memory cache: key → (MediaInfo, expiry_timestamp)
-        self._media_info_cache: dict[str, tuple["MediaInfo", float]] = {}
-        # Persistent sender pool for single-connection downloads (HLS).
-        self._sender_pool = _SingleSenderPool()
+        # id(client) -> live health of that account
+        self._health: dict[int, SessionHealth] = {}
+        # Home DC -> accounts registered there
+        self._clients_by_dc: dict[int, list[TelegramClient]] = {}
+        # How often a DC-bound request found an account on that DC
+        self.same_dc_picks = 0
+        self.cross_dc_picks = 0
+        self._supervisor_task: Optional[asyncio.Task] = None
+        self._supervisor_wake = asyncio.Event()
+        self._any_connected = asyncio.Event()
+        # Bounded LRU of key → MediaInfo, optionally persisted across restarts
+        self._media_info_cache: TTLCache[MediaInfo] = TTLCache(
+            MEDIA_INFO_CACHE_SIZE, self._MEDIA_INFO_CACHE_TTL
+        )
+        self._sweeper_tasks: list[asyncio.Task] = []
+        # Persistent sender pool shared by parallel and single-connection downloads.
+        self._sender_pool = _SenderPool(auth_key_store)
 
     async def initialize_all(self):
         """Initialize all configured sessions."""
@@ -817,6 +1156,8 @@ class MultiSessionManager:
 
             from jackgram.bot.bot import SESSION_STRINGS
 
+            self._start_cache_maintenance()
+
             if not SESSION_STRINGS:
                 logger.warning(
                     "No SESSION_STRINGS configured. User client features will be disabled."
@@ -826,6 +1167,10 @@ class MultiSessionManager:
 
             logger.info(f"Initializing {len(SESSION_STRINGS)} Telegram clients...")
 
+            restored = auth_key_store.load()
+            if restored:
+                logger.info(f"Restored {restored} exported DC authorizations")
+
             for i, session_str in enumerate(SESSION_STRINGS):
                 try:
                     client = TelegramClient(
@@ -846,6 +1191,7 @@ class MultiSessionManager:
                         continue
 
                     self._clients.append(client)
+                    self._health[id(client)] = SessionHealth(index=i)
                 except Exception as e:
                     logger.error(f"Failed to initialize session {i}: {e}")
 
@@ -854,61 +1200,297 @@ class MultiSessionManager:
                     "Failed to authorize any of the provided Telegram sessions."
                 )
 
+            self._index_home_dcs()
+            self._any_connected.set()
+            self._supervisor_task = asyncio.create_task(self._supervise())
             self._initialized = True
             logger.info(
                 f"Successfully initialized {len(self._clients)} Telegram clients."
             )
 
-    async def get_client(self) -> TelegramClient:
+    async def get_client(
+        self, rpc: Optional[str] = None, dc_id: Optional[int] = None
+    ) -> TelegramClient:
         """
-        Get a Telethon client using round-robin load balancing.
+        Get a connected Telethon client, favouring the healthiest accounts.
+
+        Selection is lock-free: a connected client is drawn with probability
+        proportional to its health score.  With *rpc* (``RPC_GET_FILE`` ...),
+        accounts still serving a FloodWait for that RPC type are skipped.
+        With *dc_id*, accounts whose home DC is *dc_id* are preferred; the
+        others (which need an exported authorization) are the fallback.
+        Disconnected clients are left to the background supervisor; only
+        when none is connected does this wait (up to
+        ``_CLIENT_WAIT_TIMEOUT``) for it to bring one back.
 
         Returns:
             Connected TelegramClient instance
 
         Raises:
             RuntimeError: If no clients are available
+            AllSessionsFloodWaited: If every connected client is quarantined
+                for *rpc* (a ``FloodWaitError`` with the shortest wait left)
         """
         if not self._initialized:
             await self.initialize_all()
 
-        async with self._lock:
-            if not self._clients:
-                raise RuntimeError("No Telegram clients are available/authorized.")
-
-            # Find next connected client
-            checked = 0
-            while checked < len(self._clients):
-                client = self._clients[self._round_robin_index]
-                self._round_robin_index = (self._round_robin_index + 1) % len(
-                    self._clients
-                )
-
-                if client.is_connected():
-                    return client
-                else:
-                    try:
-                        await client.connect()
-                        if client.is_connected():
-                            return client
-                    except Exception as e:
-                        logger.warning(f"Client connection failed: {e}")
+        if not self._clients:
+            raise RuntimeError("No Telegram clients are available/authorized.")
 
-                checked += 1
+        client = self._pick_client(rpc, dc_id)
+        if client is not None:
+            return client
 
+        self._any_connected.clear()
+        self._supervisor_wake.set()
+        try:
+            await asyncio.wait_for(
+                self._any_connected.wait(), self._CLIENT_WAIT_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            pass
+        client = self._pick_client(rpc, dc_id)
+        if client is None:
             raise RuntimeError(
                 "All Telegram clients disconnected and could not reconnect."
             )
+        return client
+
+    def _pick_client(
+        self, rpc: Optional[str] = None, dc_id: Optional[int] = None
+    ) -> Optional[TelegramClient]:
+        """Weighted random choice among connected, unquarantined clients."""
+        connected = [c for c in self._clients if c.is_connected()]
+        if len(connected) < len(self._clients):
+            self._supervisor_wake.set()
+        if not connected:
+            return None
+        available = [
+            c for c in connected if not self._health_of(c).flood_remaining(rpc)
+        ]
+        if not available:
+            raise AllSessionsFloodWaited(
+                rpc, min(self._health_of(c).flood_remaining(rpc) for c in connected)
+            )
+        if rpc == RPC_GET_FILE and dc_id is not None:
+            # Accounts that used up their connection budget on this DC go last
+            spare = [c for c in available if not connection_budget.full(id(c), dc_id)]
+            if spare:
+                available = spare
+        if dc_id is not None:
+            home = [c for c in self._clients_by_dc.get(dc_id, ()) if c in available]
+            if home:
+                self.same_dc_picks += 1
+                available = home
+            else:
+                self.cross_dc_picks += 1
+        return pick_weighted(available, [self._health_of(c) for c in available])
+
+    def _index_home_dcs(self) -> None:
+        """Group the accounts by the DC their session lives on."""
+        by_dc: dict[int, list[TelegramClient]] = {}
+        for client in self._clients:
+            home_dc = getattr(client.session, "dc_id", None)
+            if home_dc:
+                by_dc.setdefault(home_dc, []).append(client)
+        self._clients_by_dc = by_dc
+
+    def _health_of(self, client: TelegramClient) -> SessionHealth:
+        health = self._health.get(id(client))
+        if health is None:
+            health = self._health[id(client)] = SessionHealth(index=len(self._health))
+        return health
+
+    async def open_download(self, dc_id: Optional[int], wanted: int) -> StreamShare:
+        """Reserve a download's fair share of the DC connection budget."""
+        accounts = sum(1 for c in self._clients if c.is_connected())
+        return await connection_budget.open_stream(dc_id, wanted, accounts)
+
+    def owns(self, client: Any) -> bool:
+        """Whether *client* is one of the managed user sessions."""
+        return any(client is c for c in self._clients)
+
+    def record_flood_wait(
+        self, client: TelegramClient, rpc: str, seconds: float
+    ) -> None:
+        """Quarantine *client* for *rpc* so selection routes around it."""
+        health = self._health_of(client)
+        health.record_flood_wait(rpc, seconds)
+        logger.warning(
+            f"Session {health.index} flood-waited for {rpc}: "
+            f"quarantined for {seconds}s"
+        )
+
+    @asynccontextmanager
+    async def _track(
+        self, client: TelegramClient, rpc: Optional[str] = None, timed: bool = True
+    ):
+        """Count a request against *client*'s health: in-flight, latency, errors."""
+        health = self._health_of(client)
+        health.in_flight += 1
+        started = time.monotonic()
+        try:
+            yield
+        except SESSION_ERRORS as e:
+            health.record_error(e)
+            if isinstance(e, FloodWaitError) and rpc is not None:
+                self.record_flood_wait(client, rpc, e.seconds)
+            if not client.is_connected():
+                self._supervisor_wake.set()
+            raise
+        else:
+            health.record_success(time.monotonic() - started if timed else None)
+        finally:
+            health.in_flight -= 1
+
+    def _session_acquired(
+        self, client: TelegramClient, dc_id: Optional[int] = None
+    ) -> None:
+        """A download sender of *client* to *dc_id* was borrowed for a stream."""
+        self._health_of(client).in_flight += 1
+        connection_budget.lease(id(client), dc_id)
+
+    def _session_released(
+        self,
+        client: TelegramClient,
+        error: Optional[BaseException] = None,
+        dc_id: Optional[int] = None,
+    ) -> None:
+        """The sender borrowed with ``_session_acquired`` was given back."""
+        health = self._health_of(client)
+        health.in_flight = max(0, health.in_flight - 1)
+        connection_budget.release(id(client), dc_id)
+        if isinstance(error, SESSION_ERRORS):
+            health.record_error(error)
+            if not client.is_connected():
+                self._supervisor_wake.set()
+
+    async def _supervise(self) -> None:
+        """Reconnect dropped sessions in the background, with per-session backoff."""
+        while True:
+            self._supervisor_wake.clear()
+            await asyncio.gather(
+                *(
+                    self._reconnect(client, self._health_of(client))
+                    for client in list(self._clients)
+                    if not client.is_connected()
+                    and self._health_of(client).retry_at <= time.monotonic()
+                )
+            )
+            if any(c.is_connected() for c in self._clients):
+                self._any_connected.set()
+
+            # Sleep until the next check, an earlier due retry, or a wake-up
+            timeout = self._SUPERVISOR_INTERVAL
+            now = time.monotonic()
+            for client in self._clients:
+                if not client.is_connected():
+                    retry_in = self._health_of(client).retry_at - now
+                    timeout = min(timeout, max(retry_in, 0.1))
+            timer = asyncio.get_running_loop().call_later(
+                timeout, self._supervisor_wake.set
+            )
+            try:
+                await self._supervisor_wake.wait()
+            finally:
+                timer.cancel()
+
+    async def _reconnect(self, client: TelegramClient, health: SessionHealth) -> None:
+        try:
+            await asyncio.wait_for(client.connect(), self._CONNECT_TIMEOUT)
+            if not client.is_connected():
+                raise ConnectionError("client did not connect")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            health.record_error(e)
+            health.backoff = min(
+                max(health.backoff * 2, self._RECONNECT_BACKOFF),
+                self._MAX_RECONNECT_BACKOFF,
+            )
+            health.retry_at = time.monotonic() + health.backoff
+            logger.warning(
+                f"Session {health.index} reconnect failed, "
+                f"retrying in {health.backoff:.0f}s: {e}"
+            )
+            return
+        health.reconnects += 1
+        health.backoff = 0.0
+        health.retry_at = 0.0
+        self._index_home_dcs()
+        logger.info(f"Session {health.index} reconnected")
+
+    def session_stats(self) -> list[dict[str, Any]]:
+        """Connection state and health of every session, for the admin stats."""
+        sessions = []
+        for client in self._clients:
+            is_conn = client.is_connected()
+            sessions.append(
+                {
+                    "connected": is_conn,
+                    "dc_id": getattr(client.session, "dc_id", 0) if is_conn else 0,
+                    **self._health_of(client).stats(),
+                }
+            )
+        return sessions
+
+    def dc_affinity_stats(self) -> dict[str, Any]:
+        return {
+            "accounts_by_dc": {
+                dc: len(clients) for dc, clients in sorted(self._clients_by_dc.items())
+            },
+            "same_dc": self.same_dc_picks,
+            "cross_dc": self.cross_dc_picks,
+        }
 
     async def close_all(self):
         """Disconnect all clients."""
         async with self._lock:
+            if self._supervisor_task is not None:
+                self._supervisor_task.cancel()
+                try:
+                    await self._supervisor_task
+                except asyncio.CancelledError:
+                    pass
+                self._supervisor_task = None
             for client in self._clients:
                 if client.is_connected():
                     await client.disconnect()
             self._clients.clear()
+            self._health.clear()
+            self._clients_by_dc.clear()
+            self._any_connected.clear()
             self._initialized = False
             await self._sender_pool.close_all()
+            self._stop_cache_maintenance()
+
+    def _start_cache_maintenance(self) -> None:
+        """Restore the persisted media info cache and start TTL sweepers."""
+        if self._sweeper_tasks:
+            return
+        if MEDIA_INFO_CACHE_FILE:
+            try:
+                loaded = self._media_info_cache.load(
+                    MEDIA_INFO_CACHE_FILE, lambda value: MediaInfo(**value)
+                )
+                logger.info(f"Restored {loaded} media info cache entries")
+            except (OSError, ValueError) as e:
+                logger.warning(f"Failed to restore media info cache: {e}")
+        for cache in (self._media_info_cache, stream_metadata_cache):
+            self._sweeper_tasks.append(
+                asyncio.create_task(cache.run_sweeper(self._CACHE_SWEEP_INTERVAL))
+            )
+
+    def _stop_cache_maintenance(self) -> None:
+        """Stop the TTL sweepers and persist the media info cache."""
+        for task in self._sweeper_tasks:
+            task.cancel()
+        self._sweeper_tasks.clear()
+        if MEDIA_INFO_CACHE_FILE:
+            try:
+                self._media_info_cache.dump(MEDIA_INFO_CACHE_FILE, asdict)
+            except OSError as e:
+                logger.warning(f"Failed to persist media info cache: {e}")
 
     async def get_message(self, ref: TelegramMediaRef) -> Message:
         """
@@ -927,8 +1509,18 @@ class MultiSessionManager:
         if ref.chat_id is None or ref.message_id is None:
             raise ValueError("chat_id and message_id are required to fetch a message")
 
-        client = await self.get_client()
-        messages = await client.get_messages(ref.chat_id, ids=ref.message_id)
+        # A FloodWait quarantines the account; retry on the next one
+        for attempt in range(max(1, len(self._clients))):
+            client = await self.get_client(RPC_GET_MESSAGES)
+            try:
+                async with self._track(client, RPC_GET_MESSAGES):
+                    messages = await client.get_messages(
+                        ref.chat_id, ids=ref.message_id
+                    )
+                break
+            except FloodWaitError:
+                if attempt + 1 >= len(self._clients):
+                    raise
 
         if not messages:
             raise ValueError(f"Message {ref.message_id} not found in {ref.chat_id}")
@@ -1033,15 +1625,9 @@ class MultiSessionManager:
             raise ValueError("Invalid TelegramMediaRef")
 
         if use_cache:
-            import time
-
-            now = time.time()
-            if cache_key in self._media_info_cache:
-                info, expiry = self._media_info_cache[cache_key]
-                if now < expiry:
-                    return info
-                else:
-                    del self._media_info_cache[cache_key]
+            info = self._media_info_cache.get(cache_key)
+            if info is not None:
+                return info
 
         # Resolution depends on whether we have a file_id or a chat_id+message_id
         media = None
@@ -1070,6 +1656,29 @@ class MultiSessionManager:
                 # For basic file_id photos, we don't have dimensions easily
                 pass
 
+            if isinstance(media, Document):
+                info = MediaInfo(
+                    file_id=str(media.id),
+                    file_size=media.size,
+                    mime_type=media.mime_type or "application/octet-stream",
+                    file_name=file_name,
+                    duration=duration,
+                    width=width,
+                    height=height,
+                    dc_id=dc_id,
+                )
+            else:
+                largest = max(
+                    media.sizes,
+                    key=lambda s: getattr(s, "size", 0) if hasattr(s, "size") else 0,
+                )
+                info = MediaInfo(
+                    file_id=str(media.id),
+                    file_size=getattr(largest, "size", 0),
+                    mime_type="image/jpeg",
+                    dc_id=dc_id,
+                )
+
         elif ref.chat_id and ref.message_id:
             # Fetch message to get media
             messages = await self.get_message(ref)
@@ -1103,7 +1712,7 @@ class MultiSessionManager:
                     if "h" in attr_dict:
                         height = attr_dict["h"]
 
-                return MediaInfo(
+                info = MediaInfo(
                     file_id=str(doc.id),
                     file_size=doc.size,
                     mime_type=doc.mime_type or "application/octet-stream",
@@ -1125,7 +1734,7 @@ class MultiSessionManager:
                     key=lambda s: getattr(s, "size", 0) if hasattr(s, "size") else 0,
                 )
 
-                return MediaInfo(
+                info = MediaInfo(
                     file_id=str(photo.id),
                     file_size=getattr(largest, "size", 0),
                     mime_type="image/jpeg",
@@ -1137,6 +1746,9 @@ class MultiSessionManager:
             else:
                 raise ValueError(f"Unsupported media type: {type(message.media)}")
 
+        self._media_info_cache.set(cache_key, info)
+        return info
+
     async def validate_file_access(
         self,
         ref: TelegramMediaRef,
@@ -1309,8 +1921,8 @@ class MultiSessionManager:
         """
         Stream media content with **parallel** downloads (fast Telethon).
 
-        Creates multiple MTProtoSender connections to the file's DC for
-        maximum throughput.  Best suited for large/full-file downloads
+        Borrows multiple pooled MTProtoSender connections to the file's DC
+        for maximum throughput.  Best suited for large/full-file downloads
         (e.g. the non-transcode ``/proxy/telegram/stream`` endpoint).
 
         For small byte-range fetches (HLS segments) use
@@ -1352,7 +1964,7 @@ class MultiSessionManager:
         """
         Stream media content over a **pooled** single MTProto connection.
 
-        Borrows a persistent ``MTProtoSender`` from ``_SingleSenderPool``
+        Borrows a persistent ``MTProtoSender`` from ``_SenderPool``
         for the target DC.  The sender is returned to the pool after the
         download completes so the next request reuses the same TCP
         connection (no handshake, no ``ExportAuthorizationRequest``).
@@ -1369,10 +1981,10 @@ class MultiSessionManager:
         Yields:
             Chunks of media data
         """
-        client = await self.get_client()
         file_location, dc_id, actual_file_size = await self._resolve_file_location(
             ref, file_size
         )
+        client = await self.get_client(RPC_GET_FILE, dc_id)
 
         if offset >= actual_file_size:
             return
@@ -1380,7 +1992,10 @@ class MultiSessionManager:
         if limit is None:
             limit = actual_file_size - offset
 
-        part_size = int(utils.get_appropriated_part_size(actual_file_size) * 1024)
+        doc_id = _cache_doc_id(file_location)
+        part_size = stream_controller.part_size(
+            dc_id, actual_file_size, doc_id=doc_id
+        )
         aligned_offset = (offset // part_size) * part_size
         skip_bytes = offset - aligned_offset
         part_count = math.ceil((limit + skip_bytes) / part_size)
@@ -1394,8 +2009,11 @@ class MultiSessionManager:
             part_size,
         )
 
-        sender, auth_key = await self._sender_pool.acquire(client, dc_id)
+        # Borrowed lazily so fully cached ranges never touch the pool
+        sender = auth_key = None
+        share: Optional[StreamShare] = None
         sender_ok = True  # track whether to return to pool or discard
+        sender_error: Optional[BaseException] = None
 
         try:
             request = GetFileRequest(
@@ -1406,12 +2024,33 @@ class MultiSessionManager:
             for _ in range(part_count):
                 if bytes_yielded >= limit:
                     break
-                try:
-                    result = await client._call(sender, request)
-                except Exception:
-                    sender_ok = False
-                    raise
-                data = result.bytes
+                data = None
+                if doc_id is not None:
+                    data = await chunk_cache.get(doc_id, request.offset, part_size)
+                if data is None:
+                    if sender is None:
+                        share = await self.open_download(dc_id, 1)
+                        sender, auth_key = await self._sender_pool.acquire(
+                            client, dc_id
+                        )
+                        self._session_acquired(client, dc_id)
+                    started = time.monotonic()
+                    try:
+                        result = await client._call(sender, request)
+                    except FloodWaitError as e:
+                        stream_controller.record_flood_wait(dc_id, e.seconds)
+                        self.record_flood_wait(client, RPC_GET_FILE, e.seconds)
+                        sender_ok = False
+                        sender_error = e
+                        raise
+                    except Exception as e:
+                        sender_ok = False
+                        sender_error = e
+                        raise
+                    stream_controller.record_request(dc_id, time.monotonic() - started)
+                    data = result.bytes
+                    if doc_id is not None:
+                        await chunk_cache.put(doc_id, request.offset, part_size, data)
                 if not data:
                     break
                 request.offset += part_size
@@ -1432,10 +2071,18 @@ class MultiSessionManager:
                 bytes_yielded += len(data)
                 yield data
         finally:
-            if sender_ok:
+            if sender is not None:
+                self._session_released(client, sender_error, dc_id)
+            if sender is None:
+                pass
+            elif sender_ok:
                 await self._sender_pool.release(client, dc_id, sender, auth_key)
             else:
                 await self._sender_pool.discard(sender)
+                if isinstance(sender_error, AuthKeyUnregisteredError):
+                    await self._sender_pool.forget_auth(client, dc_id)
+            if share is not None:
+                share.close()
 
     @property
     def is_initialized(self) -> bool:
@@ -1,32 +1,169 @@
+import asyncio
+import importlib.util
 import logging
 from math import ceil
 import re
-from typing import Optional
+from typing import Any, Optional, Tuple
 import httpx
-from jackgram.bot.bot import TMDB_API, TMDB_LANGUAGE
+from jackgram.bot.bot import (
+    TMDB_API,
+    TMDB_CACHE_SIZE,
+    TMDB_LANGUAGE,
+    TMDB_RATE_LIMIT,
+    get_db,
+)
+from jackgram.utils.concurrency import SingleFlight
+from jackgram.utils.rate_limit import TokenBucket
+from jackgram.utils.tmdb_cache import TMDBCache
+
+DAY = 24 * 3600
+
+# HTTP/2 needs the optional ``h2`` package (``pip install httpx[http2]``)
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+def _episode_from_details(
+    details: dict, season_number: int, episode_number: int
+) -> Optional[dict]:
+    """Find an episode in the ``season/N`` data appended to series details."""
+    season = details.get(f"season/{season_number}") or {}
+    for episode in season.get("episodes", []):
+        if episode.get("episode_number") == episode_number:
+            return episode
+    return None
 
 
 class TMDBClient:
-    def __init__(self):
+    _SEARCH_TTL = 30 * DAY  # title -> tmdb_id rarely changes
+    _DETAILS_TTL = 7 * DAY  # ratings, new seasons and episodes do
+    _NEGATIVE_TTL = DAY / 2  # titles TMDb did not know (yet)
+
+    _MAX_RETRIES = 3
+    _RETRY_BACKOFF = 0.5  # seconds, doubled after every attempt
+    _RETRY_STATUSES = {429, 500, 502, 503, 504}
+    _TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+    _LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+
+    def __init__(self, cache: Optional[TMDBCache] = None):
         self.api_key = TMDB_API
         self.language = TMDB_LANGUAGE
+        self.cache = cache
+        self.bucket = TokenBucket(rate=TMDB_RATE_LIMIT)
+        # identical concurrent lookups (ten episodes of one show) share a request
+        self._inflight = SingleFlight()
+        self._http: Optional[httpx.AsyncClient] = None
+        self.retries = 0
+
+    def _client(self) -> httpx.AsyncClient:
+        """The long-lived, connection-pooled HTTP client (created lazily)."""
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE, timeout=self._TIMEOUT, limits=self._LIMITS
+            )
+        return self._http
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    def stats(self) -> dict:
+        return {
+            "http2": HTTP2_AVAILABLE,
+            "retries": self.retries,
+            "coalesced": self._inflight.shared,
+            "rate_limit": self.bucket.stats(),
+        }
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> Optional[float]:
+        value = response.headers.get("Retry-After")
+        try:
+            return max(0.0, float(value)) if value is not None else None
+        except ValueError:
+            return None
+
+    async def _get(self, url: str, params: dict) -> httpx.Response:
+        """GET through the rate limiter, retrying 429/5xx and network errors."""
+        attempt = 0
+        while True:
+            await self.bucket.acquire()
+            try:
+                response = await self._client().get(url, params=params)
+            except httpx.TransportError as e:
+                if attempt >= self._MAX_RETRIES:
+                    raise
+                delay = self._RETRY_BACKOFF * 2**attempt
+                logging.warning(f"TMDb request failed ({e!r}), retrying in {delay}s")
+            else:
+                if (
+                    response.status_code not in self._RETRY_STATUSES
+                    or attempt >= self._MAX_RETRIES
+                ):
+                    return response
+                delay = self._retry_after(response)
+                if delay is None:
+                    delay = self._RETRY_BACKOFF * 2**attempt
+                logging.warning(
+                    f"TMDb returned {response.status_code}, retrying in {delay}s"
+                )
+            attempt += 1
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+    async def _cache_get(self, key: str) -> Tuple[bool, Any]:
+        if self.cache is None:
+            return False, None
+        return await self.cache.get(key)
+
+    async def _cache_set(self, key: str, value: Any, ttl: float) -> None:
+        if self.cache is not None:
+            await self.cache.set(key, value, ttl)
+
+    def _details_key(self, tmdb_id: int, type_name: str) -> str:
+        return f"details:{type_name}:{tmdb_id}:{self.language}"
 
     async def get_episode_details(
         self, tmdb_id: int, episode_number: int, season_number: int = 1
     ) -> dict:
         """Get the details of a specific episode from the API"""
+        key = f"episode:{tmdb_id}:{season_number}:{episode_number}:{self.language}"
+        found, cached = await self._cache_get(key)
+        if found:
+            return cached or {}
+
+        # Cached series details already carry every episode of every season
+        found, details = await self._cache_get(self._details_key(tmdb_id, "tv"))
+        if found and details:
+            episode = _episode_from_details(details, season_number, episode_number)
+            if episode:
+                return episode
+
+        return await self._inflight.do(
+            key,
+            lambda: self._fetch_episode_details(
+                key, tmdb_id, episode_number, season_number
+            ),
+        )
+
+    async def _fetch_episode_details(
+        self, key: str, tmdb_id: int, episode_number: int, season_number: int
+    ) -> dict:
         url = f"https://api.themoviedb.org/3/tv/{tmdb_id}/season/{season_number}/episode/{episode_number}"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                url, params={"api_key": self.api_key, "language": self.language}
+        response = await self._get(
+            url, params={"api_key": self.api_key, "language": self.language}
+        )
+        if response.status_code == 200:
+            data = response.json()
+            await self._cache_set(key, data, self._DETAILS_TTL)
+            return data
+        else:
+            logging.error(
+                f"Failed to fetch episode details for TMDB ID {tmdb_id}, season {season_number}, episode {episode_number}. Status code: {response.status_code}"
             )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logging.error(
-                    f"Failed to fetch episode details for TMDB ID {tmdb_id}, season {season_number}, episode {episode_number}. Status code: {response.status_code}"
-                )
-                return {}
+            if response.status_code == 404:
+                await self._cache_set(key, None, self._NEGATIVE_TTL)
+            return {}
 
     async def find_media_id(
         self,
@@ -48,58 +185,84 @@ class TMDBClient:
             return None
 
         if use_api:
-            logging.info("Searching using Tmdb API for: '%s'", title)
             type_name = "tv" if data_type == "series" else "movie"
+            key = f"search:{type_name}:{title}:{year or ''}:{adult}:{self.language}"
+            found, cached = await self._cache_get(key)
+            if found:
+                return cached
+
+            return await self._inflight.do(
+                key, lambda: self._search(key, title, type_name, year, adult)
+            )
+        return None
+
+    async def _search(
+        self, key: str, title: str, type_name: str, year: Optional[int], adult: bool
+    ) -> Optional[int]:
+        logging.info("Searching using Tmdb API for: '%s'", title)
+
+        async def search_tmdb(query_year):
+            params = {
+                "query": title,
+                "include_adult": str(adult).lower(),
+                "page": "1",
+                "language": self.language,
+                "api_key": self.api_key,
+            }
+            if query_year:
+                params["primary_release_year"] = str(query_year)
+
+            return await self._get(
+                f"https://api.themoviedb.org/3/search/{type_name}", params=params
+            )
 
-            async def search_tmdb(query_year, client):
-                params = {
-                    "query": title,
-                    "include_adult": str(adult).lower(),
-                    "page": "1",
-                    "language": self.language,
-                    "api_key": self.api_key,
-                }
-                if query_year:
-                    params["primary_release_year"] = str(query_year)
-
-                return await client.get(
-                    f"https://api.themoviedb.org/3/search/{type_name}", params=params
+        # Attempt to search with year
+        resp = await search_tmdb(year)
+        if resp.status_code == 200:
+            data = resp.json()
+            results = data.get("results", [])
+            if not results and year:
+                # Retry without year if no results are found
+                logging.error(
+                    f"No results found for '{title}' with year {year}. Retrying without year."
                 )
+                resp = await search_tmdb(None)
+                data = resp.json()
+                results = data.get("results", [])
 
-            async with httpx.AsyncClient() as client:
-                # Attempt to search with year
-                resp = await search_tmdb(year, client)
+            if results:
+                logging.info(f"Results found for {title}")
+                media_id = results[0]["id"]
+                await self._cache_set(key, media_id, self._SEARCH_TTL)
+                return media_id
+            else:
+                errors = data.get("errors", "No error message provided")
+                logging.error(
+                    f"No results found for '{title}' - The API said '{errors}' with status code {resp.status_code}"
+                )
                 if resp.status_code == 200:
-                    data = resp.json()
-                    results = data.get("results", [])
-                    if not results and year:
-                        # Retry without year if no results are found
-                        logging.error(
-                            f"No results found for '{title}' with year {year}. Retrying without year."
-                        )
-                        resp = await search_tmdb(None, client)
-                        data = resp.json()
-                        results = data.get("results", [])
-
-                    if results:
-                        logging.info(f"Results found for {title}")
-                        return results[0]["id"]
-                    else:
-                        errors = data.get("errors", "No error message provided")
-                        logging.error(
-                            f"No results found for '{title}' - The API said '{errors}' with status code {resp.status_code}"
-                        )
-                else:
-                    data = resp.json()
-                    errors = data.get("errors", "No error message provided")
-                    logging.error(
-                        f"API search failed for '{title}' - The API said '{errors}' with status code {resp.status_code}"
-                    )
+                    await self._cache_set(key, None, self._NEGATIVE_TTL)
+        else:
+            data = resp.json()
+            errors = data.get("errors", "No error message provided")
+            logging.error(
+                f"API search failed for '{title}' - The API said '{errors}' with status code {resp.status_code}"
+            )
         return None
 
     async def get_details(self, tmdb_id: int, data_type: str) -> dict:
         """Get the details of a movie/series from the API"""
         type_name = "tv" if data_type == "series" else "movie"
+        key = self._details_key(tmdb_id, type_name)
+        found, cached = await self._cache_get(key)
+        if found:
+            return cached or {}
+
+        return await self._inflight.do(
+            key, lambda: self._fetch_details(key, tmdb_id, type_name)
+        )
+
+    async def _fetch_details(self, key: str, tmdb_id: int, type_name: str) -> dict:
         url = f"https://api.themoviedb.org/3/{type_name}/{tmdb_id}"
         if type_name == "tv":
             params = {
@@ -116,20 +279,22 @@ class TMDBClient:
                 "language": self.language,
             }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, params=params)
-            if response.status_code == 200:
-                data = response.json()
-                if type_name == "tv":
-                    await self._extract_from_get_details(data, url, client)
-                return data
-            else:
-                logging.error(
-                    f"Failed to fetch details for TMDB ID {tmdb_id}. Status code: {response.status_code}"
-                )
-                return {}
+        response = await self._get(url, params=params)
+        if response.status_code == 200:
+            data = response.json()
+            if type_name == "tv":
+                await self._extract_from_get_details(data, url)
+            await self._cache_set(key, data, self._DETAILS_TTL)
+            return data
+        else:
+            logging.error(
+                f"Failed to fetch details for TMDB ID {tmdb_id}. Status code: {response.status_code}"
+            )
+            if response.status_code == 404:
+                await self._cache_set(key, None, self._NEGATIVE_TTL)
+            return {}
 
-    async def _extract_from_get_details(self, response, url, client):
+    async def _extract_from_get_details(self, response, url):
         seasons = response.get("seasons", [])
         length = len(seasons)
         append_seasons = []
@@ -140,11 +305,17 @@ class TMDBClient:
             )
             append_seasons.append(append_season)
 
-        for append_season in append_seasons:
-            tmp_resp = await client.get(
-                url,
-                params={"append_to_response": append_season, "api_key": self.api_key},
+        # season chunks are independent: fetch them concurrently
+        responses = await asyncio.gather(
+            *(
+                self._get(
+                    url,
+                    params={"append_to_response": append_season, "api_key": self.api_key},
+                )
+                for append_season in append_seasons
             )
+        )
+        for tmp_resp in responses:
             if tmp_resp.status_code == 200:
                 tmp_data = tmp_resp.json()
                 season_keys = [k for k in tmp_data.keys() if "season/" in k]
@@ -173,5 +344,12 @@ def clean_file_name(name: str) -> str:
     return name.strip().rstrip(".-_")
 
 
+_tmdb_client: Optional[TMDBClient] = None
+
+
 def get_tmdb():
-    return TMDBClient()
+    """Return the process-wide TMDb client, so every caller shares its cache."""
+    global _tmdb_client
+    if _tmdb_client is None:
+        _tmdb_client = TMDBClient(cache=TMDBCache(get_db(), TMDB_CACHE_SIZE))
+    return _tmdb_client
@@ -0,0 +1,76 @@
+"""
+Two-tier cache of TMDb API responses.
+
+Lookups go to an in-memory LRU first and then to the ``tmdb_cache`` MongoDB
+collection, so a restart does not throw away what indexing has learned.
+Every entry carries its own TTL; MongoDB removes expired documents through a
+TTL index on ``expires_at`` (see ``jackgram.utils.migrations``).
+
+Misses are cached too ("negative caching"), with a shorter TTL, so a file
+name that TMDb does not know is not searched again for every episode.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from pymongo.errors import PyMongoError
+
+from jackgram.utils.cache import TTLCache
+from jackgram.utils.database import Database
+
+logger = logging.getLogger(__name__)
+
+
+class TMDBCache:
+    """Memory + MongoDB cache of TMDb responses with per-entry TTLs."""
+
+    def __init__(self, db: Optional[Database], max_entries: int) -> None:
+        self.db = db
+        # key -> (value,) so a cached ``None`` (negative entry) is a hit
+        self.memory: TTLCache[Tuple[Any]] = TTLCache(max_entries, ttl=3600)
+        self.store_hits = 0
+        self.store_misses = 0
+
+    async def get(self, key: str) -> Tuple[bool, Any]:
+        """Return ``(found, value)``; ``value`` may be ``None`` for a cached miss."""
+        entry = self.memory.get(key)
+        if entry is not None:
+            return True, entry[0]
+        if self.db is None:
+            return False, None
+
+        try:
+            doc = await self.db.get_tmdb_cache(key)
+        except PyMongoError as e:
+            logger.warning("[tmdb_cache] Lookup of %s failed: %s", key, e)
+            return False, None
+
+        if doc:
+            expires_at = doc["expires_at"].replace(tzinfo=timezone.utc)
+            remaining = (expires_at - datetime.now(timezone.utc)).total_seconds()
+            if remaining > 0:
+                self.store_hits += 1
+                self.memory.set(key, (doc.get("value"),), ttl=remaining)
+                return True, doc.get("value")
+
+        self.store_misses += 1
+        return False, None
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        self.memory.set(key, (value,), ttl=ttl)
+        if self.db is None:
+            return
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl)
+        try:
+            await self.db.set_tmdb_cache(key, value, expires_at)
+        except PyMongoError as e:
+            # e.g. a details document over the BSON size limit: memory only
+            logger.warning("[tmdb_cache] Failed to store %s: %s", key, e)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "memory": self.memory.stats(),
+            "store_hits": self.store_hits,
+            "store_misses": self.store_misses,
+        }
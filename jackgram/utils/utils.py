@@ -1,13 +1,18 @@
 from jackgram.bot.bot import BASE_URL, get_db
 import hashlib
 import re
-from jackgram.bot.bot import lock
 import PTN
 from jackgram.utils.tmdb import get_tmdb
+from jackgram.utils.concurrency import KeyedLock
+from jackgram.utils.fuzzy_search import fuzzy_index, raw_key, tmdb_key
+from jackgram.utils.telegram_stream import invalidate_stream_metadata
 from typing import Any, Dict, List, Union, Optional
 
 db = get_db()
 tmdb = get_tmdb()
+# Serialises the read-then-insert duplicate check of raw files (tmdb documents
+# are written with atomic conditional updates, see Database.add_tmdb_file)
+document_locks = KeyedLock()
 
 
 def get_file_title(message) -> str:
@@ -105,6 +110,7 @@ async def process_series(
     series_doc = {
         "tmdb_id": series_details.get("id"),
         "title": series_details.get("name"),
+        "original_title": series_details.get("original_name"),
         "poster_path": series_details.get("poster_path"),
         "backdrop_path": series_details.get("backdrop_path"),
         "overview": series_details.get("overview"),
@@ -133,27 +139,30 @@ async def process_series(
         ],
     }
 
-    async with lock:
-        existing_media = await db.get_tmdb(tmdb_id=media_id)
-        if existing_media:
-            await db.update_tmdb(existing_media, series_doc, "series")
-        else:
-            await db.add_tmdb(series_doc)
+    await db.add_tmdb_file(series_doc)
+    fuzzy_index.add(
+        tmdb_key(media_id), series_doc["title"], series_doc["original_title"]
+    )
+    invalidate_stream_metadata(hash=file_info["hash"])
 
 
 async def process_files(file_info: Dict[str, Union[str, int]]) -> None:
     media_doc = {**file_info, "mode": "multi"}
 
-    async with lock:
+    file_key = ("file", file_info["file_name"], file_info["file_size"])
+    async with document_locks(file_key):
         existing_media = await db.get_media_file(hash=file_info["hash"])
         if existing_media:
             await db.update_media_file(media_doc)
+            fuzzy_index.add(raw_key(file_info["hash"]), file_info["file_name"])
         else:
             duplicate = await db.get_media_file_by_name_and_size(
                 file_info["file_name"], file_info["file_size"]
             )
             if not duplicate:
                 await db.add_media_file(media_doc)
+                fuzzy_index.add(raw_key(file_info["hash"]), file_info["file_name"])
+    invalidate_stream_metadata(hash=file_info["hash"])
 
 
 async def process_movie(
@@ -165,6 +174,7 @@ async def process_movie(
     movie_doc = {
         "tmdb_id": media_details.get("id"),
         "title": media_details.get("title"),
+        "original_title": media_details.get("original_title"),
         "poster_path": media_details.get("poster_path"),
         "backdrop_path": media_details.get("backdrop_path"),
         "overview": media_details.get("overview"),
@@ -178,12 +188,9 @@ async def process_movie(
         "file_info": [file_info],
     }
 
-    async with lock:
-        existing_media = await db.get_tmdb(tmdb_id=media_id)
-        if existing_media:
-            await db.update_tmdb(existing_media, movie_doc, "movie")
-        else:
-            await db.add_tmdb(movie_doc)
+    await db.add_tmdb_file(movie_doc)
+    fuzzy_index.add(tmdb_key(media_id), movie_doc["title"], movie_doc["original_title"])
+    invalidate_stream_metadata(hash=file_info["hash"])
 
 
 def extract_show_info_raw(data: Dict) -> Dict:
@@ -0,0 +1,73 @@
+"""Tests for the encrypted store of exported per-DC auth keys."""
+
+import json
+import os
+import stat
+from types import SimpleNamespace
+
+from telethon.crypto import AuthKey
+
+from jackgram.utils.auth_key_store import AuthKeyStore
+
+
+def _client(dc_id=2):
+    return SimpleNamespace(
+        session=SimpleNamespace(auth_key=AuthKey(os.urandom(256)), dc_id=dc_id)
+    )
+
+
+def test_keys_survive_a_restart(tmp_path):
+    path = str(tmp_path / "auth_keys.json")
+    client, exported = _client(), AuthKey(os.urandom(256))
+    AuthKeyStore(path).put(client, 4, exported)
+
+    restarted = AuthKeyStore(path)
+    assert restarted.load() == 1
+    restored = restarted.get(client, 4)
+    assert restored is not None and restored.key == exported.key
+    assert restarted.get(client, 5) is None
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+
+def test_file_holds_no_plaintext_and_needs_the_owning_session(tmp_path):
+    path = str(tmp_path / "auth_keys.json")
+    client, exported = _client(), AuthKey(os.urandom(256))
+    AuthKeyStore(path).put(client, 4, exported)
+
+    with open(path, "rb") as f:
+        assert exported.key not in f.read()
+
+    restarted = AuthKeyStore(path)
+    restarted.load()
+    assert restarted.get(_client(), 4) is None  # other account: nothing stored
+
+
+def test_tampered_entries_are_rejected(tmp_path):
+    path = str(tmp_path / "auth_keys.json")
+    client = _client()
+    AuthKeyStore(path).put(client, 4, AuthKey(os.urandom(256)))
+    with open(path) as f:
+        data = json.load(f)
+    # Move the DC 4 key to DC 5: the MAC binds each key to its DC
+    (account,) = data["keys"]
+    data["keys"][account]["5"] = data["keys"][account].pop("4")
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+    restarted = AuthKeyStore(path)
+    restarted.load()
+    assert restarted.get(client, 5) is None
+    assert restarted.stats()["rejected"] == 1
+
+
+def test_invalidate_removes_the_key_from_disk(tmp_path):
+    path = str(tmp_path / "auth_keys.json")
+    client = _client()
+    store = AuthKeyStore(path)
+    store.put(client, 4, AuthKey(os.urandom(256)))
+    store.invalidate(client, 4)
+
+    assert store.get(client, 4) is None
+    restarted = AuthKeyStore(path)
+    assert restarted.load() == 0
+    assert store.stats()["invalidated"] == 1
@@ -0,0 +1,90 @@
+"""Tests for the in-memory TTL/LRU cache and stream metadata invalidation."""
+
+from jackgram.utils import cache as cache_module
+from jackgram.utils.cache import TTLCache
+from jackgram.utils.telegram_stream import (
+    StreamMetadata,
+    invalidate_stream_metadata,
+    stream_metadata_cache,
+)
+
+
+def test_get_and_lru_eviction():
+    cache = TTLCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    # Touch "a" so "b" becomes the least recently used entry
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+    assert cache.hits == 2
+    assert cache.misses == 1
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = TTLCache(max_entries=10, ttl=5)
+    cache.set("a", 1)
+
+    now[0] += 4
+    assert cache.get("a") == 1
+    now[0] += 2
+    assert cache.get("a") is None
+    assert cache.expirations == 1
+
+
+def test_disabled_cache_stores_nothing():
+    cache = TTLCache(max_entries=0, ttl=60)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+def test_invalidate_stream_metadata():
+    def meta(chat_id, tmdb_id):
+        return StreamMetadata(
+            media={"chat_id": chat_id},
+            file_location=None,
+            dc_id=2,
+            file_size=10,
+            tmdb_id=tmdb_id,
+        )
+
+    stream_metadata_cache.clear()
+    stream_metadata_cache.set(("h1", "1", None), meta(-100, 1))
+    stream_metadata_cache.set(("h1", None, None), meta(-100, 1))
+    stream_metadata_cache.set(("h2", "2", None), meta(-100, 2))
+    stream_metadata_cache.set(("h3", None, "h3"), meta(-200, None))
+
+    assert invalidate_stream_metadata(hash="h1") == 2
+    assert invalidate_stream_metadata(tmdb_id=2) == 1
+    assert invalidate_stream_metadata(chat_id=-200) == 1
+    assert len(stream_metadata_cache) == 0
+
+
+def test_sweep_removes_expired_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = TTLCache(max_entries=10, ttl=5)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=60)
+
+    now[0] += 10
+    assert cache.sweep() == 1
+    assert len(cache) == 1
+    assert cache.get("b") == 2
+
+
+def test_dump_and_load_roundtrip(tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = TTLCache(max_entries=10, ttl=60)
+    cache.set("a", {"size": 1})
+    cache.set("b", {"size": 2}, ttl=0)  # already expired, not persisted
+    assert cache.dump(path, encode=dict) == 1
+
+    restored = TTLCache(max_entries=10, ttl=60)
+    assert restored.load(path, decode=dict) == 1
+    assert restored.get("a") == {"size": 1}
@@ -0,0 +1,62 @@
+"""Tests for the on-disk streaming chunk cache."""
+
+import pytest
+
+from jackgram.utils.chunk_cache import ChunkCache
+
+KB = 1024
+
+
+@pytest.mark.asyncio
+async def test_put_and_get_roundtrip(tmp_path):
+    cache = ChunkCache(str(tmp_path), max_bytes=1024 * KB)
+    await cache.put(42, 0, 512 * KB, b"a" * 100)
+
+    assert cache.contains(42, 0, 512 * KB)
+    assert await cache.get(42, 0, 512 * KB) == b"a" * 100
+    assert cache.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_key_includes_part_size(tmp_path):
+    cache = ChunkCache(str(tmp_path), max_bytes=1024 * KB)
+    await cache.put(42, 0, 512 * KB, b"a" * 100)
+
+    assert await cache.get(42, 0, 1024 * KB) is None
+    assert cache.misses == 1
+
+
+@pytest.mark.asyncio
+async def test_evicts_least_recently_used(tmp_path):
+    cache = ChunkCache(str(tmp_path), max_bytes=250)
+    await cache.put(1, 0, 100, b"x" * 100)
+    await cache.put(1, 100, 100, b"y" * 100)
+    # Touch the first part so the second becomes the LRU entry
+    await cache.get(1, 0, 100)
+    await cache.put(1, 200, 100, b"z" * 100)
+
+    assert cache.contains(1, 0, 100)
+    assert not cache.contains(1, 100, 100)
+    assert cache.contains(1, 200, 100)
+    assert cache.evictions == 1
+    assert cache.stats()["size_bytes"] == 200
+
+
+@pytest.mark.asyncio
+async def test_index_is_rebuilt_from_disk(tmp_path):
+    cache = ChunkCache(str(tmp_path), max_bytes=1024 * KB)
+    await cache.put(7, 4096, 4096, b"data")
+
+    reloaded = ChunkCache(str(tmp_path), max_bytes=1024 * KB)
+    assert reloaded.contains(7, 4096, 4096)
+    assert await reloaded.get(7, 4096, 4096) == b"data"
+
+
+@pytest.mark.asyncio
+async def test_disabled_cache_is_a_noop(tmp_path):
+    cache = ChunkCache(str(tmp_path / "off"), max_bytes=0)
+    await cache.put(1, 0, 100, b"x" * 100)
+
+    assert not cache.enabled
+    assert await cache.get(1, 0, 100) is None
+    assert not (tmp_path / "off").exists()
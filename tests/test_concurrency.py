@@ -0,0 +1,165 @@
+"""Tests for the keyed lock / turnstile primitives and the index queue pool."""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from jackgram.bot import utils as bot_utils
+from jackgram.utils.concurrency import (
+    AdmissionQueue,
+    AdmissionRejected,
+    KeyedLock,
+    KeyedTurnstile,
+    SingleFlight,
+)
+
+
+@pytest.mark.asyncio
+async def test_keyed_lock_serialises_same_key_only():
+    locks = KeyedLock()
+    active = {"a": 0, "b": 0}
+    peak = {"a": 0, "b": 0}
+
+    async def hold(key):
+        async with locks(key):
+            active[key] += 1
+            peak[key] = max(peak[key], active[key])
+            await asyncio.sleep(0.01)
+            active[key] -= 1
+
+    await asyncio.gather(*(hold(k) for k in "aabb"))
+    assert peak == {"a": 1, "b": 1}
+    assert len(locks) == 0
+
+
+@pytest.mark.asyncio
+async def test_turnstile_orders_same_key_and_skips_released():
+    turnstile = KeyedTurnstile()
+    first = turnstile.ticket("show")
+    second = turnstile.ticket("show")
+    third = turnstile.ticket("show")
+    other = turnstile.ticket("movie")
+
+    assert first.done() and other.done()
+    assert not second.done()
+
+    # Giving up a ticket that is not at the head does not open anything
+    turnstile.release("show", second)
+    assert not third.done()
+
+    turnstile.release("show", first)
+    assert third.done()
+    turnstile.release("show", third)
+    turnstile.release("movie", other)
+    assert len(turnstile) == 0
+
+
+def _message(name):
+    return SimpleNamespace(
+        file=SimpleNamespace(name=name, size=2 * 1024**3), message=""
+    )
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_result_and_errors():
+    flight = SingleFlight()
+    calls = []
+
+    async def work(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        if value == "bad":
+            raise ValueError(value)
+        return value
+
+    results = await asyncio.gather(
+        *(flight.do("a", lambda: work("a")) for _ in range(3))
+    )
+    assert results == ["a", "a", "a"] and calls == ["a"]
+    assert flight.shared == 2 and len(flight) == 0
+
+    outcomes = await asyncio.gather(
+        flight.do("b", lambda: work("bad")),
+        flight.do("b", lambda: work("bad")),
+        return_exceptions=True,
+    )
+    assert all(isinstance(o, ValueError) for o in outcomes)
+    assert calls == ["a", "bad"]
+
+
+@pytest.mark.asyncio
+async def test_index_queue_keeps_title_order(monkeypatch):
+    stored = []
+
+    async def fake_index_file(message, filename, turn=None):
+        # Earlier episodes take longer to enrich than later ones
+        await asyncio.sleep(0.05 if "E01" in filename else 0.01)
+        await turn
+        stored.append(message.file.name)
+
+    monkeypatch.setattr(bot_utils, "index_file", fake_index_file)
+    worker = asyncio.create_task(bot_utils.process_index_queue())
+    try:
+        for name in ["Show.S01E01.mkv", "Show.S01E02.mkv", "Show.S01E03.mkv"]:
+            await bot_utils.index_queue.put(_message(name))
+        await asyncio.wait_for(bot_utils.index_queue.join(), timeout=5)
+    finally:
+        worker.cancel()
+
+    assert stored == ["Show.S01E01.mkv", "Show.S01E02.mkv", "Show.S01E03.mkv"]
+    assert bot_utils.index_metrics.stats()["indexed"] >= 3
+
+
+@pytest.mark.asyncio
+async def test_admission_queue_hands_slots_over_in_order():
+    queue = AdmissionQueue(limit=1, max_wait=5)
+    first = await queue.acquire()
+    order = []
+
+    async def wait(name):
+        admission = await queue.acquire()
+        order.append(name)
+        return admission
+
+    waiters = [asyncio.create_task(wait(n)) for n in ("b", "c")]
+    await asyncio.sleep(0)
+    assert queue.stats()["waiting"] == 2
+
+    first.release()
+    first.release()  # idempotent: must not free a second slot
+    second = await waiters[0]
+    assert order == ["b"] and queue.active == 1
+    second.release()
+    (await waiters[1]).release()
+    assert order == ["b", "c"] and queue.active == 0
+
+
+@pytest.mark.asyncio
+async def test_admission_queue_rejects_after_max_wait():
+    queue = AdmissionQueue(limit=1, max_wait=0.01)
+    held = await queue.acquire()
+
+    with pytest.raises(AdmissionRejected) as exc:
+        await queue.acquire()
+    assert exc.value.retry_after == 1
+    assert queue.stats()["rejected"] == 1 and queue.stats()["waiting"] == 0
+
+    # A cancelled waiter leaves the queue without taking the slot
+    task = asyncio.create_task(queue.acquire())
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    held.release()
+    assert queue.active == 0
+
+
+@pytest.mark.asyncio
+async def test_admission_queue_without_limit_never_waits():
+    queue = AdmissionQueue(limit=0, max_wait=0)
+    admissions = [await queue.acquire() for _ in range(100)]
+    assert queue.active == 100
+    for admission in admissions:
+        admission.release()
+    assert queue.active == 0
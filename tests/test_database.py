@@ -2,6 +2,7 @@ import pytest
 import pytest_asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
 from jackgram.utils.database import Database
+from jackgram.utils.pagination import next_cursor
 
 
 @pytest_asyncio.fixture
@@ -60,3 +61,222 @@ async def test_update_tmdb(test_db):
     assert result is not None
     assert len(result["file_info"]) == 1
     assert result["file_info"][0]["hash"] == "abc123"
+
+
+@pytest.mark.asyncio
+async def test_run_migrations_is_idempotent(test_db):
+    from jackgram.utils.migrations import MIGRATIONS, run_migrations
+
+    # Two documents for the same show must be merged before the unique index
+    await test_db.tmdb_collection.insert_many(
+        [
+            {"tmdb_id": 321, "type": "movie", "file_info": [{"hash": "aaa"}]},
+            {"tmdb_id": 321, "type": "movie", "file_info": [{"hash": "bbb"}]},
+        ]
+    )
+
+    version = await run_migrations(test_db)
+    assert version == max(m.version for m in MIGRATIONS)
+    assert await run_migrations(test_db) == version
+
+    docs = await test_db.tmdb_collection.find({"tmdb_id": 321}).to_list(None)
+    assert len(docs) == 1
+    assert {f["hash"] for f in docs[0]["file_info"]} == {"aaa", "bbb"}
+
+    index_names = await test_db.tmdb_collection.index_information()
+    assert index_names["tmdb_id_unique"]["unique"] is True
+
+
+@pytest.mark.asyncio
+async def test_file_locations_follow_tmdb_documents(test_db):
+    file_info = {"hash": "abc123", "chat_id": -100, "message_id": 7, "file_size": 10}
+    await test_db.add_tmdb(
+        {"tmdb_id": 654, "type": "movie", "title": "Test", "file_info": [file_info]}
+    )
+
+    location = await test_db.get_file_location("abc123")
+    assert location["tmdb_id"] == 654
+    assert location["message_id"] == 7
+
+    await test_db.del_by_chat_id(-100)
+    assert await test_db.get_file_location("abc123") is None
+
+
+@pytest.mark.asyncio
+async def test_search_ranks_title_matches_and_counts_both_collections(test_db):
+    await test_db.add_tmdb({"tmdb_id": 1, "title": "Dark", "type": "tv", "seasons": []})
+    await test_db.add_tmdb(
+        {"tmdb_id": 2, "title": "The Dark Knight", "type": "movie", "file_info": []}
+    )
+    await test_db.add_media_file(
+        {"hash": "abc", "file_name": "darkness.falls.mkv", "file_size": 1}
+    )
+
+    results, total = await test_db.search_tmdb("dark")
+    assert total == 3
+    assert [r.get("tmdb_id") for r in results[:2]] in ([1, 2], [2, 1])
+    assert results[2]["hash"] == "abc"
+    assert "search_tokens" not in results[0]
+
+    results, total = await test_db.search_tmdb("dark kni")
+    assert total == 1 and results[0]["tmdb_id"] == 2
+
+
+@pytest.mark.asyncio
+async def test_cursor_pages_match_skip_pages(test_db):
+    for n in range(7):
+        await test_db.tmdb_collection.insert_one(
+            {"tmdb_id": n, "type": "movie", "rating": n % 3 or None}
+        )
+
+    by_skip = [
+        doc["tmdb_id"]
+        for page in (1, 2, 3)
+        for doc in await test_db.get_movies(page=page, per_page=3, sort_by="rating")
+    ]
+    by_cursor, cursor = [], None
+    while True:
+        docs = await test_db.get_movies(per_page=3, sort_by="rating", cursor=cursor)
+        by_cursor += [doc["tmdb_id"] for doc in docs]
+        cursor = next_cursor(docs, 3, "rating")
+        if cursor is None:
+            break
+    assert by_cursor == by_skip and len(by_cursor) == 7
+
+
+@pytest.mark.asyncio
+async def test_library_stats_follow_writes_and_match_refresh(test_db):
+    show = {
+        "tmdb_id": 10,
+        "title": "Show",
+        "type": "tv",
+        "seasons": [
+            {
+                "season_number": 1,
+                "episodes": [
+                    {"episode_number": 1, "file_info": [{"hash": "a", "file_size": 5}]}
+                ],
+            }
+        ],
+    }
+    await test_db.add_tmdb(show)
+    await test_db.add_media_file({"hash": "r", "file_name": "r.mkv", "file_size": 7})
+    update = {
+        "tmdb_id": 10,
+        "seasons": [
+            {
+                "season_number": 1,
+                "episodes": [
+                    {"episode_number": 2, "file_info": [{"hash": "b", "file_size": 3}]}
+                ],
+            }
+        ],
+    }
+    await test_db.update_tmdb(await test_db.get_tmdb(10), update, "series")
+
+    stats = await test_db.get_library_stats()
+    assert stats == {
+        "movies": 0,
+        "tv": 1,
+        "media_files": 1,
+        "file_count": 3,
+        "total_size": 15,
+    }
+    stored = await test_db.get_tmdb(10)
+    assert (stored["total_size"], stored["file_count"]) == (8, 2)
+
+    # the server-side recomputation agrees with the incremental totals
+    await test_db.refresh_size_fields()
+    await test_db.refresh_library_stats()
+    assert await test_db.get_library_stats() == stats
+
+    await test_db.del_tmdb(10)
+    await test_db.del_media_file("r")
+    stats = await test_db.get_library_stats()
+    assert stats["tv"] == 0 and stats["total_size"] == 0
+
+
+@pytest.mark.asyncio
+async def test_del_by_chat_id_updates_stats_incrementally(test_db):
+    def movie(tmdb_id, *files):
+        return {"tmdb_id": tmdb_id, "type": "movie", "file_info": list(files)}
+
+    await test_db.add_tmdb(
+        movie(
+            1,
+            {"hash": "a", "chat_id": -100, "file_size": 5},
+            {"hash": "b", "chat_id": -200, "file_size": 3},
+        )
+    )
+    await test_db.add_tmdb(movie(2, {"hash": "c", "chat_id": -100, "file_size": 4}))
+    await test_db.add_tmdb(movie(3, {"hash": "d", "chat_id": -200, "file_size": 2}))
+    await test_db.add_media_file({"hash": "r", "chat_id": -100, "file_size": 7})
+    await test_db.add_media_file({"hash": "s", "chat_id": -200, "file_size": 1})
+
+    await test_db.del_by_chat_id(-100)
+
+    stats = await test_db.get_library_stats()
+    assert stats == {
+        "movies": 2,
+        "tv": 0,
+        "media_files": 1,
+        "file_count": 3,
+        "total_size": 6,
+    }
+    await test_db.refresh_library_stats()
+    assert await test_db.get_library_stats() == stats
+
+
+def _episode_doc(season, episode, file_hash, file_name, file_size):
+    return {
+        "tmdb_id": 20,
+        "title": "Show",
+        "type": "tv",
+        "seasons": [
+            {
+                "season_number": season,
+                "episodes": [
+                    {
+                        "season_number": season,
+                        "episode_number": episode,
+                        "file_info": [
+                            {
+                                "hash": file_hash,
+                                "file_name": file_name,
+                                "file_size": file_size,
+                            }
+                        ],
+                    }
+                ],
+            }
+        ],
+    }
+
+
+@pytest.mark.asyncio
+async def test_add_tmdb_file_merges_without_replacing(test_db):
+    assert await test_db.add_tmdb_file(_episode_doc(1, 1, "a", "Show.S01E01.mkv", 10))
+    # new file for the same episode, a new episode, and a new season
+    assert await test_db.add_tmdb_file(
+        _episode_doc(1, 1, "b", "Show.S01E01.720p.mkv", 5)
+    )
+    assert await test_db.add_tmdb_file(_episode_doc(1, 2, "c", "Show.S01E02.mkv", 10))
+    assert await test_db.add_tmdb_file(_episode_doc(2, 1, "d", "Show.S02E01.mkv", 10))
+    # same name and size under another hash is skipped; a known hash is updated
+    assert not await test_db.add_tmdb_file(
+        _episode_doc(1, 2, "x", "Show.S01E02.mkv", 10)
+    )
+    renamed = _episode_doc(1, 1, "a", "Show.S01E01.mkv", 10)
+    renamed["seasons"][0]["episodes"][0]["file_info"][0]["quality"] = "1080p"
+    assert await test_db.add_tmdb_file(renamed)
+
+    doc = await test_db.get_tmdb(20)
+    season_1 = next(s for s in doc["seasons"] if s["season_number"] == 1)
+    episode_1 = next(e for e in season_1["episodes"] if e["episode_number"] == 1)
+    assert [f["hash"] for f in episode_1["file_info"]] == ["a", "b"]
+    assert episode_1["file_info"][0]["quality"] == "1080p"
+    assert len(season_1["episodes"]) == 2 and len(doc["seasons"]) == 2
+    assert (doc["total_size"], doc["file_count"]) == (35, 4)
+    assert "s02e01" in doc["search_tokens"]
+    assert (await test_db.get_file_location("d"))["tmdb_id"] == 20
+    assert (await test_db.get_library_stats())["total_size"] == 35
@@ -0,0 +1,67 @@
+"""Tests for the in-memory trigram search index."""
+
+import asyncio
+import logging
+
+import pytest
+
+from jackgram.utils.fuzzy_search import TrigramIndex, raw_key, tmdb_key
+
+
+def build_index(max_entries=100):
+    index = TrigramIndex(max_entries)
+    index.add(tmdb_key(1396), "Breaking Bad")
+    index.add(tmdb_key(60059), "Better Call Saul")
+    index.add(tmdb_key(1399), "Game of Thrones", "Game of Thrones")
+    index.add(raw_key("abc"), "Bad.Boys.1995.1080p.mkv")
+    return index
+
+
+def test_typos_still_find_the_title():
+    index = build_index()
+    assert index.search("breakng bad")[0] == tmdb_key(1396)
+    assert index.search("game of throns")[0] == tmdb_key(1399)
+    assert index.search("better cal saul") == [tmdb_key(60059)]
+
+
+def test_unrelated_queries_do_not_match():
+    index = build_index()
+    assert index.search("zzzz qqqq") == []
+    assert index.search("") == []
+
+
+def test_remove_and_replace_update_postings():
+    index = build_index()
+    index.remove(tmdb_key(1396))
+    assert tmdb_key(1396) not in index.search("breaking bad")
+
+    index.add(raw_key("abc"), "Bad.Boys.II.2003.mkv")
+    assert index.search("bad boys 2003")[0] == raw_key("abc")
+    assert len(index) == 3
+
+
+def test_full_index_refuses_entries_and_reports_incomplete():
+    index = build_index(max_entries=4)
+    index.ready = True
+    assert index.usable
+    assert not index.add(tmdb_key(1), "One Too Many")
+    stats = index.stats()
+    assert stats["refused"] == 1 and not stats["complete"] and not index.usable
+    assert stats["entries"] == 4 and stats["memory_bytes"] > 0
+
+
+@pytest.mark.asyncio
+async def test_background_rebuild_is_kept_alive_and_logs_failures(caplog):
+    class BrokenDb:
+        @property
+        def tmdb_collection(self):
+            raise ConnectionError("mongo down")
+
+    index = TrigramIndex(100)
+    with caplog.at_level(logging.ERROR):
+        task = index.rebuild_in_background(BrokenDb())
+        assert task in index._build_tasks
+        await asyncio.gather(task, return_exceptions=True)
+
+    assert not index._build_tasks
+    assert "rebuild failed: mongo down" in caplog.text
@@ -0,0 +1,232 @@
+"""Tests for the staged /index pipeline."""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from telethon.errors import FloodWaitError
+
+from jackgram.bot import utils as bot_utils
+from jackgram.utils.rate_limit import AdaptiveRateLimiter
+
+
+class FakeClient:
+    def __init__(self, names):
+        # message id -> file name (None for a text-only message)
+        self.names = names
+
+    async def get_messages(self, chat_id, ids):
+        return [
+            SimpleNamespace(
+                id=i,
+                document=object(),
+                message="",
+                file=SimpleNamespace(name=self.names[i], size=2 * 1024**3),
+            )
+            if self.names.get(i)
+            else None
+            for i in ids
+        ]
+
+
+@pytest.fixture
+def fast_limiters(monkeypatch):
+    monkeypatch.setattr(
+        bot_utils, "fetch_limiter", AdaptiveRateLimiter(rate=1000, max_rate=1000)
+    )
+
+    async def fake_forward(client, message, dest, on_flood_wait=None):
+        return message
+
+    monkeypatch.setattr(bot_utils, "forward_message", fake_forward)
+
+
+@pytest.mark.asyncio
+async def test_pipeline_persists_same_title_in_message_order(
+    monkeypatch, fast_limiters
+):
+    names = {i: f"Show.S01E{i:02d}.mkv" for i in range(1, 31)}
+    names.update({i: f"Movie {i}.2020.mkv" for i in range(31, 41)})
+    names[41] = None
+    persisted = []
+
+    async def fake_enrich_file(message, filename):
+        # Early episodes are the slowest to look up
+        await asyncio.sleep(0.03 if message.id <= 3 else 0)
+        return message.id
+
+    async def fake_persist_file(enriched):
+        persisted.append(enriched)
+
+    monkeypatch.setattr(bot_utils, "enrich_file", fake_enrich_file)
+    monkeypatch.setattr(bot_utils, "persist_file", fake_persist_file)
+
+    progress = []
+
+    async def on_progress(stats, current_id):
+        progress.append(set(stats["pipeline"]))
+
+    stats = await asyncio.wait_for(
+        bot_utils.index_channel(
+            FakeClient(names), -100, 1, 41, progress_callback=on_progress
+        ),
+        timeout=5,
+    )
+
+    episodes = [i for i in persisted if i <= 30]
+    assert episodes == list(range(1, 31))
+    assert stats["indexed"] == 40
+    assert stats["skipped_no_media"] == 1
+    assert stats["pipeline"]["persist"]["processed"] == 40
+    assert progress and progress[0] == {
+        "fetch",
+        "filter",
+        "forward",
+        "enrich",
+        "persist",
+    }
+
+
+@pytest.mark.asyncio
+async def test_pipeline_counts_enrich_errors(monkeypatch, fast_limiters):
+    names = {1: "Movie A.2020.mkv", 2: "Movie B.2020.mkv"}
+
+    async def fake_enrich_file(message, filename):
+        if message.id == 1:
+            raise RuntimeError("tmdb down")
+        return message.id
+
+    async def fake_persist_file(enriched):
+        pass
+
+    monkeypatch.setattr(bot_utils, "enrich_file", fake_enrich_file)
+    monkeypatch.setattr(bot_utils, "persist_file", fake_persist_file)
+
+    stats = await bot_utils.index_channel(FakeClient(names), -100, 1, 2)
+    assert stats["errors"] == 1
+    assert stats["indexed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stalled_database_applies_backpressure(monkeypatch, fast_limiters):
+    monkeypatch.setattr(bot_utils.IndexPipeline, "_QUEUE_SIZE", 2)
+    monkeypatch.setattr(bot_utils.IndexPipeline, "_MAX_IN_FLIGHT", 4)
+    names = {i: f"Movie {i}.2020.mkv" for i in range(1, 51)}
+    enriched = []
+    database = asyncio.Event()
+
+    async def fake_enrich_file(message, filename):
+        enriched.append(message.id)
+        return message.id
+
+    async def fake_persist_file(enriched):
+        await database.wait()
+
+    monkeypatch.setattr(bot_utils, "enrich_file", fake_enrich_file)
+    monkeypatch.setattr(bot_utils, "persist_file", fake_persist_file)
+
+    pipeline = bot_utils.IndexPipeline(FakeClient(names), -100, 1, 50, 10, -200)
+    run = asyncio.create_task(pipeline.run())
+    await asyncio.sleep(0.1)
+
+    assert len(pipeline._persist_tasks) <= 4
+    assert len(enriched) <= 4
+    database.set()
+    stats = await asyncio.wait_for(run, timeout=5)
+    assert stats["indexed"] == 50
+
+
+class FakeSessions:
+    """Stand-in for the multi-session manager owning every test client."""
+
+    def __init__(self, spare):
+        self.spare = spare
+
+    def owns(self, client):
+        return True
+
+    def record_flood_wait(self, client, rpc, seconds):
+        pass
+
+    async def get_client(self, rpc):
+        return self.spare
+
+
+class TaggingClient(FakeClient):
+    """Tags fetched messages with the account that fetched them."""
+
+    def __init__(self, names, flood_on=()):
+        super().__init__(names)
+        self.flood_on = set(flood_on)
+        self.forwarded = []
+
+    async def get_messages(self, chat_id, ids):
+        if self.flood_on & set(ids):
+            raise FloodWaitError(request=None, capture=60)
+        messages = await super().get_messages(chat_id, ids)
+        for message in messages:
+            if message is not None:
+                message.fetched_by = self
+        return messages
+
+    async def get_input_entity(self, peer):
+        return peer
+
+
+@pytest.mark.asyncio
+async def test_messages_are_forwarded_by_the_account_that_fetched_them(monkeypatch):
+    monkeypatch.setattr(
+        bot_utils, "fetch_limiter", AdaptiveRateLimiter(rate=1000, max_rate=1000)
+    )
+    names = {i: f"Movie {i}.2020.mkv" for i in range(1, 5)}
+    # The first account is flood-waited on the second batch and the run moves on
+    first = TaggingClient(names, flood_on={3})
+    spare = TaggingClient(names)
+    monkeypatch.setattr(bot_utils, "multi_session_manager", FakeSessions(spare))
+
+    async def fake_forward(client, message, dest, on_flood_wait=None):
+        await asyncio.sleep(0.02)  # message 2 is still queued at the switch
+        assert message.fetched_by is client
+        client.forwarded.append(message.id)
+        return message
+
+    async def fake_enrich_file(message, filename):
+        return message.id
+
+    async def fake_persist_file(enriched):
+        pass
+
+    monkeypatch.setattr(bot_utils, "forward_message", fake_forward)
+    monkeypatch.setattr(bot_utils, "enrich_file", fake_enrich_file)
+    monkeypatch.setattr(bot_utils, "persist_file", fake_persist_file)
+    monkeypatch.setattr(bot_utils.IndexPipeline, "_FORWARD_WORKERS", 1)
+
+    stats = await bot_utils.IndexPipeline(first, -100, 1, 4, 2, -200).run()
+
+    assert stats["indexed"] == 4 and stats["session_switches"] == 1
+    assert sorted(first.forwarded) == [1, 2]
+    assert sorted(spare.forwarded) == [3, 4]
+
+
+@pytest.mark.asyncio
+async def test_forward_moved_to_another_session_refetches_the_message(monkeypatch):
+    names = {1: "Movie 1.2020.mkv"}
+    first, spare = TaggingClient(names), TaggingClient(names)
+    monkeypatch.setattr(bot_utils, "multi_session_manager", FakeSessions(spare))
+    monkeypatch.setattr(
+        bot_utils, "fetch_limiter", AdaptiveRateLimiter(rate=1000, max_rate=1000)
+    )
+
+    async def fake_send(client, message, dest):
+        if client is first:
+            raise FloodWaitError(request=None, capture=60)
+        assert message.fetched_by is client
+        client.forwarded.append(message.id)
+        return message
+
+    monkeypatch.setattr(bot_utils, "send_message", fake_send)
+    pipeline = bot_utils.IndexPipeline(first, -100, 1, 1, 1, -200)
+    (message,) = await first.get_messages(-100, [1])
+
+    await pipeline._forward_one(1, message, first)
+    assert spare.forwarded == [1] and first.forwarded == []
@@ -0,0 +1,48 @@
+"""Tests for keyset pagination cursors and filters."""
+
+import pytest
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+
+from jackgram.utils.pagination import (
+    InvalidCursor,
+    decode_cursor,
+    encode_cursor,
+    keyset_filter,
+    next_cursor,
+)
+
+
+def test_cursor_round_trip_and_sort_binding():
+    oid = ObjectId()
+    cursor = encode_cursor("release_date", {"_id": oid, "release_date": "2024-05-01"})
+    assert decode_cursor(cursor, "release_date") == ("2024-05-01", oid)
+
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, "rating")
+    with pytest.raises(InvalidCursor):
+        decode_cursor("not-a-cursor", "release_date")
+
+
+def test_keyset_filter_handles_ties_and_nulls():
+    oid = ObjectId()
+    assert keyset_filter("_id", DESCENDING, None, oid) == {"_id": {"$lt": oid}}
+
+    # descending: smaller values, then nulls (sorted last), then ties by _id
+    assert keyset_filter("rating", DESCENDING, 7.5, oid) == {
+        "$or": [
+            {"rating": {"$lt": 7.5}},
+            {"rating": None},
+            {"rating": 7.5, "_id": {"$lt": oid}},
+        ]
+    }
+    # ascending from a null: remaining nulls, then every real value
+    assert keyset_filter("rating", ASCENDING, None, oid) == {
+        "$or": [{"rating": None, "_id": {"$gt": oid}}, {"rating": {"$ne": None}}]
+    }
+
+
+def test_next_cursor_only_for_full_pages():
+    docs = [{"_id": ObjectId()} for _ in range(3)]
+    assert next_cursor(docs, 4, "_id") is None
+    assert decode_cursor(next_cursor(docs, 3, "_id"), "_id")[1] == docs[-1]["_id"]
@@ -0,0 +1,253 @@
+"""Tests for the pipelined ParallelTransferrer download loop."""
+
+import asyncio
+import random
+
+import pytest
+import pytest_asyncio
+from telethon.errors import FloodWaitError
+from telethon.tl.types import InputDocumentFileLocation
+
+from jackgram.utils.stream_controller import ConnectionBudget
+from jackgram.utils.telegram_stream import ParallelTransferrer
+
+PART = 4096
+DATA = bytes(random.Random(0).getrandbits(8) for _ in range(PART * 10 + 123))
+
+
+class FakeResult:
+    def __init__(self, data):
+        self.bytes = data
+
+
+class FakeClient:
+    """Serves GetFileRequest from memory with random per-request latency."""
+
+    def __init__(self, seed=1):
+        self.rng = random.Random(seed)
+        self.requests = []
+
+    async def _call(self, sender, request):
+        self.requests.append(request.offset)
+        await asyncio.sleep(self.rng.random() / 200)
+        return FakeResult(DATA[request.offset : request.offset + request.limit])
+
+
+class FakeSender:
+    async def disconnect(self):
+        pass
+
+
+class FakePool:
+    def __init__(self, fail_on=None):
+        self.released = []
+        self.borrowed = 0
+        self.fail_on = fail_on
+
+    async def acquire(self, client, dc_id):
+        self.borrowed += 1
+        if self.borrowed == self.fail_on:
+            raise ConnectionError("auth export failed")
+        await asyncio.sleep(0)
+        return FakeSender(), None
+
+    async def release(self, client, dc_id, sender, auth_key):
+        self.released.append(sender)
+
+
+class FakeManager:
+    def __init__(self, budget=100):
+        self._sender_pool = FakePool()
+        self.budget = ConnectionBudget(per_account=budget)
+        self.flood_waits = []
+        self.shares = []
+        self.in_flight = 0
+
+    async def get_client(self, rpc=None, dc_id=None):
+        return self.client
+
+    def _session_acquired(self, client, dc_id=None):
+        self.in_flight += 1
+        self.budget.lease(id(client), dc_id)
+
+    def _session_released(self, client, error=None, dc_id=None):
+        self.in_flight -= 1
+        self.budget.release(id(client), dc_id)
+
+    async def open_download(self, dc_id, wanted):
+        share = await self.budget.open_stream(dc_id, wanted, accounts=1)
+        self.shares.append(share)
+        return share
+
+    def record_flood_wait(self, client, rpc, seconds):
+        self.flood_waits.append((client, rpc, seconds))
+
+
+@pytest_asyncio.fixture
+async def transferrer(monkeypatch):
+    client = FakeClient()
+    t = ParallelTransferrer(manager=FakeManager(), dc_id=2)
+
+    async def _create_sender():
+        return client, FakeSender(), 2, None
+
+    monkeypatch.setattr(t, "_create_sender", _create_sender)
+    t.fake_client = client
+    return t
+
+
+def _location():
+    return InputDocumentFileLocation(
+        id=1, access_hash=2, file_reference=b"", thumb_size=""
+    )
+
+
+async def _collect(gen):
+    return b"".join([chunk async for chunk in gen])
+
+
+@pytest.mark.asyncio
+async def test_parts_are_reassembled_in_order(transferrer):
+    result = await _collect(
+        transferrer.download(
+            _location(), len(DATA), part_size_kb=PART / 1024, connection_count=4
+        )
+    )
+    assert result == DATA
+    assert transferrer.throughput > 0
+
+    await transferrer._cleanup()
+    assert len(transferrer.manager._sender_pool.released) == 4
+
+
+@pytest.mark.asyncio
+async def test_unaligned_range(transferrer):
+    result = await _collect(
+        transferrer.download(
+            _location(),
+            len(DATA),
+            offset=5000,
+            limit=9000,
+            part_size_kb=PART / 1024,
+            connection_count=3,
+        )
+    )
+    assert result == DATA[5000:14000]
+    assert min(transferrer.fake_client.requests) == PART
+
+
+@pytest.mark.asyncio
+async def test_errors_propagate_to_consumer(transferrer):
+    async def _fail(sender, request):
+        raise RuntimeError("boom")
+
+    transferrer.fake_client._call = _fail
+    with pytest.raises(RuntimeError, match="boom"):
+        await _collect(
+            transferrer.download(
+                _location(), len(DATA), part_size_kb=PART / 1024, connection_count=1
+            )
+        )
+
+    # Senders whose request failed are not handed back to the pool
+    await transferrer._cleanup()
+    assert transferrer.manager._sender_pool.released == []
+
+
+class FloodedClient(FakeClient):
+    async def _call(self, sender, request):
+        self.requests.append(request.offset)
+        raise FloodWaitError(request=None, capture=30)
+
+
+@pytest.mark.asyncio
+async def test_flood_waited_sender_hands_its_parts_to_the_others(monkeypatch):
+    good, flooded = FakeClient(), FloodedClient()
+    t = ParallelTransferrer(manager=FakeManager(), dc_id=2)
+    clients = iter([flooded, good, good])
+
+    async def _create_sender():
+        return next(clients), FakeSender(), 2, None
+
+    monkeypatch.setattr(t, "_create_sender", _create_sender)
+    result = await _collect(
+        t.download(_location(), len(DATA), part_size_kb=PART / 1024, connection_count=3)
+    )
+
+    assert result == DATA
+    assert len(flooded.requests) == 1
+    assert t.manager.flood_waits == [(flooded, "GetFile", 30)]
+    # the retired sender's slot went back to the DC budget right away
+    assert t.manager.shares[0].granted == 2
+
+    await t._cleanup()
+    assert len(t.manager._sender_pool.released) == 2
+
+
+@pytest.mark.asyncio
+async def test_flood_wait_on_every_sender_propagates(monkeypatch):
+    t = ParallelTransferrer(manager=FakeManager(), dc_id=2)
+    client = FloodedClient()
+
+    async def _create_sender():
+        return client, FakeSender(), 2, None
+
+    monkeypatch.setattr(t, "_create_sender", _create_sender)
+    with pytest.raises(FloodWaitError):
+        await _collect(
+            t.download(
+                _location(), len(DATA), part_size_kb=PART / 1024, connection_count=2
+            )
+        )
+    await t._cleanup()
+
+
+@pytest.mark.asyncio
+async def test_running_download_shrinks_to_its_fair_share(monkeypatch):
+    manager = FakeManager(budget=4)
+    # DC 3: the flood-wait tests above lowered DC 2's connection ceiling
+    t = ParallelTransferrer(manager=manager, dc_id=3)
+    client = FakeClient()
+
+    async def _create_sender():
+        return client, FakeSender(), 3, None
+
+    monkeypatch.setattr(t, "_create_sender", _create_sender)
+    download = t.download(
+        _location(), len(DATA), part_size_kb=PART / 1024, connection_count=4
+    )
+    chunks = [await download.__anext__()]
+    assert len(t.senders) == 4
+
+    # A second stream on the DC waits until the first gives connections back
+    second = await asyncio.wait_for(manager.open_download(3, 4), timeout=1)
+    await asyncio.sleep(0.05)
+    assert len(t.senders) == 2  # the fair share of 4 connections
+    assert manager.budget.free(3) == 2 - second.granted >= 0
+
+    chunks += [chunk async for chunk in download]
+    assert b"".join(chunks) == DATA
+    assert len(manager._sender_pool.released) == 4
+    second.close()
+    assert manager.budget.stats()["dcs"] == {}
+
+
+@pytest.mark.asyncio
+async def test_failed_sender_creation_gives_back_the_senders_already_borrowed():
+    manager = FakeManager(budget=4)
+    manager._sender_pool = FakePool(fail_on=2)
+    manager.client = FakeClient()
+    t = ParallelTransferrer(manager=manager, dc_id=3)
+
+    with pytest.raises(ConnectionError):
+        await _collect(
+            t.download(
+                _location(), len(DATA), part_size_kb=PART / 1024, connection_count=4
+            )
+        )
+
+    pool = manager._sender_pool
+    assert pool.borrowed == 4 and len(pool.released) == 3
+    assert manager.in_flight == 0
+    assert manager.budget.stats()["dcs"] == {}
+    assert t.senders is None
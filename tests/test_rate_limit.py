@@ -0,0 +1,98 @@
+"""Tests for the adaptive rate limiter and batched channel indexing."""
+
+from types import SimpleNamespace
+
+import pytest
+from telethon.errors import FloodWaitError
+
+from jackgram.bot import utils as bot_utils
+from jackgram.utils.rate_limit import AdaptiveRateLimiter, TokenBucket
+
+
+def test_flood_wait_halves_rate_and_success_recovers():
+    limiter = AdaptiveRateLimiter(rate=4, max_rate=4, increase=1)
+    limiter.on_flood_wait(0)
+    assert limiter.rate == 2
+    limiter.on_success()
+    limiter.on_success()
+    limiter.on_success()
+    assert limiter.rate == 4  # capped at max_rate
+
+
+def test_rate_never_drops_below_minimum():
+    limiter = AdaptiveRateLimiter(rate=1, max_rate=1, min_rate=0.5)
+    for _ in range(5):
+        limiter.on_flood_wait(0)
+    assert limiter.rate == 0.5
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_allows_burst_then_waits(monkeypatch):
+    bucket = TokenBucket(rate=10, capacity=2)
+    sleeps = []
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+        bucket._tokens += delay * bucket.rate
+
+    monkeypatch.setattr("jackgram.utils.rate_limit.asyncio.sleep", fake_sleep)
+    await bucket.acquire()
+    await bucket.acquire()
+    assert sleeps == []
+    await bucket.acquire()
+    assert len(sleeps) == 1 and bucket.stats()["waits"] == 1
+
+
+class FakeClient:
+    def __init__(self, flood_once=False):
+        self.calls = []
+        self.flood_once = flood_once
+
+    async def get_messages(self, chat_id, ids):
+        self.calls.append(list(ids))
+        if self.flood_once:
+            self.flood_once = False
+            raise FloodWaitError(request=None, capture=0)
+        # Only even ids carry a video file
+        return [
+            SimpleNamespace(
+                id=i,
+                document=object(),
+                message="",
+                file=SimpleNamespace(name=f"Movie.{i}.2020.mkv", size=2 * 1024**3),
+            )
+            if i % 2 == 0
+            else None
+            for i in ids
+        ]
+
+
+@pytest.mark.asyncio
+async def test_index_channel_fetches_in_batches(monkeypatch):
+    indexed = []
+
+    async def fake_forward(client, message, dest, on_flood_wait=None):
+        return message
+
+    async def fake_enrich_file(message, filename):
+        return message.id
+
+    async def fake_persist_file(enriched):
+        indexed.append(enriched)
+
+    monkeypatch.setattr(bot_utils, "forward_message", fake_forward)
+    monkeypatch.setattr(bot_utils, "enrich_file", fake_enrich_file)
+    monkeypatch.setattr(bot_utils, "persist_file", fake_persist_file)
+    monkeypatch.setattr(
+        bot_utils, "fetch_limiter", AdaptiveRateLimiter(rate=1000, max_rate=1000)
+    )
+
+    client = FakeClient(flood_once=True)
+    stats = await bot_utils.index_channel(client, -100, 1, 250, logs_channel=-200)
+
+    # One retried request after the FloodWait plus three batches of <= 100 ids
+    assert [len(c) for c in client.calls] == [100, 100, 100, 50]
+    assert stats["indexed"] == 125
+    assert stats["skipped_no_media"] == 125
+    assert sorted(indexed)[:3] == [2, 4, 6]
+    assert bot_utils.fetch_limiter.flood_waits == 1
@@ -0,0 +1,41 @@
+"""Tests for search tokenization and query building."""
+
+from jackgram.utils.database import Database
+from jackgram.utils.search import build_match, tokenize
+
+
+def test_tokenize_normalizes_case_accents_and_separators():
+    assert tokenize("Amélie.2001_1080p-BluRay.mkv") == [
+        "amelie",
+        "2001",
+        "1080p",
+        "bluray",
+        "mkv",
+    ]
+    assert tokenize("") == []
+
+
+def test_search_fields_cover_titles_and_file_names():
+    doc = {
+        "type": "tv",
+        "title": "Money Heist",
+        "original_title": "La casa de papel",
+        "seasons": [
+            {"episodes": [{"file_info": [{"file_name": "Money.Heist.S01E01.mkv"}]}]}
+        ],
+    }
+    Database.set_search_fields(doc)
+
+    assert doc["title_tokens"] == ["money", "heist", "la", "casa", "de", "papel"]
+    assert "s01e01" in doc["search_tokens"]
+    assert doc["search_tokens"].count("money") == 1
+
+
+def test_match_requires_every_word_as_prefix():
+    assert build_match([]) == {}
+    assert build_match(["bre", "bad"]) == {
+        "$and": [
+            {"search_tokens": {"$regex": "^bre"}},
+            {"search_tokens": {"$regex": "^bad"}},
+        ]
+    }
@@ -0,0 +1,218 @@
+"""Tests for health-weighted, lock-free session selection."""
+
+import asyncio
+import random
+from types import SimpleNamespace
+
+import pytest
+from telethon.errors import FloodWaitError
+
+from jackgram.utils.session_health import (
+    RPC_GET_FILE,
+    RPC_GET_MESSAGES,
+    SessionHealth,
+)
+from jackgram.utils.telegram_stream import (
+    AllSessionsFloodWaited,
+    MultiSessionManager,
+    TelegramMediaRef,
+)
+
+
+class FakeClient:
+    def __init__(
+        self, connected=True, connect_ok=True, connect_delay=0.0, dc_id=2
+    ):
+        self.connected = connected
+        self.connect_ok = connect_ok
+        self.connect_delay = connect_delay
+        self.connect_calls = 0
+        self.session = SimpleNamespace(dc_id=dc_id)
+
+    def is_connected(self):
+        return self.connected
+
+    async def connect(self):
+        self.connect_calls += 1
+        await asyncio.sleep(self.connect_delay)
+        if not self.connect_ok:
+            raise ConnectionError("network unreachable")
+        self.connected = True
+
+    async def disconnect(self):
+        self.connected = False
+
+    async def get_messages(self, chat_id, ids):
+        if getattr(self, "flood", 0):
+            raise FloodWaitError(request=None, capture=self.flood)
+        return f"message {ids} via {id(self)}"
+
+
+def _manager(*clients):
+    manager = MultiSessionManager()
+    manager._clients = list(clients)
+    for i, client in enumerate(clients):
+        manager._health[id(client)] = SessionHealth(index=i)
+    manager._index_home_dcs()
+    manager._initialized = True
+    return manager
+
+
+def test_score_drops_with_latency_errors_and_load():
+    health = SessionHealth(index=0)
+    base = health.score()
+
+    health.record_success(latency=2.0)
+    assert health.score() < base
+
+    fresh = SessionHealth(index=1)
+    fresh.record_error(ConnectionError("reset"))
+    assert fresh.error_rate > 0 and fresh.score() < base
+    assert fresh.last_error == "ConnectionError: reset"
+
+    busy = SessionHealth(index=2, in_flight=3)
+    assert busy.score() == pytest.approx(base / 4)
+
+
+@pytest.mark.asyncio
+async def test_selection_favours_healthy_sessions():
+    random.seed(0)
+    healthy, failing = FakeClient(), FakeClient()
+    manager = _manager(healthy, failing)
+    for _ in range(10):
+        manager._health[id(failing)].record_error(TimeoutError())
+
+    picks = [await manager.get_client() for _ in range(1000)]
+
+    assert picks.count(healthy) > 3 * picks.count(failing)
+    assert picks.count(failing) > 0  # degraded, not excluded
+
+
+@pytest.mark.asyncio
+async def test_dead_session_does_not_block_selection():
+    alive = FakeClient()
+    dead = FakeClient(connected=False, connect_delay=3600)
+    manager = _manager(alive, dead)
+    manager._supervisor_task = asyncio.create_task(manager._supervise())
+    try:
+        for _ in range(20):
+            client = await asyncio.wait_for(manager.get_client(), 0.5)
+            assert client is alive
+        await asyncio.sleep(0)
+        assert dead.connect_calls == 1  # reconnecting in the background
+    finally:
+        await manager.close_all()
+
+
+@pytest.mark.asyncio
+async def test_get_client_waits_for_supervisor_reconnect():
+    client = FakeClient(connected=False, connect_delay=0.01)
+    manager = _manager(client)
+    manager._supervisor_task = asyncio.create_task(manager._supervise())
+    try:
+        assert await manager.get_client() is client
+        assert manager._health[id(client)].reconnects == 1
+    finally:
+        await manager.close_all()
+
+
+@pytest.mark.asyncio
+async def test_failed_reconnects_back_off():
+    client = FakeClient(connected=False, connect_ok=False)
+    manager = _manager(client)
+    manager._CLIENT_WAIT_TIMEOUT = 0.2
+    manager._supervisor_task = asyncio.create_task(manager._supervise())
+    try:
+        with pytest.raises(RuntimeError):
+            await manager.get_client()
+        health = manager._health[id(client)]
+        # first retry is a second away, so only one attempt fits the wait
+        assert client.connect_calls == 1
+        assert health.backoff == manager._RECONNECT_BACKOFF
+        assert health.errors == 1
+    finally:
+        await manager.close_all()
+
+
+@pytest.mark.asyncio
+async def test_track_counts_only_session_errors():
+    client = FakeClient()
+    manager = _manager(client)
+    health = manager._health[id(client)]
+
+    async with manager._track(client):
+        assert health.in_flight == 1
+    assert health.in_flight == 0 and health.errors == 0
+
+    with pytest.raises(ValueError):
+        async with manager._track(client):
+            raise ValueError("message not found")
+    assert health.errors == 0
+
+    with pytest.raises(ConnectionError):
+        async with manager._track(client):
+            raise ConnectionError("reset")
+    assert health.errors == 1 and health.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_flood_waited_session_is_skipped_for_that_rpc_only():
+    throttled, spare = FakeClient(), FakeClient()
+    manager = _manager(throttled, spare)
+    manager.record_flood_wait(throttled, RPC_GET_FILE, 120)
+
+    for _ in range(50):
+        assert await manager.get_client(RPC_GET_FILE) is spare
+    picks = {await manager.get_client(RPC_GET_MESSAGES) for _ in range(50)}
+    assert throttled in picks
+
+    stats = manager.session_stats()
+    assert 119 < stats[0]["flood_penalties"][RPC_GET_FILE] <= 120
+    assert stats[1]["flood_penalties"] == {}
+
+
+@pytest.mark.asyncio
+async def test_every_session_flood_waited_raises_shortest_wait():
+    a, b = FakeClient(), FakeClient()
+    manager = _manager(a, b)
+    manager.record_flood_wait(a, RPC_GET_FILE, 300)
+    manager.record_flood_wait(b, RPC_GET_FILE, 40)
+
+    with pytest.raises(AllSessionsFloodWaited) as exc:
+        await manager.get_client(RPC_GET_FILE)
+    assert isinstance(exc.value, FloodWaitError)
+    assert exc.value.seconds == 40
+
+
+@pytest.mark.asyncio
+async def test_get_message_retries_on_another_session_after_flood_wait():
+    throttled, spare = FakeClient(), FakeClient()
+    throttled.flood = 60
+    manager = _manager(throttled, spare)
+    ref = TelegramMediaRef(chat_id=-100, message_id=7)
+
+    for _ in range(10):
+        assert await manager.get_message(ref) == f"message 7 via {id(spare)}"
+    health = manager._health[id(throttled)]
+    assert health.flood_waits == 1
+    assert health.flood_remaining(RPC_GET_MESSAGES) > 0
+
+
+@pytest.mark.asyncio
+async def test_downloads_prefer_accounts_on_the_file_dc():
+    dc2, dc4 = FakeClient(dc_id=2), FakeClient(dc_id=4)
+    manager = _manager(dc2, dc4)
+
+    for _ in range(20):
+        assert await manager.get_client(RPC_GET_FILE, dc_id=4) is dc4
+    # no account lives on DC 5: any account, with an exported authorization
+    assert await manager.get_client(RPC_GET_FILE, dc_id=5) in (dc2, dc4)
+    # a quarantined home account falls back to a cross-DC one
+    manager.record_flood_wait(dc4, RPC_GET_FILE, 60)
+    assert await manager.get_client(RPC_GET_FILE, dc_id=4) is dc2
+
+    assert manager.dc_affinity_stats() == {
+        "accounts_by_dc": {2: 1, 4: 1},
+        "same_dc": 20,
+        "cross_dc": 2,
+    }
@@ -0,0 +1,122 @@
+"""Tests for the single-flight download fan-out used by /dl."""
+
+import asyncio
+
+import pytest
+from telethon.errors import FloodWaitError
+from telethon.tl.types import InputDocumentFileLocation
+
+from jackgram.utils import stream_broadcast
+from jackgram.utils.stream_broadcast import StreamBroadcaster
+
+PART = 4096
+
+
+class FakeTransferrer:
+    """Stand-in for ParallelTransferrer that serves bytes from memory."""
+
+    instances = 0
+
+    def __init__(self, manager, dc_id=None):
+        FakeTransferrer.instances += 1
+
+    async def download(
+        self, file, file_size, offset=0, limit=None, part_size_kb=None, **kwargs
+    ):
+        part_size = int(part_size_kb * 1024) if part_size_kb else PART
+        end = min(offset + limit, file_size)
+        aligned = (offset // part_size) * part_size
+        skip = offset - aligned
+        pos = aligned
+        while pos < end:
+            await asyncio.sleep(0.001)
+            data = DATA[pos : min(pos + part_size, file_size)][skip:]
+            data = data[: end - (pos + skip)]
+            skip = 0
+            yield data
+            pos += part_size
+
+    async def _cleanup(self):
+        pass
+
+
+DATA = bytes(range(256)) * 64  # 16 KiB, i.e. four parts
+
+
+@pytest.fixture
+def broadcaster(monkeypatch):
+    monkeypatch.setattr(stream_broadcast, "ParallelTransferrer", FakeTransferrer)
+    monkeypatch.setattr(
+        stream_broadcast.stream_controller, "part_size", lambda dc_id, size, **kw: PART
+    )
+    FakeTransferrer.instances = 0
+    return StreamBroadcaster(manager=None)
+
+
+def _location():
+    return InputDocumentFileLocation(
+        id=1, access_hash=2, file_reference=b"", thumb_size=""
+    )
+
+
+async def _collect(gen):
+    return b"".join([chunk async for chunk in gen])
+
+
+@pytest.mark.asyncio
+async def test_concurrent_viewers_share_one_upstream(broadcaster):
+    results = await asyncio.gather(
+        *(
+            _collect(broadcaster.stream(_location(), len(DATA), dc_id=2))
+            for _ in range(5)
+        )
+    )
+
+    assert all(r == DATA for r in results)
+    assert FakeTransferrer.instances == 1
+    assert broadcaster.joins == 4
+    # The upstream task unregisters itself once its transferrer is drained
+    await asyncio.sleep(0.05)
+    assert broadcaster.stats()["shared_downloads"] == 0
+
+
+@pytest.mark.asyncio
+async def test_unaligned_range_is_trimmed(broadcaster):
+    result = await _collect(
+        broadcaster.stream(_location(), len(DATA), dc_id=2, offset=5000, limit=6000)
+    )
+    assert result == DATA[5000:11000]
+
+
+@pytest.mark.asyncio
+async def test_range_beyond_shared_download_continues_privately(broadcaster):
+    first = broadcaster.stream(_location(), len(DATA), dc_id=2, offset=0, limit=PART * 2)
+    second = broadcaster.stream(_location(), len(DATA), dc_id=2, offset=0)
+
+    short, full = await asyncio.gather(_collect(first), _collect(second))
+
+    assert short == DATA[: PART * 2]
+    assert full == DATA
+    assert FakeTransferrer.instances == 2
+
+
+@pytest.mark.asyncio
+async def test_upstream_failure_is_raised_to_every_subscriber(broadcaster, monkeypatch):
+    class FloodedTransferrer(FakeTransferrer):
+        async def download(self, *args, **kwargs):
+            await asyncio.sleep(0.01)
+            raise FloodWaitError(request=None, capture=30)
+            yield b""
+
+    monkeypatch.setattr(stream_broadcast, "ParallelTransferrer", FloodedTransferrer)
+
+    results = await asyncio.gather(
+        *(
+            _collect(broadcaster.stream(_location(), len(DATA), dc_id=2))
+            for _ in range(3)
+        ),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(r, FloodWaitError) for r in results)
+    assert FakeTransferrer.instances == 1  # no private retries
@@ -0,0 +1,156 @@
+"""Tests for the adaptive stream connection/part-size controller."""
+
+import asyncio
+
+import pytest
+
+from jackgram.utils.stream_controller import (
+    MAX_PART_SIZE,
+    AdaptiveStreamController,
+    BudgetExhausted,
+    ConnectionBudget,
+    linear_connection_count,
+)
+
+MB = 1024 * 1024
+GB = 1024 * MB
+
+
+def test_linear_connection_count_scales_with_size():
+    assert linear_connection_count(1, max_count=20) == 1
+    assert linear_connection_count(50 * MB, max_count=20) == 10
+    assert linear_connection_count(500 * MB, max_count=20) == 20
+
+
+def test_full_download_uses_ceiling():
+    c = AdaptiveStreamController(max_connections=10)
+    plan = c.plan(dc_id=4, file_size=2 * GB, limit=2 * GB)
+    assert plan.connections == 10
+    assert plan.reasons
+
+
+def test_seek_is_capped():
+    c = AdaptiveStreamController(max_connections=10)
+    plan = c.plan(dc_id=4, file_size=2 * GB, limit=GB, offset=GB)
+    assert plan.connections == 4
+
+
+def test_flood_wait_halves_ceiling_and_recovers():
+    c = AdaptiveStreamController(max_connections=16)
+    c.record_flood_wait(dc_id=2, seconds=30)
+
+    plan = c.plan(dc_id=2, file_size=2 * GB, limit=2 * GB)
+    assert plan.connections == 4  # penalty window: a quarter of the max
+    assert any("flood wait" in r for r in plan.reasons)
+
+    # Other DCs are unaffected
+    assert c.plan(dc_id=1, file_size=2 * GB, limit=2 * GB).connections == 16
+
+    # Once the penalty is over the ceiling grows back one step per transfer
+    c._dcs[2].flood_until = 0
+    c.record_transfer(dc_id=2, nbytes=10 * MB, elapsed=1.0, connections=4)
+    assert c._dcs[2].ceiling == 9
+
+
+def test_high_rtt_uses_max_part_size():
+    c = AdaptiveStreamController(max_connections=10)
+    default = c.part_size(dc_id=5, file_size=2 * GB)
+    for _ in range(5):
+        c.record_request(dc_id=5, seconds=1.0)
+    assert default < MAX_PART_SIZE
+    assert c.part_size(dc_id=5, file_size=2 * GB) == MAX_PART_SIZE
+
+
+def test_part_size_switch_has_hysteresis():
+    c = AdaptiveStreamController(max_connections=10)
+    c.record_request(dc_id=5, seconds=1.0)
+    assert c.part_size(dc_id=5, file_size=2 * GB) == MAX_PART_SIZE
+    # Back under the high threshold but not under the low one: keep big parts
+    for _ in range(10):
+        c.record_request(dc_id=5, seconds=0.3)
+    assert c.part_size(dc_id=5, file_size=2 * GB) == MAX_PART_SIZE
+    for _ in range(10):
+        c.record_request(dc_id=5, seconds=0.05)
+    assert c.part_size(dc_id=5, file_size=2 * GB) < MAX_PART_SIZE
+
+
+def test_document_keeps_its_first_part_size():
+    c = AdaptiveStreamController(max_connections=10)
+    first = c.part_size(dc_id=5, file_size=2 * GB, doc_id=42)
+    c.record_request(dc_id=5, seconds=1.0)
+    assert c.part_size(dc_id=5, file_size=2 * GB, doc_id=42) == first
+    plan = c.plan(dc_id=5, file_size=2 * GB, limit=GB, doc_id=42)
+    assert plan.part_size == first
+    assert c.part_size(dc_id=5, file_size=2 * GB, doc_id=43) == MAX_PART_SIZE
+
+
+def test_connections_never_exceed_parts():
+    c = AdaptiveStreamController(max_connections=10)
+    plan = c.plan(dc_id=1, file_size=2 * GB, limit=4096, connection_count=8)
+    assert plan.connections == 1
+
+
+def test_stats_export_recent_decisions():
+    c = AdaptiveStreamController(max_connections=10)
+    c.plan(dc_id=1, file_size=GB, limit=GB)
+    stats = c.stats()
+    assert stats["recent_decisions"][0]["connections"] == 10
+    assert "1" in stats["dcs"]
+
+
+@pytest.mark.asyncio
+async def test_connection_budget_reserves_within_capacity():
+    budget = ConnectionBudget(per_account=20)
+
+    shares = [await budget.open_stream(4, wanted=8, accounts=1) for _ in range(3)]
+    # fair shares of 20, 10 and 6, but only 4 connections were still free
+    assert [s.granted for s in shares] == [8, 8, 4]
+    assert budget.free(4) == 0
+    # two accounts double the DC's capacity; other DCs have their own budget
+    assert (await budget.open_stream(4, wanted=20, accounts=2)).granted == 10
+    assert (await budget.open_stream(2, wanted=8, accounts=1)).granted == 8
+    assert budget.shrunk == 2
+
+
+@pytest.mark.asyncio
+async def test_running_streams_make_room_for_new_ones():
+    budget = ConnectionBudget(per_account=20)
+    first = await budget.open_stream(4, wanted=20, accounts=1)
+    asked = []
+    first.on_shrink = lambda: asked.append(first.limit)
+
+    opening = asyncio.create_task(budget.open_stream(4, wanted=20, accounts=1))
+    await asyncio.sleep(0)
+    assert not opening.done() and asked == [10]
+
+    while first.granted > first.limit:
+        first.give_back()  # the transferrer drops a sender at a part boundary
+    second = await opening
+    assert (first.granted, second.granted) == (10, 10)
+    assert budget.free(4) == 0
+
+    first.close()
+    second.close()
+    assert budget.stats()["dcs"] == {}
+
+
+@pytest.mark.asyncio
+async def test_stream_waits_for_a_connection_then_gives_up():
+    budget = ConnectionBudget(per_account=2)
+    budget._MAX_WAIT = 0.05
+    held = await budget.open_stream(4, wanted=2, accounts=1)
+
+    # the second stream gets the connection the first hands over; a third
+    # finds none free and none coming
+    opening = asyncio.create_task(budget.open_stream(4, wanted=2, accounts=1))
+    await asyncio.sleep(0)
+    held.give_back()
+    second = await opening
+    assert second.granted == 1
+    with pytest.raises(BudgetExhausted):
+        await budget.open_stream(4, wanted=1, accounts=1)
+    assert budget.stats()["timed_out_streams"] == 1
+
+    held.close()
+    second.close()
+    assert budget.stats()["dcs"] == {}
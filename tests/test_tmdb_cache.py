@@ -0,0 +1,134 @@
+"""Tests for the TMDb response cache."""
+
+import asyncio
+
+import pytest
+
+from jackgram.utils import tmdb as tmdb_module
+from jackgram.utils.tmdb import TMDBClient
+from jackgram.utils.tmdb_cache import TMDBCache
+
+
+class FakeResponse:
+    def __init__(self, status_code, data, headers=None):
+        self.status_code = status_code
+        self._data = data
+        self.headers = headers or {}
+
+    def json(self):
+        return self._data
+
+
+class FakeHTTPClient:
+    """Stands in for httpx.AsyncClient and records every GET."""
+
+    calls = []
+    response = FakeResponse(200, {"results": []})
+
+    def __init__(self, **kwargs):
+        self.is_closed = False
+
+    async def aclose(self):
+        self.is_closed = True
+
+    async def get(self, url, params=None):
+        FakeHTTPClient.calls.append(url)
+        return FakeHTTPClient.response
+
+
+@pytest.fixture
+def fake_http(monkeypatch):
+    FakeHTTPClient.calls = []
+    monkeypatch.setattr(tmdb_module.httpx, "AsyncClient", FakeHTTPClient)
+    return FakeHTTPClient
+
+
+@pytest.mark.asyncio
+async def test_search_misses_are_cached(fake_http):
+    client = TMDBClient(cache=TMDBCache(None, max_entries=100))
+
+    assert await client.find_media_id("Unknown Show", "series", year=2020) is None
+    # One search with the year, one retry without it
+    assert len(fake_http.calls) == 2
+
+    assert await client.find_media_id("Unknown Show", "series", year=2020) is None
+    assert len(fake_http.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_search_hits_are_cached(fake_http):
+    fake_http.response = FakeResponse(200, {"results": [{"id": 1399}]})
+    client = TMDBClient(cache=TMDBCache(None, max_entries=100))
+
+    assert await client.find_media_id("Some Show", "series") == 1399
+    assert await client.find_media_id("some show ", "series") == 1399
+    assert len(fake_http.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_server_errors_are_not_cached(fake_http):
+    fake_http.response = FakeResponse(500, {"errors": ["boom"]})
+    client = TMDBClient(cache=TMDBCache(None, max_entries=100))
+    client._MAX_RETRIES = 0
+
+    assert await client.get_details(1, "movie") == {}
+    assert await client.get_details(1, "movie") == {}
+    assert len(fake_http.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_episode_served_from_cached_series_details(fake_http):
+    cache = TMDBCache(None, max_entries=100)
+    client = TMDBClient(cache=cache)
+    details = {
+        "id": 1399,
+        "season/1": {"episodes": [{"episode_number": 2, "name": "Second"}]},
+    }
+    await cache.set(client._details_key(1399, "tv"), details, ttl=60)
+
+    episode = await client.get_episode_details(1399, episode_number=2, season_number=1)
+    assert episode["name"] == "Second"
+    assert fake_http.calls == []
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_requests_honour_retry_after(fake_http, monkeypatch):
+    responses = [
+        FakeResponse(429, {}, headers={"Retry-After": "2"}),
+        FakeResponse(200, {"id": 1, "title": "Movie"}),
+    ]
+
+    async def get(self, url, params=None):
+        FakeHTTPClient.calls.append(url)
+        return responses.pop(0)
+
+    sleeps = []
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+
+    monkeypatch.setattr(FakeHTTPClient, "get", get)
+    monkeypatch.setattr(tmdb_module.asyncio, "sleep", fake_sleep)
+    client = TMDBClient(cache=TMDBCache(None, max_entries=100))
+
+    assert (await client.get_details(1, "movie"))["title"] == "Movie"
+    assert sleeps == [2.0]
+    assert client.retries == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_lookups_share_one_request(fake_http, monkeypatch):
+    async def slow_get(self, url, params=None):
+        FakeHTTPClient.calls.append(url)
+        await asyncio.sleep(0.01)
+        return FakeResponse(200, {"results": [{"id": 1399}]})
+
+    monkeypatch.setattr(FakeHTTPClient, "get", slow_get)
+    client = TMDBClient(cache=None)
+
+    ids = await asyncio.gather(
+        *(client.find_media_id("Some Show", "series") for _ in range(10))
+    )
+    assert ids == [1399] * 10
+    assert len(fake_http.calls) == 1
+    assert client.stats()["coalesced"] == 9